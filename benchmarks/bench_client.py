@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк клиента на локальной заглушке API (benchmarks/mock_server.py).
+
+Для каждого сценария измеряются пропускная способность, задержка вызова
+(p50, p99) и пиковое потребление памяти (tracemalloc). Результаты выводятся
+в JSON, чтобы их можно было сравнивать между версиями:
+
+    python benchmarks/bench_client.py --output new.json --baseline old.json
+
+Запуск: python benchmarks/bench_client.py [--latency SEC] [--error-rate P]
+[--items N] [--calls N] [--orders N] [--addresses N] [--keystroke-interval SEC]
+[--scenario NAME ...] [--output FILE]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+# Заглушка лежит рядом со скриптом, а пакет realtycloud - в корне репозитория:
+# скрипт запускается без установки пакета
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_server import ADDRESSES, MockServer, MockSettings  # noqa: E402
+from realtycloud.asyncr import AsyncRealtycloud  # noqa: E402
+from realtycloud.cache import MemoryCache  # noqa: E402
+from realtycloud.instrumentation import Instrumentation, RequestEvent  # noqa: E402
+from realtycloud.request_objects import RealtyObject, RealtyOwner  # noqa: E402
+from realtycloud.retry import RetryPolicy  # noqa: E402
+from realtycloud.serialization import get_serializer  # noqa: E402
+from realtycloud.sync import Realtycloud  # noqa: E402
+
+TOKEN = "benchmark-token"
+
+
+class LatencyRecorder(Instrumentation):
+    """Сбор длительности попыток запросов для сценариев с пулом потоков."""
+
+    trace_phases = False
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def on_request_end(self, event: RequestEvent) -> None:
+        with self.lock:
+            self.latencies.append(event.elapsed)
+            if event.error is not None:
+                self.errors += 1
+
+
+class Run:
+    """Замеры одного прогона сценария."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.operations = 0
+        self.errors = 0
+
+    def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Вызвать fn, учтя задержку и ошибку."""
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception:
+            self.errors += 1
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+            self.operations += 1
+
+    async def acall(self, fn: Callable[..., Any], *args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await fn(*args)
+        except Exception:
+            self.errors += 1
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+            self.operations += 1
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def client_options(server: MockServer, **kwargs: Any) -> Dict[str, Any]:
+    options = {
+        "api_url": server.url,
+        # Короткие отсрочки: ошибки заглушки не должны тонуть в ожидании
+        "retry_policy": RetryPolicy(backoff_base=0.01, backoff_max=0.1),
+    }
+    options.update(kwargs)
+    return options
+
+
+def queries(count: int) -> List[str]:
+    return [f"г. Москва, ул. Тверская, д. {index}" for index in range(count)]
+
+
+def keys(count: int) -> List[str]:
+    return [f"77:01:0001001:{index}" for index in range(count)]
+
+
+def duplicated_keys(args: argparse.Namespace) -> List[str]:
+    """Номера, каждый из которых повторяется concurrency раз подряд."""
+    return [
+        key
+        for key in keys(max(1, args.calls // args.concurrency))
+        for _ in range(args.concurrency)
+    ]
+
+
+def risk_requests(count: int) -> List[Any]:
+    """Пары (объект, владельцы); владельцы из небольшого списка повторяются у многих объектов."""
+    owners = [
+        RealtyOwner(
+            last_name="Иванов",
+            first_name="Иван",
+            birthday=f"{index % 28 + 1:02d}.01.1980",
+            owner_type=0,
+        )
+        for index in range(50)
+    ]
+    return [
+        (RealtyObject(key), [owners[index % len(owners)], owners[(index + 1) % len(owners)]])
+        for index, key in enumerate(keys(count))
+    ]
+
+
+def typed_addresses(args: argparse.Namespace) -> List[str]:
+    """Адреса из справочника заглушки в том виде, как их набирает пользователь."""
+    addresses = ADDRESSES[:: max(1, len(ADDRESSES) // args.addresses)][: args.addresses]
+    return [
+        address.replace("г ", "").replace("ул ", "").replace(", д ", " ")
+        for address in addresses
+    ]
+
+
+async def type_addresses(
+    args: argparse.Namespace, run: Run, answer: Callable[[str], Any]
+) -> None:
+    """
+    Набрать адреса по символу с паузами между нажатиями; answer(text) -
+    корутина, возвращающая подсказки или None для перекрытого текста.
+    """
+    pauses = random.Random(args.seed)
+
+    async def keystroke(text: str) -> None:
+        started = time.perf_counter()
+        try:
+            result = await answer(text)
+        except Exception:
+            run.errors += 1
+            return
+        if result is not None:
+            run.latencies.append(time.perf_counter() - started)
+            run.operations += 1
+
+    for address in typed_addresses(args):
+        tasks = []
+        for length in range(1, len(address) + 1):
+            tasks.append(asyncio.ensure_future(keystroke(address[:length])))
+            await asyncio.sleep(pauses.expovariate(1 / args.keystroke_interval))
+        await asyncio.gather(*tasks)
+
+
+def scenario_typeahead_direct(
+    server: MockServer, args: argparse.Namespace, run: Run
+) -> None:
+    """Автодополнение адреса: suggest_addresses на каждое нажатие клавиши."""
+
+    async def main() -> None:
+        async with AsyncRealtycloud(TOKEN, **client_options(server)) as client:
+
+            async def answer(text: str) -> Any:
+                if len(text) < 3:
+                    return None
+                return await client.suggest_addresses(10, text)
+
+            await type_addresses(args, run, answer)
+
+    asyncio.run(main())
+
+
+def scenario_typeahead_session(
+    server: MockServer, args: argparse.Namespace, run: Run
+) -> None:
+    """Автодополнение адреса через сессию с паузой, отменой и кэшем префиксов."""
+
+    async def main() -> None:
+        async with AsyncRealtycloud(TOKEN, **client_options(server)) as client:
+            session = client.suggest_session(
+                count=10, debounce=args.keystroke_interval * 1.5
+            )
+            await type_addresses(args, run, session.query)
+
+    asyncio.run(main())
+
+
+def scenario_serial_suggest(server: MockServer, args: argparse.Namespace, run: Run) -> None:
+    """Последовательные вызовы suggest с разными адресами."""
+    with Realtycloud(TOKEN, **client_options(server)) as client:
+        for query in queries(args.calls):
+            run.call(client.suggest, query)
+
+
+def scenario_serial_info(server: MockServer, args: argparse.Namespace, run: Run) -> None:
+    """Последовательные вызовы info с разными кадастровыми номерами."""
+    with Realtycloud(TOKEN, **client_options(server)) as client:
+        for key in keys(args.calls):
+            run.call(client.info, key)
+
+
+def scenario_cached_suggest(server: MockServer, args: argparse.Namespace, run: Run) -> None:
+    """Вызовы suggest с кэшем в памяти: десять адресов повторяются по кругу."""
+    hot = queries(10)
+    with Realtycloud(TOKEN, **client_options(server, cache=MemoryCache())) as client:
+        for index in range(args.calls):
+            run.call(client.suggest, hot[index % len(hot)])
+
+
+def _map_info(
+    server: MockServer, args: argparse.Namespace, run: Run, items: List[str], **kwargs: Any
+) -> None:
+    recorder = LatencyRecorder()
+    options = client_options(server, instrumentation=recorder, **kwargs)
+    with Realtycloud(TOKEN, **options) as client:
+        for result in client.map_info(items, max_concurrency=args.concurrency):
+            run.operations += 1
+            run.errors += 0 if result.ok else 1
+    # Задержка отдельных вызовов в пуле потоков - по попыткам запросов
+    run.latencies = recorder.latencies
+
+
+def scenario_map_info(server: MockServer, args: argparse.Namespace, run: Run) -> None:
+    """map_info по разным кадастровым номерам в пуле потоков."""
+    _map_info(server, args, run, keys(args.calls))
+
+
+def scenario_map_info_duplicates(
+    server: MockServer, args: argparse.Namespace, run: Run
+) -> None:
+    """map_info по повторяющимся номерам с объединением одинаковых запросов."""
+    _map_info(server, args, run, duplicated_keys(args))
+
+
+def scenario_map_info_duplicates_no_single_flight(
+    server: MockServer, args: argparse.Namespace, run: Run
+) -> None:
+    """То же без объединения одинаковых запросов."""
+    _map_info(server, args, run, duplicated_keys(args), single_flight=False)
+
+
+def scenario_batched_orders(server: MockServer, args: argparse.Namespace, run: Run) -> None:
+    """Оптовый заказ args.orders объектов партиями; задержка - по запросам партий."""
+    objects = (RealtyObject(key) for key in keys(args.orders))
+    recorder = LatencyRecorder()
+    with Realtycloud(TOKEN, **client_options(server, instrumentation=recorder)) as client:
+        for result in client.order_objects_batched(
+            objects, batch_size=args.batch_size, max_in_flight=args.concurrency
+        ):
+            run.operations += len(result.items)
+            run.errors += 0 if result.ok else len(result.items)
+    run.latencies = recorder.latencies
+
+
+def scenario_serial_risk(server: MockServer, args: argparse.Namespace, run: Run) -> None:
+    """Заказ оценки риска по одному объекту на запрос."""
+    with Realtycloud(TOKEN, **client_options(server)) as client:
+        for obj, owners in risk_requests(args.calls):
+            run.call(client.order_risk_assessment_for_individual, obj, owners)
+
+
+def scenario_batched_risk(server: MockServer, args: argparse.Namespace, run: Run) -> None:
+    """Оптовый заказ оценки риска args.orders объектов партиями; задержка - по запросам партий."""
+    recorder = LatencyRecorder()
+    with Realtycloud(TOKEN, **client_options(server, instrumentation=recorder)) as client:
+        for result in client.order_risk_assessments_batched(
+            risk_requests(args.orders),
+            batch_size=args.batch_size,
+            max_in_flight=args.concurrency,
+        ):
+            run.operations += len(result.items)
+            run.errors += 0 if result.ok else len(result.items)
+    run.latencies = recorder.latencies
+
+
+def scenario_async_info(server: MockServer, args: argparse.Namespace, run: Run) -> None:
+    """Асинхронные вызовы info с ограничением числа одновременных запросов."""
+
+    async def main() -> None:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        async with AsyncRealtycloud(TOKEN, **client_options(server)) as client:
+
+            async def one(key: str) -> None:
+                async with semaphore:
+                    await run.acall(client.info, key)
+
+            await asyncio.gather(*(one(key) for key in keys(args.calls)))
+
+    asyncio.run(main())
+
+
+SCENARIOS: Dict[str, Callable[[MockServer, argparse.Namespace, Run], None]] = {
+    "serial_suggest": scenario_serial_suggest,
+    "serial_info": scenario_serial_info,
+    "cached_suggest": scenario_cached_suggest,
+    "map_info": scenario_map_info,
+    "map_info_duplicates": scenario_map_info_duplicates,
+    "map_info_duplicates_no_single_flight": scenario_map_info_duplicates_no_single_flight,
+    "batched_orders": scenario_batched_orders,
+    "serial_risk": scenario_serial_risk,
+    "batched_risk": scenario_batched_risk,
+    "async_info": scenario_async_info,
+    "typeahead_direct": scenario_typeahead_direct,
+    "typeahead_session": scenario_typeahead_session,
+}
+
+
+def measure(
+    name: str, server: MockServer, args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Прогнать сценарий: сначала на время, затем под tracemalloc на память."""
+    scenario = SCENARIOS[name]
+    before = dict(server.state.requests)
+    run = Run()
+    started = time.perf_counter()
+    scenario(server, args, run)
+    seconds = time.perf_counter() - started
+    requests = {
+        endpoint: count - before.get(endpoint, 0)
+        for endpoint, count in server.state.requests.items()
+        if count - before.get(endpoint, 0)
+    }
+    result: Dict[str, Any] = {
+        "operations": run.operations,
+        "errors": run.errors,
+        "seconds": seconds,
+        "throughput_ops": run.operations / seconds if seconds else None,
+        "latency_p50_ms": _ms(percentile(run.latencies, 0.5)),
+        "latency_p99_ms": _ms(percentile(run.latencies, 0.99)),
+        "server_requests": requests,
+    }
+    if args.memory:
+        # Сервер работает в том же процессе: его память тоже попадает в замер
+        tracemalloc.start()
+        try:
+            scenario(server, args, Run())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_memory_kb"] = peak / 1024
+    return result
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return seconds * 1000 if seconds is not None else None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Относительное изменение показателей по сравнению с прошлым прогоном."""
+    changes = {}
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        changes[name] = {
+            metric: current[metric] / previous[metric] - 1
+            for metric in ("throughput_ops", "latency_p50_ms", "latency_p99_ms", "peak_memory_kb")
+            if current.get(metric) is not None and previous.get(metric)
+        }
+    return changes
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        from importlib.metadata import version
+
+        package_version = version("realtycloud")
+    except Exception:
+        package_version = None
+    return {
+        "realtycloud": package_version,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "httpx": httpx.__version__,
+        "serializer": get_serializer().__class__.__name__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.005, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="разброс задержки, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--limit-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--items", type=int, default=10, help="элементов в ответах поиска")
+    parser.add_argument("--rights", type=int, default=20, help="прав в ответе objectFull")
+    parser.add_argument("--calls", type=int, default=200, help="вызовов в сценарии")
+    parser.add_argument("--orders", type=int, default=5000, help="объектов в оптовом заказе")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--addresses", type=int, default=10,
+                        help="адресов, набираемых в сценариях typeahead_*")
+    parser.add_argument("--keystroke-interval", type=float, default=0.02,
+                        help="средняя пауза между нажатиями клавиш, с")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="не измерять память (второй прогон под tracemalloc)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", help="файл прошлых результатов для сравнения")
+    args = parser.parse_args()
+
+    server_settings = MockSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        limit_rate=args.limit_rate,
+        items=args.items,
+        rights=args.rights,
+        seed=args.seed,
+    )
+    parameters = {
+        name: value
+        for name, value in vars(args).items()
+        if name not in ("output", "baseline", "scenario")
+    }
+    results: Dict[str, Any] = {
+        "environment": environment(),
+        "parameters": parameters,
+        "results": {},
+    }
+    with MockServer(settings=server_settings) as server:
+        for name in args.scenario or SCENARIOS:
+            results["results"][name] = measure(name, server, args)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            results["changes"] = compare(results, json.load(file))
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Сравнение сериализаторов JSON на типичных телах запросов и ответов API.
+
+Запуск: python benchmarks/bench_serialization.py [--number N] [--output FILE]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Any, Dict, List
+
+# Пакет realtycloud лежит в корне репозитория: скрипт запускается без установки пакета
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realtycloud.request_objects import RealtyObject, RealtyObjectBatch  # noqa: E402
+from realtycloud.serialization import SERIALIZERS, Serializer  # noqa: E402
+
+
+def object_full_response(rights: int = 20) -> Dict[str, Any]:
+    """Ответ objectFull с вложенными сведениями о правах и обременениях."""
+    return {
+        "data": {
+            "object_key": "77:01:0001001:1234",
+            "address": "г. Москва, ул. Тверская, д. 7, кв. 15",
+            "area": 54.3,
+            "cadastral_price": 15876432.11,
+            "object_type": "Помещение",
+            "floor": "5",
+            "rights": [
+                {
+                    "number": f"77-77/001-77/001/001/2016-{index}/1",
+                    "type": "Собственность",
+                    "date": "2016-03-14",
+                    "owners": [{"name": "Физическое лицо", "share": "1/2"}] * 2,
+                    "encumbrances": [
+                        {"type": "Ипотека", "date": "2016-03-14", "term": 240}
+                    ],
+                }
+                for index in range(rights)
+            ],
+        }
+    }
+
+
+def order_keys(count: int) -> List[str]:
+    return [f"77:01:0001001:{index}" for index in range(count)]
+
+
+def measure(fn, number: int) -> float:
+    """Среднее время одного вызова в микросекундах."""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def available_serializers() -> Dict[str, Serializer]:
+    serializers = {}
+    for name, factory in SERIALIZERS.items():
+        try:
+            serializers[name] = factory()
+        except ImportError:
+            continue
+    return serializers
+
+
+def run(number: int, order_size: int) -> Dict[str, Any]:
+    response = object_full_response()
+    response_bytes = json.dumps(response, ensure_ascii=False).encode()
+    keys = order_keys(order_size)
+    objects = [RealtyObject(key) for key in keys]
+    batch = RealtyObjectBatch.from_objects(objects)
+    order = {"order_items": [item.to_dict("EgrnObject") for item in objects]}
+
+    results: Dict[str, Any] = {"number": number, "order_size": order_size}
+    for name, serializer in available_serializers().items():
+        results[name] = {
+            "decode_object_full_us": measure(
+                lambda: serializer.loads(response_bytes), number
+            ),
+            "encode_order_us": measure(lambda: serializer.dumps(order), number),
+            "build_and_encode_order_us": measure(
+                lambda: serializer.dumps(
+                    {"order_items": [item.to_dict("EgrnObject") for item in objects]}
+                ),
+                max(1, number // 10),
+            ),
+        }
+    results["batch_to_json_us"] = measure(
+        lambda: batch.to_json("EgrnObject"), max(1, number // 10)
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--order-size", type=int, default=1000)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    args = parser.parse_args()
+    results = run(args.number, args.order_size)
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Локальная замена API Realtycloud для бенчмарков.
+
+Обслуживает все методы, которые вызывает клиент: /search, /dadata/suggest,
+/dadata/suggest_parties, /objectFull/{id}, /property/info/house_details_new,
+/order и /orders. Подсказки адресов ищутся по небольшому справочнику улиц
+Москвы; задержка, доля ошибок и размер ответов настраиваются.
+
+Запуск отдельно: python benchmarks/mock_server.py --port 8000 --latency 0.05
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+class MockSettings:
+    """Параметры поведения сервера; можно менять во время работы."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        limit_rate: float = 0.0,
+        items: int = 10,
+        rights: int = 20,
+        ready_after: int = 1,
+        seed: Optional[int] = None,
+    ):
+        # Средняя задержка ответа и разброс задержки в секундах
+        self.latency = latency
+        self.jitter = jitter
+        # Доля ответов 503 и 429
+        self.error_rate = error_rate
+        self.limit_rate = limit_rate
+        # Число элементов в ответах поиска и подсказок по организациям, число прав в objectFull
+        self.items = items
+        self.rights = rights
+        # Сколько проверок статуса позиция проводит в статусе inprogress
+        self.ready_after = ready_after
+        self.random = random.Random(seed)
+
+
+class MockState:
+    """Счетчики запросов и состояние созданных заказов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.polls: Dict[str, int] = {}
+        self.ids = itertools.count()
+
+    def count(self, endpoint: str) -> None:
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+
+def search_payload(settings: MockSettings, query: str) -> Dict[str, Any]:
+    return {
+        "data": [
+            {
+                "ObjectType": "Помещение",
+                "Number": f"77:01:0001001:{index}",
+                "Address": f"{query}, кв. {index}",
+                "Area": "54.3",
+                "kad_price": "15876432.11",
+                "Status": "Учтенный",
+            }
+            for index in range(settings.items)
+        ]
+    }
+
+
+# Справочник адресов для /dadata/suggest: улицы и дома по порядку
+STREETS = [
+    "ул Тверская", "ул Арбат", "ул Петровка", "ул Покровка", "ул Маросейка",
+    "ул Мясницкая", "ул Сретенка", "ул Пятницкая", "ул Остоженка", "ул Пречистенка",
+    "ул Никольская", "ул Ильинка", "ул Варварка", "ул Большая Ордынка",
+    "ул Большая Якиманка", "ул Новый Арбат", "ул Тверская-Ямская 1-я",
+    "пр-кт Мира", "пр-кт Ленинский", "пр-кт Вернадского", "пр-кт Рязанский",
+    "пр-кт Кутузовский", "пр-кт Ленинградский", "пр-кт Волгоградский",
+    "ш Варшавское", "ш Каширское", "ш Дмитровское", "б-р Тверской",
+    "б-р Гоголевский", "б-р Никитский",
+]
+ADDRESSES = [
+    f"г Москва, {street}, д {house}" for street in STREETS for house in range(1, 121)
+]
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.casefold().replace("ё", "е"))
+
+
+def suggest_payload(settings: MockSettings, query: str, count: int) -> Dict[str, Any]:
+    """Адреса справочника, слова которых начинаются словами запроса."""
+    parts = _words(query)
+    found = []
+    for address in ADDRESSES:
+        words = _words(address)
+        if all(any(word.startswith(part) for word in words) for part in parts):
+            found.append({"value": address, "unrestricted_value": address, "data": {}})
+            if len(found) == count:
+                break
+    return {"data": found}
+
+
+def suggest_parties_payload(settings: MockSettings, query: str) -> Dict[str, Any]:
+    return {
+        "data": [
+            {"value": f"{query} {index}", "data": {"index": index}}
+            for index in range(settings.items)
+        ]
+    }
+
+
+def object_full_payload(settings: MockSettings, key: str) -> Dict[str, Any]:
+    return {
+        "data": {
+            "object_key": key,
+            "address": "г. Москва, ул. Тверская, д. 7, кв. 15",
+            "area": 54.3,
+            "rights": [
+                {
+                    "number": f"77-77/001-77/001/001/2016-{index}/1",
+                    "type": "Собственность",
+                    "date": "2016-03-14",
+                }
+                for index in range(settings.rights)
+            ],
+        }
+    }
+
+
+def house_payload(settings: MockSettings, address: str) -> Dict[str, Any]:
+    return {
+        "data": [
+            {"address": address, "floors": 9, "flat": index}
+            for index in range(settings.items)
+        ]
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к заглушке API."""
+
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело пишутся отдельно: без TCP_NODELAY ответ ждет отложенного ACK
+    disable_nagle_algorithm = True
+    server: "MockServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, payload: Any, headers: Dict[str, str] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_or_fail(self) -> bool:
+        """Выдержать задержку и, возможно, ответить ошибкой; True, если ответ уже отправлен."""
+        settings = self.server.settings
+        with self.server.state.lock:
+            jitter = settings.random.uniform(-settings.jitter, settings.jitter)
+            roll = settings.random.random()
+        delay = max(0.0, settings.latency + jitter)
+        if delay:
+            time.sleep(delay)
+        if roll < settings.error_rate:
+            self._send_json(503, {"error": "Service Unavailable"})
+            return True
+        if roll < settings.error_rate + settings.limit_rate:
+            self._send_json(429, {"error": "Too Many Requests"}, {"Retry-After": "0"})
+            return True
+        return False
+
+    def _route(self) -> Tuple[str, Dict[str, str]]:
+        parts = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(parts.query).items()}
+        return parts.path, params
+
+    def do_GET(self) -> None:
+        path, params = self._route()
+        settings = self.server.settings
+        if path == "/search":
+            endpoint, payload = "search", search_payload(settings, params.get("query", ""))
+        elif path == "/dadata/suggest":
+            endpoint = "dadata"
+            payload = suggest_payload(
+                settings, params.get("query", ""), int(params.get("count", 10))
+            )
+        elif path == "/dadata/suggest_parties":
+            endpoint = "dadata"
+            payload = suggest_parties_payload(settings, params.get("query", ""))
+        elif path.startswith("/objectFull/"):
+            endpoint = "objectFull"
+            payload = object_full_payload(settings, path[len("/objectFull/") :])
+        elif path == "/property/info/house_details_new":
+            endpoint, payload = "house", house_payload(settings, params.get("address", ""))
+        else:
+            self._send_json(404, {"error": "not found"})
+            return
+        self.server.state.count(endpoint)
+        if not self._delay_or_fail():
+            self._send_json(200, payload)
+
+    def do_POST(self) -> None:
+        path, _ = self._route()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        state = self.server.state
+        if path == "/order":
+            state.count("order")
+            if self._delay_or_fail():
+                return
+            order_items = []
+            with state.lock:
+                for item in body.get("order_items", []):
+                    order_items.append(
+                        {
+                            "order_item_id": f"item-{next(state.ids)}",
+                            "price": "25",
+                            "product_name": item.get("product_name"),
+                        }
+                    )
+            self._send_json(
+                200,
+                {"data": {"id": f"order-{time.time_ns()}", "order_items": order_items}},
+            )
+        elif path == "/orders":
+            state.count("orders")
+            if self._delay_or_fail():
+                return
+            ids: List[str] = body.get("order_item_ids", [])
+            offset = body.get("offset", 0)
+            limit = body.get("limit", 1000)
+            items = []
+            with state.lock:
+                for order_item_id in ids[offset : offset + limit]:
+                    polls = state.polls[order_item_id] = state.polls.get(order_item_id, 0) + 1
+                    done = polls > self.server.settings.ready_after
+                    items.append(
+                        {
+                            "order_item_id": order_item_id,
+                            "product_name": "EgrnObject",
+                            "status": "done" if done else "inprogress",
+                            "data": {"file_pdf_url": f"{self.server.url}/files/{order_item_id}.pdf"}
+                            if done
+                            else {},
+                        }
+                    )
+            self._send_json(200, {"data": items})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+
+class MockServer(ThreadingHTTPServer):
+    """Заглушка API Realtycloud в фоновом потоке."""
+
+    daemon_threads = True
+    # Очередь по умолчанию (5) переполняется при одновременном открытии соединений
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        settings: Optional[MockSettings] = None,
+    ):
+        super().__init__((host, port), MockHandler)
+        self.settings = settings or MockSettings()
+        self.state = MockState()
+        self._thread: Optional[threading.Thread] = None
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Клиент, прервавший запрос по сроку или отмене, - штатная ситуация
+        pass
+
+    @property
+    def url(self) -> str:
+        """Адрес сервера для параметра api_url клиента."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--limit-rate", type=float, default=0.0)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--rights", type=int, default=20)
+    args = parser.parse_args()
+    settings = MockSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        limit_rate=args.limit_rate,
+        items=args.items,
+        rights=args.rights,
+    )
+    server = MockServer(args.host, args.port, settings)
+    print(f"Заглушка API Realtycloud: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,950 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+import uuid
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+from httpx import AsyncClient, Limits, Response, TransportError
+
+from realtycloud import settings
+from .base import BaseClient, build_client_options
+from .download import AsyncReportDownloader, DownloadResult
+from .deadline import TimeoutValue, current_deadline, endpoint_timeout
+from .exceptions import RealtycloudDeadlineExceededException, RealtycloudException
+from .instrumentation import Instrumentation
+from .dedup import (
+    Deduplicator,
+    DiskKeySet,
+    KeySet,
+    collapse,
+    expand_response,
+    object_identity,
+    risk_identity,
+)
+from .journal import OrderJournal
+from .cache import BaseCache, cache_ttl
+from .cadastral_index import CadastralIndex
+from .batching import BatchResult, send_batches_async
+from .ratelimit import RateLimiter
+from .models import House, ObjectInfo, StatusItem, SuggestItem
+from .pipeline import AsyncPipeline, report_pipeline
+from .retry import RetryPolicy
+from .serialization import Serializer, get_serializer
+from .tokens import TokenPool
+from .typeahead import AsyncSuggestSession, PrefixCache
+from .singleflight import AsyncSingleFlight
+from .request_objects import RealtyObject, RealtyObjectBatch, RealtyOwner, RiskRequest
+from .tracking import AsyncOrderTracker
+
+__all__ = ["AsyncRealtycloud", "RealtyObject", "RealtyObjectBatch", "RealtyOwner", "RiskRequest"]
+
+
+class ClientBase(BaseClient):
+    """Базовый класс для асинхронного API клиента."""
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        client: Optional[AsyncClient] = None,
+        cache: Optional[BaseCache] = None,
+        single_flight: Optional[AsyncSingleFlight] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        serializer: Optional[Serializer] = None,
+        models: bool = False,
+        token_pool: Optional[TokenPool] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        timeouts: Optional[Mapping[str, TimeoutValue]] = None,
+        index: Optional[CadastralIndex] = None,
+        cache_ttls: Optional[Mapping[str, Optional[float]]] = None,
+    ):
+        self._base_url = base_url
+        self._timeout = endpoint_timeout(self.ENDPOINT, timeouts)
+        self._cache_ttl = cache_ttl(self.ENDPOINT, cache_ttls)
+        self._serializer = serializer or get_serializer()
+        self._models = models
+        self._token_pool = token_pool
+        self._instrumentation = instrumentation
+        self._cache = cache
+        self._index = index
+        self._single_flight = single_flight
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        # Клиент, переданный снаружи, принадлежит фасаду и закрывается им
+        self._owns_client = client is None
+        if client is None:
+            client = AsyncClient(headers=self._build_headers(token))
+        self._client = client
+
+    async def __aenter__(self) -> "ClientBase":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Закрыть сетевые соединения."""
+        if self._owns_client:
+            await self._client.aclose()
+
+    @staticmethod
+    async def _blocking(fn: Callable[..., Any], *args: Any) -> Any:
+        """Выполнить блокирующий вызов (файл SQLite) в пуле потоков, не занимая цикл событий."""
+        return await asyncio.get_running_loop().run_in_executor(None, partial(fn, *args))
+
+    async def _get(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        timeout: Optional[TimeoutValue] = None,
+    ) -> Dict[str, Any]:
+        """GET-запрос к API Realtycloud."""
+        cache_key = self._cache_key(url, params)
+        if cache_key is not None:
+            if self._cache.blocking:
+                cached = await self._blocking(self._cache.get, cache_key)
+            else:
+                cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if self._single_flight is None:
+            return await self._send_get(url, params, timeout, cache_key)
+        return await self._single_flight.do(
+            self._flight_key(url, params),
+            partial(self._send_get, url, params, timeout, cache_key),
+        )
+
+    async def _send_get(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        timeout: Optional[TimeoutValue],
+        cache_key: Optional[str],
+    ) -> Dict[str, Any]:
+        """Выполнить GET-запрос и сохранить ответ в кэш."""
+        response = await self._request(
+            "GET", url, idempotent=True, params=params, timeout=timeout
+        )
+        result = self._decode(response)
+        if cache_key is not None:
+            if self._cache.blocking:
+                await self._blocking(self._cache.set, cache_key, result, self._cache_ttl)
+            else:
+                self._cache.set(cache_key, result, self._cache_ttl)
+        return result
+
+    async def _post(
+        self,
+        url: str,
+        data: Union[Dict[str, Any], bytes],
+        timeout: Optional[TimeoutValue] = None,
+        idempotent: bool = False,
+    ) -> Dict[str, Any]:
+        """POST-запрос к API Realtycloud; data может быть уже закодированным JSON."""
+        headers = {}
+        policy = self._retry_policy
+        if not idempotent and policy is not None and policy.idempotency_key_header:
+            # Один ключ на все попытки: повтор не создаст заказ повторно
+            headers[policy.idempotency_key_header] = uuid.uuid4().hex
+            idempotent = True
+        response = await self._request(
+            "POST",
+            url,
+            idempotent=idempotent,
+            headers=headers,
+            content=self._encode(data),
+            timeout=timeout,
+        )
+        return self._decode(response)
+
+    async def _request(
+        self, method: str, url: str, idempotent: bool, **kwargs
+    ) -> Response:
+        """Запрос к API Realtycloud с повторами по политике retry_policy."""
+        started = time.monotonic()
+        deadline = current_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await self._send(method, url, attempt, **kwargs)
+            except RealtycloudException as e:
+                if deadline is not None:
+                    stop = self._deadline_error(deadline, e)
+                    if stop is not None:
+                        raise stop
+                if self._retry_policy is None:
+                    raise
+                delay = self._retry_delay(e, attempt, started, idempotent)
+                if delay is None:
+                    raise
+                if deadline is not None and not deadline.allows(delay):
+                    raise RealtycloudDeadlineExceededException(
+                        "Повтор запроса не укладывается в срок выполнения вызова."
+                    ) from e
+                if self._instrumentation is not None:
+                    self._instrumentation.on_retry(self.ENDPOINT, attempt, delay, e)
+            if deadline is None:
+                await asyncio.sleep(delay)
+            else:
+                await deadline.asleep(delay)
+
+    async def _send(
+        self, method: str, url: str, attempt: int = 1, **kwargs
+    ) -> Response:
+        """Одна попытка запроса к API Realtycloud."""
+        token, delay = self._reserve_token()
+        if self._rate_limiter is not None:
+            delay = max(delay, self._rate_limiter.reserve(self.ENDPOINT))
+        if delay > 0:
+            deadline = current_deadline()
+            if deadline is None:
+                await asyncio.sleep(delay)
+            elif not deadline.allows(delay):
+                deadline.check()
+                raise RealtycloudDeadlineExceededException(
+                    "Ожидание токена или лимита частоты не укладывается в срок выполнения вызова."
+                )
+            else:
+                await deadline.asleep(delay)
+        event = None
+        if self._instrumentation is not None:
+            event, kwargs = self._start_event(method, url, attempt, kwargs, True)
+        try:
+            request = self._client.request(
+                method,
+                self._build_url(url),
+                **self._request_options(self._with_token(kwargs, token), True),
+            )
+            deadline = current_deadline()
+            remaining = deadline.remaining() if deadline is not None else None
+            if remaining is None:
+                response = await request
+            else:
+                # Общий срок запроса: таймауты httpx ограничивают только отдельные операции
+                try:
+                    response = await asyncio.wait_for(request, remaining)
+                except asyncio.TimeoutError:
+                    raise RealtycloudDeadlineExceededException(
+                        "Истек срок выполнения вызова."
+                    )
+        except TransportError as e:
+            error = self._transport_error(e)
+            if event is not None:
+                self._end_event(event, None, error)
+            raise error from e
+        except RealtycloudException as e:
+            # Отмена или истечение срока Deadline
+            if event is not None:
+                self._end_event(event, None, e)
+            raise
+        if not response.is_success:
+            try:
+                self._raise_api_error(response, token)
+            except RealtycloudException as e:
+                if event is not None:
+                    self._end_event(event, response, e)
+                raise
+        if event is not None:
+            self._end_event(event, response, None)
+        if self._rate_limiter is not None:
+            self._rate_limiter.reward(self.ENDPOINT)
+        return response
+
+    def _send_batched(
+        self,
+        product_name: str,
+        send: Callable[[List[Any]], Awaitable[Optional[Dict]]],
+        requests: Union[Iterable[Any], AsyncIterable[Any]],
+        batch_size: int,
+        max_in_flight: int,
+        journal: Optional[OrderJournal],
+        job: Optional[str],
+        dedup: Union[bool, KeySet, DiskKeySet],
+        identity: Callable[[Any], Tuple[Hashable, Any]] = object_identity,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Отправить заказ партиями, объединяя повторы и пропуская уже заказанные
+        по журналу объекты. При dedup send получает партии уже без повторов;
+        у каждого объекта остается ключ его первого вхождения.
+        """
+        deduplicator = None
+        if dedup is not False:
+            deduplicator = Deduplicator(
+                product_name, None if dedup is True else dedup, identity
+            )
+            if hasattr(requests, "__aiter__"):
+                requests = deduplicator.aunique(requests)
+            else:
+                requests = deduplicator.unique(requests)
+        if journal is not None:
+            skipped = deduplicator.skip if deduplicator is not None else None
+            if hasattr(requests, "__aiter__"):
+                requests = journal.aunordered(product_name, requests, skipped)
+            else:
+                requests = journal.unordered(product_name, requests, skipped)
+            send = journal.journaled_async(send, product_name, job)
+        results = send_batches_async(
+            send, requests, batch_size=batch_size, max_in_flight=max_in_flight
+        )
+        return results if deduplicator is None else deduplicator.aresults(results)
+
+
+class HouseClient(ClientBase):
+    """Асинхронный клиент API Realtycloud получения информации по дому"""
+
+    PATH = "/property/info/house_details_new"
+    ENDPOINT = "house"
+
+    def __init__(
+        self,
+        token: str,
+        client: Optional[AsyncClient] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
+
+    async def house_details(self, address: str) -> List[Dict]:
+        """Получение информации о доме по адресу"""
+        params = {"address": address}
+        response = await self._get("", params)
+        if self._models:
+            return [House(item) for item in response.get("data", [])]
+        return response.get("data", [])
+
+
+class SuggestClient(ClientBase):
+    """Асинхронный клиент API Realtycloud поиска кадастровых номеров по адресу"""
+
+    PATH = "/search"
+    ENDPOINT = "search"
+
+    def __init__(
+        self,
+        token: str,
+        client: Optional[AsyncClient] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
+
+    async def suggest(self, query: str) -> List[Dict]:
+        """Получение предложений по заданному запросу."""
+        items = (
+            await self._blocking(self._index.search_items, query)
+            if self._index is not None
+            else None
+        )
+        if items is None:
+            params = {"query": query}
+            response = await self._get("", params)
+            items = response.get("data", [])
+            if self._index is not None:
+                await self._blocking(self._index.record_search, query, items)
+        if self._models:
+            return [SuggestItem(item) for item in items]
+        return [
+            {
+                "object_type": item.get("ObjectType"),
+                "number": item.get("Number"),
+                "address": item.get("Address"),
+                "area": item.get("Area"),
+                "cadastral_price": item.get("kad_price"),
+                "status": item.get("Status"),
+            }
+            for item in items
+        ]
+
+
+class SimpleSuggestClient(ClientBase):
+    """Асинхронный клиент API Realtycloud для получения подсказок"""
+
+    PATH = "/dadata/"
+    ENDPOINT = "dadata"
+
+    def __init__(
+        self,
+        token: str,
+        client: Optional[AsyncClient] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
+
+    async def suggest_parties(self, count: int, query: str) -> List[Dict]:
+        """Получение списка компаний по заданному запросу."""
+        params = {"count": count, "query": query}
+        response = await self._get("suggest_parties", params)
+        return response.get("data", [])
+
+    async def suggest_addresses(self, count: int, query: str) -> List[Dict]:
+        """Получение списка адресов по заданному запросу."""
+        params = {"count": count, "query": query}
+        response = await self._get("suggest", params)
+        return response.get("data", [])
+
+
+class InfoClient(ClientBase):
+    """Асинхронный клиент API Realtycloud получения информации по кадастровому номеру"""
+
+    PATH = "/objectFull"
+    ENDPOINT = "objectFull"
+
+    def __init__(
+        self,
+        token: str,
+        client: Optional[AsyncClient] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
+
+    async def info(self, query: str) -> List[Dict]:
+        """Получение информации по кадастровому номеру"""
+        query = str(query.strip())
+        data = (
+            await self._blocking(self._index.info, query) if self._index is not None else None
+        )
+        if data is not None:
+            response = {"data": data}
+        else:
+            response = await self._get(f"/{query}", {})
+            if self._index is not None and response.get("data"):
+                await self._blocking(self._index.record_info, query, response["data"])
+        if self._models:
+            return ObjectInfo(response, "data")
+        return response.get("data", {})
+
+
+class EGRNClient(ClientBase):
+    """Асинхронный клиент API Realtycloud EGRN"""
+
+    PATH = "/order"
+    ENDPOINT = "order"
+    PRODUCT_NAMES = {
+        "object": "EgrnObject",
+        "object_priority": "EgrnObjectFast",
+        "right_list": "EgrnRightList",
+        "right_list_priority": "EgrnRightListFast",
+    }
+
+    def __init__(
+        self,
+        token: str,
+        client: Optional[AsyncClient] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
+
+    def _product_name(self, kind: str, priority: bool) -> str:
+        """Название продукта с учетом срочности заказа."""
+        return self.PRODUCT_NAMES[f"{kind}_priority" if priority else kind]
+
+    async def _post_request(
+        self,
+        product_name: str,
+        items: Union[List[RealtyObject], RealtyObjectBatch],
+        dedup: bool = True,
+    ) -> Optional[Dict]:
+        """
+        POST-запрос для заданных предметов.
+
+        При dedup повторы (по каноническому ключу) заказываются один раз под
+        ключом первого вхождения: позиция из ответа раздается всем одинаковым
+        запросам.
+        """
+        positions = None
+        if dedup:
+            items, positions = collapse(items)
+        if isinstance(items, RealtyObjectBatch):
+            data = items.to_json(product_name)
+        else:
+            data = {"order_items": [item.to_dict(product_name) for item in items]}
+        response = await self._post("", data)
+        return self._order_data(expand_response(response, positions))
+
+    async def fetch_single_object(
+        self, request: RealtyObject, **kwargs
+    ) -> Optional[Dict]:
+        """Получить объект с заданным запросом."""
+        product_name = self._product_name("object", kwargs.get("priority", False))
+        return await self._post_request(product_name, [request])
+
+    async def fetch_multiple_objects(
+        self, requests: List[RealtyObject], **kwargs
+    ) -> Optional[Dict]:
+        """Получить несколько объектов, позволяя использовать необязательные адреса."""
+        product_name = self._product_name("object", kwargs.get("priority", False))
+        return await self._post_request(
+            product_name, requests, dedup=kwargs.get("dedup", True) is not False
+        )
+
+    async def fetch_single_right_list(
+        self, request: RealtyObject, **kwargs
+    ) -> Optional[Dict]:
+        """Получить список прав с заданным ключом и необязательным адресом."""
+        product_name = self._product_name("right_list", kwargs.get("priority", False))
+        return await self._post_request(product_name, [request])
+
+    async def fetch_multiple_right_lists(
+        self, requests: List[RealtyObject], **kwargs
+    ) -> Optional[Dict]:
+        """Получить несколько списков прав, позволяя использовать необязательные адреса."""
+        product_name = self._product_name("right_list", kwargs.get("priority", False))
+        return await self._post_request(
+            product_name, requests, dedup=kwargs.get("dedup", True) is not False
+        )
+
+    def fetch_objects_batched(
+        self,
+        requests: Union[Iterable[RealtyObject], AsyncIterable[RealtyObject]],
+        batch_size: int = settings.ORDER_BATCH_SIZE,
+        max_in_flight: int = settings.ORDER_MAX_IN_FLIGHT,
+        journal: Optional[OrderJournal] = None,
+        job: Optional[str] = None,
+        dedup: Union[bool, KeySet, DiskKeySet] = True,
+        **kwargs,
+    ) -> AsyncIterator[BatchResult]:
+        """Заказать объекты партиями, возвращая результаты партий по мере готовности."""
+        product_name = self._product_name("object", kwargs.get("priority", False))
+        return self._send_batched(
+            product_name,
+            partial(self._post_request, product_name, dedup=False),
+            requests,
+            batch_size,
+            max_in_flight,
+            journal,
+            job,
+            dedup,
+        )
+
+    def fetch_right_lists_batched(
+        self,
+        requests: Union[Iterable[RealtyObject], AsyncIterable[RealtyObject]],
+        batch_size: int = settings.ORDER_BATCH_SIZE,
+        max_in_flight: int = settings.ORDER_MAX_IN_FLIGHT,
+        journal: Optional[OrderJournal] = None,
+        job: Optional[str] = None,
+        dedup: Union[bool, KeySet, DiskKeySet] = True,
+        **kwargs,
+    ) -> AsyncIterator[BatchResult]:
+        """Заказать списки прав партиями, возвращая результаты партий по мере готовности."""
+        product_name = self._product_name("right_list", kwargs.get("priority", False))
+        return self._send_batched(
+            product_name,
+            partial(self._post_request, product_name, dedup=False),
+            requests,
+            batch_size,
+            max_in_flight,
+            journal,
+            job,
+            dedup,
+        )
+
+    async def fetch_multiple_full_data(
+        self, requests: List[RealtyObject], **kwargs
+    ) -> Optional[Dict]:
+        """Получить полные данные для объектов и их прав с заданными ключами и необязательными адресами."""
+        priority = kwargs.get("priority", False)
+        product_name_object = self._product_name("object", priority)
+        product_name_right_list = self._product_name("right_list", priority)
+        requests, positions = collapse(requests)
+        order_items = []
+        for request in requests:
+            order_items.append(request.to_dict(product_name_object))
+            order_items.append(request.to_dict(product_name_right_list))
+        if positions is not None:
+            # На каждый объект в ответе две позиции: характеристики и права
+            positions = [2 * position + part for position in positions for part in (0, 1)]
+        response = await self._post("", {"order_items": order_items})
+        return self._order_data(expand_response(response, positions))
+
+
+class RiskClient(ClientBase):
+    """Асинхронный клиент API риска Realtycloud."""
+
+    PATH = "/order"
+    ENDPOINT = "order"
+
+    def __init__(
+        self,
+        token: str,
+        client: Optional[AsyncClient] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
+
+    def _product_name(self, priority: bool) -> str:
+        """Название продукта оценки риска с учетом срочности заказа."""
+        return "RiskAssessmentFastV2" if priority else "RiskAssessmentV2"
+
+    async def _post_risk(
+        self, product_name: str, requests: List[RiskRequest]
+    ) -> Optional[Dict]:
+        """POST-запрос оценки риска для заданных запросов."""
+        data = {"order_items": [request.to_dict(product_name) for request in requests]}
+        response = await self._post("", data)
+        return self._order_data(response)
+
+    async def fetch_risk_assessment_for_individual(
+        self, object: RealtyObject, owners: List[RealtyOwner] = None, **kwargs
+    ) -> Optional[Dict]:
+        """Получить оценку риска для физического лица."""
+        _, request = risk_identity(RiskRequest(object, owners))
+        product_name = self._product_name(kwargs.get("priority", False))
+        return await self._post_risk(product_name, [request])
+
+    def fetch_risk_assessments_batched(
+        self,
+        requests: Union[
+            Iterable[Union[RiskRequest, Tuple[RealtyObject, List[RealtyOwner]]]],
+            AsyncIterable[Union[RiskRequest, Tuple[RealtyObject, List[RealtyOwner]]]],
+        ],
+        batch_size: int = settings.ORDER_BATCH_SIZE,
+        max_in_flight: int = settings.ORDER_MAX_IN_FLIGHT,
+        journal: Optional[OrderJournal] = None,
+        job: Optional[str] = None,
+        dedup: Union[bool, KeySet, DiskKeySet] = True,
+        **kwargs,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Заказать оценки риска партиями, возвращая результаты партий по мере готовности.
+
+        requests - RiskRequest или пары (объект, владельцы). Повтором считается
+        тот же объект с тем же набором владельцев.
+        """
+        product_name = self._product_name(kwargs.get("priority", False))
+        if hasattr(requests, "__aiter__"):
+            requests = _arisk_requests(requests)
+        else:
+            requests = map(RiskRequest.coerce, requests)
+        return self._send_batched(
+            product_name,
+            partial(self._post_risk, product_name),
+            requests,
+            batch_size,
+            max_in_flight,
+            journal,
+            job,
+            dedup,
+            risk_identity,
+        )
+
+
+async def _arisk_requests(
+    requests: AsyncIterable[Union[RiskRequest, Tuple[RealtyObject, List[RealtyOwner]]]],
+) -> AsyncIterator[RiskRequest]:
+    async for request in requests:
+        yield RiskRequest.coerce(request)
+
+
+class StatusClient(ClientBase):
+    """Асинхронный клиент API статуса Realtycloud."""
+
+    PATH = "/orders"
+    ENDPOINT = "orders"
+
+    def __init__(
+        self,
+        token: str,
+        client: Optional[AsyncClient] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
+
+    async def fetch_status(
+        self, order_item_ids: List[str], offset: int = 0, limit: int = 1000
+    ) -> Optional[Dict]:
+        """Получить статус по заданным идентификаторам заказа."""
+        if not order_item_ids:
+            order_item_ids = []
+        data = {"order_item_ids": order_item_ids, "offset": offset, "limit": limit}
+        response = await self._post("", data, idempotent=True)
+        if self._models:
+            return [StatusItem(item) for item in response.get("data") or []]
+        return response.get("data")
+
+
+class AsyncRealtycloud:
+    """Асинхронный клиент API Realtycloud."""
+
+    def __init__(
+        self,
+        token: Union[str, TokenPool],
+        limits: Optional[Limits] = None,
+        http2: bool = False,
+        api_url: str = settings.API_URL,
+        cache: Optional[BaseCache] = None,
+        single_flight: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        serializer: Optional[Serializer] = None,
+        models: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        timeouts: Optional[Mapping[str, TimeoutValue]] = None,
+        index: Optional[CadastralIndex] = None,
+        cache_ttls: Optional[Mapping[str, Optional[float]]] = None,
+    ):
+        # Адрес API: только на него загрузчик отчетов отправляет API-Key
+        self._api_url = api_url
+        # Пул токенов: справочные методы распределяются между аккаунтами,
+        # а заказы, статусы и загрузки идут от основного токена
+        self.token_pool = token if isinstance(token, TokenPool) else None
+        if self.token_pool is not None:
+            token = self.token_pool.primary
+        # Один пул соединений на все клиенты: прогретые соединения к API
+        # переиспользуются между поиском, заказами и проверкой статусов
+        self._client = AsyncClient(
+            **build_client_options(token, limits=limits, http2=http2)
+        )
+        options = {
+            "token": token,
+            "client": self._client,
+            "api_url": api_url,
+            "cache": cache,
+            # Одинаковые одновременные запросы разделяют один ответ
+            "single_flight": AsyncSingleFlight() if single_flight else None,
+            "rate_limiter": rate_limiter,
+            "retry_policy": retry_policy or RetryPolicy(),
+            "serializer": serializer or get_serializer(),
+            "models": models,
+            "token_pool": self.token_pool,
+            "instrumentation": instrumentation,
+            # Таймауты этапов запроса по семействам методов вместо settings.TIMEOUT_PROFILES
+            "timeouts": timeouts,
+            # Локальный индекс кадастровых номеров для suggest и info
+            "index": index,
+            # Сроки жизни кэша по семействам методов вместо settings.CACHE_TTL_SEC
+            "cache_ttls": cache_ttls,
+        }
+        self._egrn_client = EGRNClient(**options)
+        self._suggest_client = SuggestClient(**options)
+        self._simple_suggest_client = SimpleSuggestClient(**options)
+        self._house_client = HouseClient(**options)
+        self._info_client = InfoClient(**options)
+        self._risk_client = RiskClient(**options)
+        self._status_client = StatusClient(**options)
+        # Кэши префиксов подсказок, общие для всех сессий автодополнения
+        prefix_ttl = cache_ttl("dadata", cache_ttls)
+        self._prefix_caches = {
+            "addresses": PrefixCache(ttl=prefix_ttl),
+            "parties": PrefixCache(ttl=prefix_ttl),
+        }
+
+    async def __aenter__(self) -> "AsyncRealtycloud":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Закрыть общий пул соединений."""
+        await self._client.aclose()
+
+    async def suggest(self, query: str, **kwargs) -> List[Dict]:
+        """Запрос на получение списка кадастровых номеров по адресу"""
+        return await self._suggest_client.suggest(query=query, **kwargs)
+
+    async def suggest_addresses(self, count: int, query: str, **kwargs) -> List[Dict]:
+        """Запрос на получение подсказок адресов"""
+        return await self._simple_suggest_client.suggest_addresses(
+            count=count, query=query, **kwargs
+        )
+
+    async def suggest_parties(self, count: int, query: str, **kwargs) -> List[Dict]:
+        """Запрос на получение подсказок по организациям"""
+        return await self._simple_suggest_client.suggest_parties(
+            count=count, query=query, **kwargs
+        )
+
+    def suggest_session(self, kind: str = "addresses", **kwargs) -> AsyncSuggestSession:
+        """
+        Сессия подсказок для поля ввода с автодополнением.
+
+        kind - "addresses" (suggest_addresses) или "parties" (suggest_parties).
+        Параметры count, min_length, fetch_count, debounce и cache передаются
+        в AsyncSuggestSession; по умолчанию сессии одного клиента разделяют кэш
+        префиксов. Перекрытые новым текстом вызовы query() возвращают None,
+        а их запросы к API отменяются.
+        """
+        fetch = {
+            "addresses": self.suggest_addresses,
+            "parties": self.suggest_parties,
+        }[kind]
+        kwargs.setdefault("cache", self._prefix_caches[kind])
+        return AsyncSuggestSession(fetch, **kwargs)
+
+    async def info(self, query: str, **kwargs) -> List[Dict]:
+        """Запрос на получение информации по кадастровому номеру"""
+        return await self._info_client.info(query=query, **kwargs)
+
+    async def house_details(self, query: str, **kwargs) -> List[Dict]:
+        """Запрос на получение информации о дому по адресу"""
+        return await self._house_client.house_details(address=query, **kwargs)
+
+    async def order_single_object(
+        self, request: RealtyObject, **kwargs
+    ) -> Optional[Dict]:
+        """Запрос на отчет о характеристиках объекта недвижимости"""
+        return await self._egrn_client.fetch_single_object(request, **kwargs)
+
+    async def order_multiple_objects(
+        self, requests: List[RealtyObject], **kwargs
+    ) -> Optional[Dict]:
+        """Запрос на оптовые отчеты о характеристиках объектов недвижимости"""
+        return await self._egrn_client.fetch_multiple_objects(requests, **kwargs)
+
+    async def order_single_right_list(
+        self, request: RealtyObject, **kwargs
+    ) -> Optional[Dict]:
+        """Запрос на отчет о переходе прав объекта недвижимости"""
+        return await self._egrn_client.fetch_single_right_list(request, **kwargs)
+
+    async def order_multiple_right_lists(
+        self, requests: List[RealtyObject], **kwargs
+    ) -> Optional[Dict]:
+        """Запрос на оптовые отчеты о переходе прав объектов недвижимости"""
+        return await self._egrn_client.fetch_multiple_right_lists(requests, **kwargs)
+
+    def order_objects_batched(
+        self, requests: Union[Iterable[RealtyObject], AsyncIterable[RealtyObject]], **kwargs
+    ) -> AsyncIterator[BatchResult]:
+        """Оптовый заказ отчетов о характеристиках объектов партиями"""
+        return self._egrn_client.fetch_objects_batched(requests, **kwargs)
+
+    def order_right_lists_batched(
+        self, requests: Union[Iterable[RealtyObject], AsyncIterable[RealtyObject]], **kwargs
+    ) -> AsyncIterator[BatchResult]:
+        """Оптовый заказ отчетов о переходе прав объектов партиями"""
+        return self._egrn_client.fetch_right_lists_batched(requests, **kwargs)
+
+    async def order_single_full_data(
+        self, request: RealtyObject, **kwargs
+    ) -> Optional[Dict]:
+        """Запрос на отчет о характеристиках и переходе прав объектов недвижимости"""
+        return await self._egrn_client.fetch_multiple_full_data([request], **kwargs)
+
+    async def order_multiple_full_data(
+        self, requests: List[RealtyObject], **kwargs
+    ) -> Optional[Dict]:
+        """Запрос на оптовые отчеты о характеристиках и переходе прав объектов недвижимости"""
+        return await self._egrn_client.fetch_multiple_full_data(requests, **kwargs)
+
+    async def order_risk_assessment_for_individual(
+        self, object: RealtyObject, owners: List[RealtyOwner] = None, **kwargs
+    ) -> Optional[Dict]:
+        """Запрос оценки рисков собственников, связанных с объектом недвижимости"""
+        return await self._risk_client.fetch_risk_assessment_for_individual(
+            object, owners=owners, **kwargs
+        )
+
+    def order_risk_assessments_batched(
+        self,
+        requests: Union[
+            Iterable[Union[RiskRequest, Tuple[RealtyObject, List[RealtyOwner]]]],
+            AsyncIterable[Union[RiskRequest, Tuple[RealtyObject, List[RealtyOwner]]]],
+        ],
+        **kwargs,
+    ) -> AsyncIterator[BatchResult]:
+        """Оптовый заказ оценок рисков собственников партиями"""
+        return self._risk_client.fetch_risk_assessments_batched(requests, **kwargs)
+
+    async def check_status(
+        self, order_item_ids: List[str], offset: int = 0, limit: int = 1000, **kwargs
+    ):
+        """
+        Проверка статусов заказов по order_item_id.
+
+        Подробности о статусах и интервале опроса см. в Realtycloud.check_status.
+        """
+        return await self._status_client.fetch_status(
+            order_item_ids=order_item_ids, offset=offset, limit=limit, **kwargs
+        )
+
+    def track_orders(self, order_item_ids: Iterable[str] = (), **kwargs) -> AsyncOrderTracker:
+        """
+        Отслеживание статусов множества заказов с соблюдением интервала опроса.
+
+        Параметры опроса (poll_interval, max_interval, backoff_factor и др.)
+        передаются в AsyncOrderTracker.
+        """
+        return AsyncOrderTracker(self.check_status, order_item_ids, **kwargs)
+
+    def resume_orders(
+        self, journal: OrderJournal, job: Optional[str] = None, **kwargs
+    ) -> AsyncOrderTracker:
+        """
+        Продолжить отслеживание незавершенных позиций заказов из журнала.
+
+        Позиции, уже получившие итоговый статус, не опрашиваются; новые статусы
+        дописываются в журнал.
+        """
+        return AsyncOrderTracker(
+            self.check_status,
+            journal.pending_order_item_ids(job),
+            journal=journal,
+            **kwargs,
+        )
+
+    def downloader(self, **kwargs) -> AsyncReportDownloader:
+        """Загрузчик файлов отчетов, использующий общий пул соединений клиента."""
+        kwargs.setdefault("api_url", self._api_url)
+        return AsyncReportDownloader(self._client, **kwargs)
+
+    def download_reports(
+        self, status_items: Iterable[Dict], directory: str, **kwargs
+    ) -> AsyncIterator[DownloadResult]:
+        """
+        Потоковая загрузка файлов готовых отчетов (file_pdf_url, file_signed_zip_url)
+        из ответа check_status в каталог directory.
+
+        Параметры chunk_size, max_parallel и timeout передаются в AsyncReportDownloader.
+        """
+        return self.downloader(**kwargs).download_reports(status_items, directory)
+
+    def report_pipeline(
+        self,
+        addresses: Union[Iterable[str], AsyncIterable[str]],
+        directory: str,
+        **kwargs,
+    ) -> AsyncPipeline:
+        """
+        Потоковый конвейер «адрес → отчет»: поиск, информация об объекте, заказ,
+        ожидание статуса и загрузка файлов отчета в каталог directory.
+
+        Параметры конкурентности стадий и трекера передаются в report_pipeline.
+        """
+        return report_pipeline(self, addresses, directory, **kwargs)
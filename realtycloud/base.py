@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+from httpx import (
+    ConnectError,
+    ConnectTimeout,
+    Limits,
+    PoolTimeout,
+    Response,
+    Timeout,
+    TransportError,
+)
+
+from realtycloud import settings
+from .cache import make_cache_key
+from .cadastral_index import CadastralIndex
+from .deadline import Deadline, as_timeout, current_deadline
+from .ratelimit import retry_after_seconds
+from .instrumentation import Instrumentation, RequestEvent, trace_extension
+from .models import LazyDocument, Order
+from .serialization import Serializer
+from .tokens import TokenPool
+from .exceptions import (
+    RealtycloudBadRequestException,
+    RealtycloudForbiddenException,
+    RealtycloudNotFoundException,
+    RealtycloudServerErrorException,
+    RealtycloudInvalidKeyException,
+    RealtycloudFieldErrorException,
+    RealtycloudRequestLimitExceededException,
+    RealtycloudAPIStatusException,
+    RealtycloudCancelledException,
+    RealtycloudDeadlineExceededException,
+    RealtycloudException,
+    RealtycloudTransportException,
+)
+
+
+def default_limits() -> Limits:
+    """Ограничения пула соединений по умолчанию."""
+    return Limits(
+        max_connections=settings.POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.POOL_KEEPALIVE_EXPIRY_SEC,
+    )
+
+
+def build_client_options(
+    token: str, limits: Optional[Limits] = None, http2: bool = False
+) -> Dict[str, Any]:
+    """Параметры httpx-клиента, общего для всех клиентов фасада."""
+    return {
+        "headers": BaseClient._build_headers(token),
+        "limits": limits or default_limits(),
+        "http2": http2,
+    }
+
+
+class BaseClient:
+    """Общая логика синхронного и асинхронного клиентов API, не зависящая от транспорта."""
+
+    # Семейство методов API, по которому выбираются настройки запросов
+    ENDPOINT = ""
+
+    _serializer: Serializer
+    # Возвращать ли модели из models вместо словарей
+    _models = False
+    _token_pool: Optional[TokenPool] = None
+    _instrumentation: Optional[Instrumentation] = None
+    _index: Optional[CadastralIndex] = None
+    # Таймауты этапов запроса для семейства методов клиента
+    _timeout: Timeout
+
+    @staticmethod
+    def _build_headers(token: str) -> Dict[str, str]:
+        """Заголовки, отправляемые с каждым запросом."""
+        return {
+            "Content-type": "application/json",
+            "Accept": "application/json",
+            "API-Key": token,
+        }
+
+    def _build_url(self, url: str) -> str:
+        """Абсолютный адрес запроса относительно адреса клиента."""
+        if url.startswith(("http://", "https://")):
+            return url
+        return self._base_url + url
+
+    def _encode(self, data: Union[Dict[str, Any], bytes]) -> bytes:
+        """Тело запроса в JSON; уже закодированные байты передаются как есть."""
+        if isinstance(data, bytes):
+            return data
+        return self._serializer.dumps(data)
+
+    def _decode(self, response: Response) -> Any:
+        """Разбор JSON из ответа API; в режиме моделей разбор откладывается до обращения."""
+        if self._models:
+            return LazyDocument(response.content, self._serializer.loads)
+        if self._instrumentation is None:
+            return self._serializer.loads(response.content)
+        started = time.perf_counter()
+        result = self._serializer.loads(response.content)
+        self._instrumentation.on_decode(
+            self.ENDPOINT, time.perf_counter() - started, len(response.content)
+        )
+        return result
+
+    def _start_event(
+        self, method: str, url: str, attempt: int, kwargs: Dict[str, Any], asynchronous: bool
+    ) -> Tuple[RequestEvent, Dict[str, Any]]:
+        """Начать событие попытки запроса и добавить к параметрам сбор этапов соединения."""
+        event = RequestEvent(self.ENDPOINT, method, self._build_url(url), attempt)
+        content = kwargs.get("content")
+        event.request_bytes = len(content) if content else 0
+        if self._instrumentation.trace_phases:
+            kwargs = {
+                **kwargs,
+                "extensions": {"trace": trace_extension(event, asynchronous)},
+            }
+        self._instrumentation.on_request_start(event)
+        return event, kwargs
+
+    def _end_event(
+        self,
+        event: RequestEvent,
+        response: Optional[Response],
+        error: Optional[BaseException],
+    ) -> None:
+        """Завершить событие попытки запроса."""
+        if response is not None:
+            event.response_bytes = len(response.content)
+        event._finish(response.status_code if response is not None else None, error)
+        self._instrumentation.on_request_end(event)
+
+    def _request_options(
+        self, kwargs: Dict[str, Any], asynchronous: bool
+    ) -> Dict[str, Any]:
+        """Параметры запроса с таймаутами семейства методов, урезанными до срока Deadline."""
+        deadline = current_deadline()
+        timeout = kwargs.get("timeout")
+        if timeout is not None:
+            timeout = as_timeout(timeout)
+        elif deadline is not None:
+            timeout = deadline.scoped_timeout() or self._timeout
+        else:
+            timeout = self._timeout
+        if deadline is None:
+            return {**kwargs, "timeout": timeout}
+        extensions = kwargs.get("extensions") or {}
+        return {
+            **kwargs,
+            "timeout": deadline.clamp(timeout),
+            "extensions": {
+                **extensions,
+                "trace": deadline.trace(extensions.get("trace"), asynchronous),
+            },
+        }
+
+    @staticmethod
+    def _deadline_error(
+        deadline: Deadline, error: RealtycloudException
+    ) -> Optional[RealtycloudException]:
+        """Исключение отмены или истечения срока вместо ошибки попытки или None."""
+        if isinstance(
+            error, (RealtycloudCancelledException, RealtycloudDeadlineExceededException)
+        ):
+            return error
+        try:
+            deadline.check()
+        except RealtycloudException as e:
+            e.__cause__ = error
+            return e
+        return None
+
+    def _order_data(self, response: Mapping[str, Any]) -> Optional[Mapping[str, Any]]:
+        """Данные созданного заказа из ответа API: словарь или модель Order."""
+        if self._models:
+            return Order(response, "data")
+        return response.get("data")
+
+    def _cache_key(self, url: str, params: Dict[str, Any]) -> Optional[str]:
+        """Ключ кэша для GET-запроса или None, если ответ не кэшируется."""
+        if self._cache is None or self._cache_ttl is None:
+            return None
+        return make_cache_key(self._build_url(url), params)
+
+    def _flight_key(self, url: str, params: Dict[str, Any]) -> str:
+        """Ключ, по которому объединяются одинаковые одновременные GET-запросы."""
+        return make_cache_key(self._build_url(url), params)
+
+    @staticmethod
+    def _transport_error(error: TransportError) -> RealtycloudTransportException:
+        """Исключение пакета для сетевой ошибки httpx."""
+        return RealtycloudTransportException(
+            message=f"{error.__class__.__name__}: {error}",
+            request_sent=not isinstance(
+                error, (ConnectError, ConnectTimeout, PoolTimeout)
+            ),
+        )
+
+    def _reserve_token(self) -> Tuple[Optional[str], float]:
+        """Токен из пула для запроса и время ожидания; (None, 0) - использовать токен клиента."""
+        pool = self._token_pool
+        if pool is None or self.ENDPOINT not in pool.endpoints:
+            return None, 0.0
+        return pool.reserve()
+
+    @staticmethod
+    def _with_token(kwargs: Dict[str, Any], token: Optional[str]) -> Dict[str, Any]:
+        """Параметры запроса с заголовком API-Key выбранного токена."""
+        if token is None:
+            return kwargs
+        return {**kwargs, "headers": {**(kwargs.get("headers") or {}), "API-Key": token}}
+
+    def _raise_api_error(self, response: Response, token: Optional[str] = None) -> None:
+        """Возбудить исключение по ответу с ошибкой, сообщив ограничителю и пулу токенов."""
+        try:
+            self._handle_api_error(response)
+        except RealtycloudRequestLimitExceededException as e:
+            retry_after = retry_after_seconds(response)
+            if self._rate_limiter is not None:
+                self._rate_limiter.penalize(self.ENDPOINT, retry_after)
+            if token is not None:
+                self._token_pool.report_error(token, e, retry_after)
+            raise
+        except RealtycloudException as e:
+            if token is not None:
+                self._token_pool.report_error(token, e)
+            raise
+
+    def _retry_delay(
+        self, error: RealtycloudException, attempt: int, started: float, idempotent: bool
+    ) -> Optional[float]:
+        """Отсрочка перед повтором запроса или None, если повторять не нужно."""
+        pool = self._token_pool
+        if (
+            pool is not None
+            and self.ENDPOINT in pool.endpoints
+            and isinstance(
+                error,
+                (RealtycloudRequestLimitExceededException, RealtycloudForbiddenException),
+            )
+            and attempt < self._retry_policy.max_attempts
+            and pool.available()
+        ):
+            # Токен выведен из ротации, а другой готов принять запрос сразу
+            return 0.0
+        return self._retry_policy.next_delay(error, attempt, started, idempotent)
+
+    def _handle_api_error(self, response: Response) -> None:
+        """Обработка ошибок API и возбуждение соответствующих исключений."""
+        if response.status_code == 400:
+            raise RealtycloudBadRequestException.from_response(
+                response,
+                message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+            )
+        if response.status_code == 403:
+            raise RealtycloudForbiddenException.from_response(
+                response,
+                message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+            )
+        if response.status_code == 404:
+            raise RealtycloudNotFoundException.from_response(
+                response,
+                message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+            )
+        if response.status_code == 429:
+            raise RealtycloudRequestLimitExceededException.from_response(
+                response,
+                message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+            )
+        if response.status_code == 500:
+            try:
+                body = response.json()
+            except ValueError:
+                # Тело не JSON: HTML-страница прокси или пустой ответ
+                body = None
+            error_message = body.get("error") if isinstance(body, dict) else None
+            if not isinstance(error_message, str):
+                raise RealtycloudServerErrorException.from_response(
+                    response,
+                    message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+                )
+            if "невалидный ключ" in error_message:
+                raise RealtycloudInvalidKeyException.from_response(
+                    response,
+                    message="Неверный ключ",
+                )
+            elif "неверно указано поле" in error_message:
+                raise RealtycloudFieldErrorException.from_response(
+                    response,
+                    message="Неверно указано поле",
+                )
+            elif "вы превысили лимит использования поиска" in error_message:
+                raise RealtycloudRequestLimitExceededException.from_response(
+                    response,
+                    message="Превышен лимит использования поиска",
+                )
+            else:
+                raise RealtycloudServerErrorException.from_response(
+                    response,
+                    message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+                )
+        raise RealtycloudAPIStatusException.from_response(
+            response,
+            message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+        )
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from itertools import islice
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from realtycloud import settings
+from .request_objects import RealtyObjectBatch
+
+__all__ = ["BatchResult", "chunked", "send_batches", "send_batches_async"]
+
+
+class BatchResult:
+    """Результат отправки одной партии заказа."""
+
+    def __init__(
+        self,
+        index: int,
+        items: List[Any],
+        data: Optional[Dict] = None,
+        error: Optional[BaseException] = None,
+    ):
+        self.index = index
+        self.items = items
+        self.data = data or {}
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """Партия принята API."""
+        return self.error is None
+
+    @property
+    def order_items(self) -> List[Dict]:
+        """Позиции заказа из ответа API."""
+        return self.data.get("order_items", [])
+
+    @property
+    def order_item_ids(self) -> List[str]:
+        """Идентификаторы order_item_id позиций партии."""
+        return [item.get("order_item_id") for item in self.order_items]
+
+    def pairs(self) -> Iterator[Tuple[Any, Dict]]:
+        """Пары (объект запроса, позиция заказа) в порядке отправки."""
+        return zip(self.items, self.order_items)
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else repr(self.error)
+        return f"{self.__class__.__name__}(index={self.index}, size={len(self.items)}, {status})"
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Разбить итерируемый объект на списки не длиннее size, не загружая его целиком."""
+    if size < 1:
+        raise ValueError("Размер партии должен быть положительным числом.")
+    if isinstance(items, RealtyObjectBatch):
+        # Части коллекции остаются колоночными и сериализуются без словарей
+        yield from items.chunks(size)
+        return
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _send_one(
+    send: Callable[[List[Any]], Optional[Dict]], index: int, chunk: List[Any]
+) -> BatchResult:
+    """Отправить партию, сохранив ошибку в результате вместо возбуждения."""
+    try:
+        return BatchResult(index, chunk, data=send(chunk))
+    except Exception as e:
+        return BatchResult(index, chunk, error=e)
+
+
+def send_batches(
+    send: Callable[[List[Any]], Optional[Dict]],
+    items: Iterable[Any],
+    batch_size: int = settings.ORDER_BATCH_SIZE,
+    max_in_flight: int = settings.ORDER_MAX_IN_FLIGHT,
+) -> Iterator[BatchResult]:
+    """
+    Отправить элементы партиями по batch_size, не более max_in_flight одновременно.
+
+    Результаты возвращаются по мере готовности партий. Ошибка одной партии
+    сохраняется в BatchResult.error и не прерывает отправку остальных.
+    """
+    chunks = enumerate(chunked(items, batch_size))
+
+    def submit(executor: ThreadPoolExecutor, index: int, chunk: List[Any]) -> Future:
+        # Партии отправляются в контексте вызывающего, в том числе под его Deadline
+        return executor.submit(copy_context().run, _send_one, send, index, chunk)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        pending = set()
+        for index, chunk in islice(chunks, max_in_flight):
+            pending.add(submit(executor, index, chunk))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for index, chunk in islice(chunks, 1):
+                    pending.add(submit(executor, index, chunk))
+                yield future.result()
+
+
+async def _achunked(
+    items: Union[Iterable[Any], AsyncIterable[Any]], size: int
+) -> AsyncIterator[List[Any]]:
+    """Асинхронный аналог chunked, принимающий и обычные, и асинхронные итераторы."""
+    if not hasattr(items, "__aiter__"):
+        for chunk in chunked(items, size):
+            yield chunk
+        return
+    if size < 1:
+        raise ValueError("Размер партии должен быть положительным числом.")
+    chunk = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def send_batches_async(
+    send: Callable[[List[Any]], Awaitable[Optional[Dict]]],
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+    batch_size: int = settings.ORDER_BATCH_SIZE,
+    max_in_flight: int = settings.ORDER_MAX_IN_FLIGHT,
+) -> AsyncIterator[BatchResult]:
+    """Асинхронный аналог send_batches."""
+
+    async def send_one(index: int, chunk: List[Any]) -> BatchResult:
+        try:
+            return BatchResult(index, chunk, data=await send(chunk))
+        except Exception as e:
+            return BatchResult(index, chunk, error=e)
+
+    chunks = _achunked(items, batch_size)
+    pending = set()
+    index = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(send_one(index, chunk)))
+                index += 1
+            if not pending:
+                return
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from itertools import repeat, zip_longest
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Union
+
+from realtycloud import settings
+from .request_objects import RealtyObject, RealtyOwner
+from .validate import compiled
+
+__all__ = ["RowError", "BulkResult", "build_objects", "build_owners"]
+
+# Значение отсутствующей ячейки в колонках разной длины
+_MISSING = object()
+
+
+class RowError:
+    """Ошибка проверки одной строки входных данных."""
+
+    __slots__ = ("row", "field", "message")
+
+    def __init__(self, row: int, message: str, field: Optional[str] = None):
+        self.row = row
+        self.field = field
+        self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"row": self.row, "field": self.field, "message": self.message}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(row={self.row}, field={self.field}, message={self.message})"
+
+
+class BulkResult:
+    """Результат массовой проверки: корректные объекты и ошибки по строкам."""
+
+    def __init__(self):
+        self.valid: List[Any] = []
+        # Номера строк входных данных для каждого объекта из valid
+        self.rows: List[int] = []
+        self.errors: List[RowError] = []
+
+    @property
+    def ok(self) -> bool:
+        """Все строки прошли проверку."""
+        return not self.errors
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Отчет об ошибках в виде списка словарей."""
+        return [error.to_dict() for error in self.errors]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(valid={len(self.valid)}, errors={len(self.errors)})"
+
+
+def build_objects(
+    keys: Iterable[str], addresses: Optional[Iterable[Optional[str]]] = None
+) -> BulkResult:
+    """
+    Массовое создание RealtyObject из колонок ключей и адресов.
+
+    Проверки те же, что в RealtyObject, но шаблон компилируется один раз,
+    а некорректные строки попадают в BulkResult.errors вместо исключения.
+    Колонки разной длины не обрезаются: строка без адреса создается с пустым
+    адресом, а строка без ключа попадает в ошибки. Адрес None считается
+    пустым, а адрес другого типа, кроме строки, - ошибкой строки.
+    """
+    key_match = compiled(settings.OBJECT_KEY_REGEX).match
+    max_length = settings.MAX_ADDRESS_LENGTH
+    result = BulkResult()
+    valid, rows, errors = result.valid, result.rows, result.errors
+    if addresses is None:
+        pairs = zip(keys, repeat(""))
+    else:
+        pairs = zip_longest(keys, addresses)
+    for row, (key, address) in enumerate(pairs):
+        if address is None:
+            address = ""
+        if not isinstance(key, str) or not key_match(key):
+            errors.append(
+                RowError(
+                    row,
+                    f"Неверный object_key: {key}. Должен соответствовать регулярному выражению {settings.OBJECT_KEY_REGEX}.",
+                    "key",
+                )
+            )
+            continue
+        if not isinstance(address, str):
+            # Например, NaN из pandas на месте пустой ячейки
+            errors.append(
+                RowError(
+                    row,
+                    f"Адрес должен быть строкой, получено: {type(address).__name__}.",
+                    "address",
+                )
+            )
+            continue
+        if len(address) > max_length:
+            errors.append(
+                RowError(
+                    row, f"Адрес не может превышать {max_length} символов.", "address"
+                )
+            )
+            continue
+        valid.append(RealtyObject.from_validated(key, address))
+        rows.append(row)
+    return result
+
+
+def _rows_from_columns(columns: Mapping[str, Iterable[Any]]) -> Iterator[Dict[str, Any]]:
+    names = list(columns)
+    # Строки не теряются, если колонки разной длины: у коротких колонок
+    # поле не передается, и строка проверяется как неполная
+    for values in zip_longest(*(columns[name] for name in names), fillvalue=_MISSING):
+        yield {name: value for name, value in zip(names, values) if value is not _MISSING}
+
+
+def build_owners(
+    data: Union[Iterable[Mapping[str, Any]], Mapping[str, Iterable[Any]]]
+) -> BulkResult:
+    """
+    Массовое создание RealtyOwner из строк (словарей с аргументами RealtyOwner)
+    или из колонок (словаря «поле → значения»).
+
+    Даты рождения разбираются один раз для каждого уникального значения.
+    """
+    rows = _rows_from_columns(data) if isinstance(data, Mapping) else data
+    result = BulkResult()
+    for row, fields in enumerate(rows):
+        try:
+            owner = RealtyOwner(**fields)
+        except (TypeError, ValueError) as e:
+            result.errors.append(RowError(row, str(e)))
+            continue
+        result.valid.append(owner)
+        result.rows.append(row)
+    return result
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from realtycloud import settings
+
+__all__ = ["CacheStats", "BaseCache", "MemoryCache", "SqliteCache", "make_cache_key"]
+
+
+def normalize_value(value: Any) -> Any:
+    """Нормализация значения параметра запроса для ключа кэша."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def make_cache_key(url: str, params: Mapping[str, Any]) -> str:
+    """Ключ кэша для GET-запроса: адрес и отсортированные нормализованные параметры."""
+    normalized = sorted((name, normalize_value(value)) for name, value in params.items())
+    return json.dumps([url, normalized], ensure_ascii=False, separators=(",", ":"))
+
+
+def _json_default(value: Any) -> Any:
+    """Сериализация ленивых документов и моделей ответа при записи в файл кэша."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Объект типа {type(value).__name__} не сериализуется в JSON")
+
+
+class CacheStats:
+    """Счетчики обращений к кэшу."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля попаданий в кэш."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(hits={self.hits}, misses={self.misses}, "
+            f"evictions={self.evictions})"
+        )
+
+
+class BaseCache:
+    """
+    Базовый класс кэша ответов.
+
+    get возвращает копию сохраненного значения: изменение результата одного
+    вызова не меняет ни кэш, ни результаты других вызовов. blocking = True
+    означает, что обращение к кэшу блокируется на вводе-выводе (файл), и
+    асинхронный клиент выполняет его в пуле потоков.
+    """
+
+    blocking = False
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Значение по ключу или None, если его нет или срок жизни истек."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Сохранить значение на ttl секунд."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Удалить все значения."""
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+    """Кэш в памяти процесса с ограничением по сроку жизни и вытеснением LRU."""
+
+    def __init__(self, max_size: int = settings.CACHE_MAX_SIZE):
+        super().__init__()
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        # Копия: вызывающий код может изменить переданный ответ
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SqliteCache(BaseCache):
+    """Кэш в файле SQLite, сохраняющийся между перезапусками процесса."""
+
+    blocking = True
+
+    def __init__(self, path: str, max_size: int = settings.CACHE_MAX_SIZE):
+        super().__init__()
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)"
+        )
+        self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self) -> None:
+        """Закрыть файл кэша."""
+        with self._lock:
+            self._connection.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._connection.commit()
+                self.stats.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+            self.stats.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        encoded = json.dumps(value, ensure_ascii=False, default=_json_default)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, encoded, now + ttl, now),
+            )
+            excess = (
+                self._connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+                - self.max_size
+            )
+            if excess > 0:
+                self._connection.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                )
+                self.stats.evictions += excess
+            self._connection.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM cache")
+            self._connection.commit()
+
+
+def cache_ttl(
+    endpoint: str, overrides: Optional[Mapping[str, Optional[float]]] = None
+) -> Optional[float]:
+    """
+    Срок жизни кэша для семейства методов API: из overrides или
+    settings.CACHE_TTL_SEC; None - кэшировать нельзя.
+    """
+    if overrides and endpoint in overrides:
+        return overrides[endpoint]
+    ttls: Dict[str, float] = settings.CACHE_TTL_SEC
+    return ttls.get(endpoint)
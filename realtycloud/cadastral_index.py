@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from realtycloud import settings
+from .cache import CacheStats
+from .serialization import Serializer, get_serializer
+
+__all__ = ["CadastralIndex", "normalize_address"]
+
+_SCHEMA = (
+    # Сведения об объекте: поля из ответа search и полный ответ objectFull
+    "CREATE TABLE IF NOT EXISTS objects ("
+    "number TEXT PRIMARY KEY, object_type TEXT, address TEXT, area TEXT, "
+    "cadastral_price TEXT, status TEXT, updated_at REAL, "
+    "info BLOB, info_updated_at REAL)",
+    # Нормализованный адрес объекта -> кадастровые номера
+    "CREATE TABLE IF NOT EXISTS addresses ("
+    "address_key TEXT NOT NULL, number TEXT NOT NULL, "
+    "PRIMARY KEY (address_key, number)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS addresses_number ON addresses (number)",
+    # Нормализованный запрос search -> элементы ответа API как есть: повторный
+    # запрос отвечается чтением одной строки
+    "CREATE TABLE IF NOT EXISTS searches ("
+    "query_key TEXT PRIMARY KEY, items BLOB NOT NULL, updated_at REAL NOT NULL)",
+)
+
+# Поля сводки об объекте и их имена в ответе search
+_FIELDS = (
+    ("object_type", "ObjectType"),
+    ("number", "Number"),
+    ("address", "Address"),
+    ("area", "Area"),
+    ("cadastral_price", "kad_price"),
+    ("status", "Status"),
+)
+_NAMES = tuple(name for name, _ in _FIELDS)
+_COLUMNS = ", ".join(_NAMES)
+_SELECT_OBJECT = f"SELECT {_COLUMNS}, updated_at FROM objects WHERE number = ?"
+
+# Более новые сведения заменяют старые, пропущенные поля берутся из прежних
+_NEWER = "excluded.updated_at >= COALESCE(updated_at, 0)"
+_UPSERT = (
+    f"INSERT INTO objects ({_COLUMNS}, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (number) DO UPDATE SET "
+    + ", ".join(
+        f"{name} = CASE WHEN {_NEWER} THEN COALESCE(excluded.{name}, {name}) "
+        f"ELSE COALESCE({name}, excluded.{name}) END"
+        for name, _ in _FIELDS
+        if name != "number"
+    )
+    + f", updated_at = CASE WHEN {_NEWER} THEN excluded.updated_at ELSE updated_at END"
+)
+
+# Адресный индекс строится по адресу, который остался в objects после
+# upsert: прежний адрес номера удаляется, а адрес более старой записи,
+# не принятой upsert, не добавляется
+_DELETE_STALE_ADDRESSES = (
+    "DELETE FROM addresses WHERE number = ?1 AND address_key IS NOT "
+    "(SELECT address_key(address) FROM objects WHERE number = ?1)"
+)
+_INSERT_ADDRESS = (
+    "INSERT OR IGNORE INTO addresses (address_key, number) "
+    "SELECT address_key(address), number FROM objects "
+    "WHERE number = ? AND address_key(address) IS NOT NULL"
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_address(address: str) -> str:
+    """Ключ адреса: слова без регистра и знаков препинания, «ё» как «е»."""
+    return " ".join(_WORD.findall(address.casefold().replace("ё", "е")))
+
+
+def _address_key(address: Optional[str]) -> Optional[str]:
+    """Ключ адреса для SQL-функции address_key; пустой адрес не индексируется."""
+    return normalize_address(address) if address else None
+
+
+def _first(data: Mapping[str, Any], *names: str) -> Optional[Any]:
+    for name in names:
+        value = data.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class CadastralIndex:
+    """
+    Локальный индекс кадастровых номеров в файле SQLite.
+
+    Заполняется ответами search (suggest) и objectFull (info), если передан
+    клиенту: CadastralIndex хранит сведения об объекте по номеру (адрес,
+    площадь, кадастровая стоимость, статус, полный ответ objectFull),
+    нормализованный адрес объекта -> номера и ответы search по нормализованному
+    запросу. Повторные suggest и info отвечаются из индекса без обращения к API,
+    пока записи не старше max_age (секунды по семействам методов "search" и
+    "objectFull", по умолчанию settings.CADASTRAL_INDEX_MAX_AGE_SEC).
+
+    path=":memory:" - индекс в памяти процесса без сохранения между запусками.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        max_age: Optional[Mapping[str, float]] = None,
+        synchronous: str = settings.CADASTRAL_INDEX_SYNCHRONOUS,
+        serializer: Optional[Serializer] = None,
+    ):
+        self.path = path
+        self._serializer = serializer or get_serializer()
+        self.max_age: Dict[str, float] = {
+            **settings.CADASTRAL_INDEX_MAX_AGE_SEC,
+            **(max_age or {}),
+        }
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={synchronous}")
+        # Флаг deterministic поддерживается начиная с Python 3.8
+        options = {"deterministic": True} if sys.version_info >= (3, 8) else {}
+        self._connection.create_function("address_key", 1, _address_key, **options)
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        self._connection.commit()
+
+    def __enter__(self) -> "CadastralIndex":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+    def close(self) -> None:
+        """Закрыть файл индекса."""
+        with self._lock:
+            self._connection.close()
+
+    def _fresh(self, updated_at: Optional[float], endpoint: str) -> bool:
+        return updated_at is not None and time.time() - updated_at < self.max_age[endpoint]
+
+    def _count(self, found: bool) -> None:
+        if found:
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+
+    def lookup(self, number: str) -> Optional[Dict[str, Any]]:
+        """
+        Сведения об объекте в формате suggest и время обновления updated_at
+        или None, если номера нет в индексе. Свежесть не проверяется.
+        """
+        with self._lock:
+            row = self._connection.execute(_SELECT_OBJECT, (number.strip(),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(_NAMES + ("updated_at",), row))
+
+    def numbers_for_address(self, address: str) -> List[str]:
+        """Кадастровые номера объектов с адресом address (после нормализации)."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT number FROM addresses WHERE address_key = ? ORDER BY number",
+                (normalize_address(address),),
+            ).fetchall()
+        return [number for number, in rows]
+
+    def search_items(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Ответ search на запрос (элементы data) или None, если его нет или он устарел."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT items, updated_at FROM searches WHERE query_key = ?",
+                (normalize_address(query),),
+            ).fetchone()
+            found = row is not None and self._fresh(row[1], "search")
+            self._count(found)
+        return self._serializer.loads(row[0]) if found else None
+
+    def info(self, number: str) -> Optional[Dict[str, Any]]:
+        """Ответ objectFull по номеру (поле data) или None, если его нет или он устарел."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT info, info_updated_at FROM objects WHERE number = ?",
+                (number.strip(),),
+            ).fetchone()
+            found = (
+                row is not None
+                and row[0] is not None
+                and self._fresh(row[1], "objectFull")
+            )
+            self._count(found)
+        return self._serializer.loads(row[0]) if found else None
+
+    def record_search(self, query: str, items: Iterable[Mapping[str, Any]]) -> None:
+        """Сохранить ответ search на запрос query (элементы data)."""
+        now = time.time()
+        items = [dict(item) for item in items]
+        rows = [
+            tuple(item.get(api_name) for _, api_name in _FIELDS) + (now,)
+            for item in items
+            if item.get("Number")
+        ]
+        encoded = self._serializer.dumps(items)
+        with self._lock, self._connection:
+            self._upsert(rows)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO searches (query_key, items, updated_at) "
+                "VALUES (?, ?, ?)",
+                (normalize_address(query), encoded, now),
+            )
+
+    def record_info(self, number: str, data: Mapping[str, Any]) -> None:
+        """Сохранить ответ objectFull (поле data) по номеру."""
+        number = number.strip()
+        now = time.time()
+        row = (
+            _first(data, "object_type", "ObjectType"),
+            number,
+            _first(data, "address", "Address"),
+            _first(data, "area", "Area"),
+            _first(data, "cadastral_price", "kad_price"),
+            _first(data, "status", "Status"),
+            now,
+        )
+        info = self._serializer.dumps(dict(data))
+        with self._lock, self._connection:
+            self._upsert([row])
+            self._connection.execute(
+                "UPDATE objects SET info = ?, info_updated_at = ? WHERE number = ?",
+                (info, now, number),
+            )
+
+    def _upsert(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Обновить сводки объектов и адресный индекс; вызывается под блокировкой."""
+        self._connection.executemany(_UPSERT, rows)
+        numbers = [(number,) for number in dict.fromkeys(row[1] for row in rows)]
+        self._connection.executemany(_DELETE_STALE_ADDRESSES, numbers)
+        self._connection.executemany(_INSERT_ADDRESS, numbers)
+
+    def import_records(self, records: Iterable[Mapping[str, Any]]) -> int:
+        """
+        Загрузить записи в формате export_records одной транзакцией.
+
+        Записи без updated_at считаются полученными сейчас; более новые
+        сведения в индексе не заменяются. Возвращает число записей.
+        """
+        now = time.time()
+        summaries: List[Tuple[Any, ...]] = []
+        infos: List[Tuple[Any, ...]] = []
+        for record in records:
+            number = str(record["number"]).strip()
+            summaries.append(
+                tuple(number if name == "number" else record.get(name) for name in _NAMES)
+                + (record.get("updated_at") or now,)
+            )
+            if record.get("info") is not None:
+                infos.append(
+                    (
+                        self._serializer.dumps(record["info"]),
+                        record.get("info_updated_at") or now,
+                        number,
+                    )
+                )
+        with self._lock, self._connection:
+            self._upsert(summaries)
+            self._connection.executemany(
+                "UPDATE objects SET info = ?1, info_updated_at = ?2 WHERE number = ?3 "
+                "AND COALESCE(info_updated_at, 0) <= ?2",
+                infos,
+            )
+        return len(summaries)
+
+    def export_records(self) -> Iterator[Dict[str, Any]]:
+        """Все объекты индекса: сводка, updated_at, info и info_updated_at."""
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {_COLUMNS}, updated_at, info, info_updated_at "
+                "FROM objects ORDER BY number"
+            ).fetchall()
+        for row in rows:
+            record = dict(zip(_NAMES + ("updated_at",), row))
+            info = row[-2]
+            record["info"] = self._serializer.loads(info) if info is not None else None
+            record["info_updated_at"] = row[-1]
+            yield record
+
+    def import_jsonl(self, path: str) -> int:
+        """Загрузить записи из файла JSON Lines."""
+        with open(path, encoding="utf-8") as file:
+            return self.import_records(json.loads(line) for line in file if line.strip())
+
+    def export_jsonl(self, path: str) -> int:
+        """Выгрузить объекты индекса в файл JSON Lines; возвращает число записей."""
+        count = 0
+        with open(path, "w", encoding="utf-8") as file:
+            for record in self.export_records():
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def clear(self) -> None:
+        """Удалить все записи."""
+        with self._lock, self._connection:
+            for table in ("objects", "addresses", "searches"):
+                self._connection.execute(f"DELETE FROM {table}")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path={self.path!r})"
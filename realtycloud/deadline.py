@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    TypeVar,
+    Union,
+)
+
+from httpx import Timeout
+
+from realtycloud import settings
+from .exceptions import (
+    RealtycloudCancelledException,
+    RealtycloudDeadlineExceededException,
+)
+
+__all__ = ["Deadline", "current_deadline", "as_timeout", "endpoint_timeout"]
+
+# Таймаут: общий в секундах, httpx.Timeout или словарь connect/read/write/pool
+TimeoutValue = Union[float, Timeout, Mapping[str, Optional[float]]]
+
+T = TypeVar("T")
+
+_current: ContextVar[Optional["Deadline"]] = ContextVar(
+    "realtycloud_deadline", default=None
+)
+
+
+def as_timeout(value: TimeoutValue) -> Timeout:
+    """Привести таймаут к httpx.Timeout; не заданные этапы получают settings.TIMEOUT_SEC."""
+    if isinstance(value, Timeout):
+        return value
+    if isinstance(value, Mapping):
+        return Timeout(settings.TIMEOUT_SEC, **value)
+    return Timeout(value)
+
+
+def endpoint_timeout(
+    endpoint: str, overrides: Optional[Mapping[str, TimeoutValue]] = None
+) -> Timeout:
+    """Таймауты семейства методов API: из overrides, settings.TIMEOUT_PROFILES или общий."""
+    if overrides and endpoint in overrides:
+        return as_timeout(overrides[endpoint])
+    profiles: Dict[str, Mapping[str, float]] = settings.TIMEOUT_PROFILES
+    return as_timeout(profiles.get(endpoint, settings.TIMEOUT_SEC))
+
+
+def current_deadline() -> Optional["Deadline"]:
+    """Deadline, действующий в текущем контексте, или None."""
+    return _current.get()
+
+
+@contextmanager
+def activate(deadline: Optional["Deadline"]) -> Iterator[None]:
+    """Сделать deadline текущим; в отличие от with deadline, допускает одновременные задачи."""
+    if deadline is None:
+        yield
+        return
+    token = _current.set(deadline)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def _clamp(value: Optional[float], limit: float) -> float:
+    return limit if value is None else min(value, limit)
+
+
+def _retrieve_exception(future: "asyncio.Future[Any]") -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+class Deadline:
+    """
+    Срок выполнения вызовов API вместе со всеми повторами и отмена.
+
+    Действует как контекстный менеджер: все запросы клиентов внутри блока,
+    в том числе в потоках методов map_*, партиях оптового заказа и задачах
+    asyncio, созданных внутри блока, укладываются в seconds секунд от создания
+    Deadline. Таймауты соединения и чтения урезаются до оставшегося времени,
+    отсрочка повтора, не укладывающаяся в срок, не выполняется, а по истечении
+    срока возбуждается RealtycloudDeadlineExceededException.
+
+    timeout задает таймауты запросов внутри блока вместо профилей
+    settings.TIMEOUT_PROFILES. cancel() прерывает вызовы из другого потока или
+    задачи: ожидание повтора, ограничителя частоты, пула токенов и чужого
+    запроса с тем же ключом - сразу, запрос - на ближайшем этапе соединения.
+    Ожидания не длятся дольше оставшегося срока. Вложенный Deadline не может
+    продлить срок внешнего, а отмена внешнего прерывает и его.
+    """
+
+    def __init__(
+        self, seconds: Optional[float] = None, timeout: Optional[TimeoutValue] = None
+    ):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.timeout = as_timeout(timeout) if timeout is not None else None
+        # Внешний Deadline: его срок и отмена действуют и на этот
+        self.parent = _current.get()
+        self._cancelled = threading.Event()
+        self._tokens: List[Any] = []
+        # Функции, будящие ожидания этого и вложенных Deadline при отмене
+        self._lock = threading.Lock()
+        self._wakers: Set[Callable[[], None]] = set()
+
+    def __enter__(self) -> "Deadline":
+        current = _current.get()
+        if self.parent is None and current is not self:
+            self.parent = current
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current.reset(self._tokens.pop())
+
+    def remaining(self) -> Optional[float]:
+        """Оставшееся время в секундах или None, если срок не ограничен."""
+        remaining = None
+        deadline: Optional[Deadline] = self
+        now = time.monotonic()
+        while deadline is not None:
+            if deadline.expires_at is not None:
+                left = deadline.expires_at - now
+                remaining = left if remaining is None else min(remaining, left)
+            deadline = deadline.parent
+        return remaining
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    @property
+    def cancelled(self) -> bool:
+        deadline: Optional[Deadline] = self
+        while deadline is not None:
+            if deadline._cancelled.is_set():
+                return True
+            deadline = deadline.parent
+        return False
+
+    def cancel(self) -> None:
+        """Отменить вызовы, выполняющиеся под этим Deadline."""
+        with self._lock:
+            self._cancelled.set()
+            wakers = list(self._wakers)
+        for wake in wakers:
+            wake()
+
+    def _chain(self) -> Iterator["Deadline"]:
+        deadline: Optional[Deadline] = self
+        while deadline is not None:
+            yield deadline
+            deadline = deadline.parent
+
+    @contextmanager
+    def _waking(self, wake: Callable[[], None]) -> Iterator[None]:
+        """Вызвать wake при отмене этого или внешнего Deadline на время блока."""
+        chain = list(self._chain())
+        for deadline in chain:
+            with deadline._lock:
+                deadline._wakers.add(wake)
+        try:
+            if self.cancelled:
+                wake()
+            yield
+        finally:
+            for deadline in chain:
+                with deadline._lock:
+                    deadline._wakers.discard(wake)
+
+    def _limit(self, seconds: Optional[float]) -> Optional[float]:
+        """Время ожидания, урезанное до оставшегося срока; None - без ограничения."""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        remaining = max(0.0, remaining)
+        return remaining if seconds is None else min(seconds, remaining)
+
+    def check(self) -> None:
+        """Возбудить исключение, если вызов отменен или срок истек."""
+        if self.cancelled:
+            raise RealtycloudCancelledException("Вызов отменен.")
+        if self.expired:
+            raise RealtycloudDeadlineExceededException("Истек срок выполнения вызова.")
+
+    def scoped_timeout(self) -> Optional[Timeout]:
+        """Таймауты, заданные этому или внешнему Deadline."""
+        deadline: Optional[Deadline] = self
+        while deadline is not None:
+            if deadline.timeout is not None:
+                return deadline.timeout
+            deadline = deadline.parent
+        return None
+
+    def clamp(self, timeout: Timeout) -> Timeout:
+        """Урезать таймауты этапов запроса до оставшегося времени."""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return Timeout(
+            connect=_clamp(timeout.connect, remaining),
+            read=_clamp(timeout.read, remaining),
+            write=_clamp(timeout.write, remaining),
+            pool=_clamp(timeout.pool, remaining),
+        )
+
+    def allows(self, delay: float) -> bool:
+        """Успеет ли повтор после отсрочки delay."""
+        remaining = self.remaining()
+        return not self.cancelled and (remaining is None or delay < remaining)
+
+    def sleep(self, seconds: float) -> None:
+        """Подождать seconds секунд, но не дольше срока; отмена прерывает ожидание сразу."""
+        self.wait(threading.Event(), seconds)
+
+    def wait(self, event: threading.Event, seconds: Optional[float] = None) -> None:
+        """
+        Дождаться event не дольше seconds секунд и оставшегося срока. Отмена
+        будит ожидание, установив event; после ожидания срок проверяется.
+        """
+        with self._waking(event.set):
+            event.wait(self._limit(seconds))
+        self.check()
+
+    async def asleep(self, seconds: float) -> None:
+        """Асинхронный вариант sleep."""
+        loop = asyncio.get_running_loop()
+        cancelled = asyncio.Event()
+        with self._waking(lambda: loop.call_soon_threadsafe(cancelled.set)):
+            try:
+                await asyncio.wait_for(cancelled.wait(), self._limit(seconds))
+            except asyncio.TimeoutError:
+                pass
+        self.check()
+
+    async def wait_future(self, future: "asyncio.Future[T]") -> T:
+        """
+        Дождаться future не дольше оставшегося срока, не отменяя его: при
+        отмене или истечении срока возбуждается исключение, а future
+        продолжает выполняться.
+        """
+        loop = asyncio.get_running_loop()
+        cancelled = asyncio.Event()
+        with self._waking(lambda: loop.call_soon_threadsafe(cancelled.set)):
+            waiter = asyncio.ensure_future(cancelled.wait())
+            try:
+                await asyncio.wait(
+                    {future, waiter},
+                    timeout=self._limit(None),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            finally:
+                waiter.cancel()
+        if not future.done():
+            # Исключение брошенного future не должно попасть в журнал asyncio
+            future.add_done_callback(_retrieve_exception)
+        self.check()
+        return future.result()
+
+    def trace(
+        self, inner: Optional[Callable[[str, Dict[str, Any]], Any]], asynchronous: bool
+    ) -> Callable[[str, Dict[str, Any]], Optional[Awaitable[None]]]:
+        """Обработчик расширения trace httpx, прерывающий запрос на границе этапов."""
+        if asynchronous:
+
+            async def atrace(name: str, info: Dict[str, Any]) -> None:
+                if name.endswith(".started"):
+                    self.check()
+                if inner is not None:
+                    await inner(name, info)
+
+            return atrace
+
+        def trace(name: str, info: Dict[str, Any]) -> None:
+            if name.endswith(".started"):
+                self.check()
+            if inner is not None:
+                inner(name, info)
+
+        return trace
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(remaining={self.remaining()}, "
+            f"cancelled={self.cancelled})"
+        )
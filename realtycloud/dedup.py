@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from realtycloud import settings
+from .batching import BatchResult
+from .request_objects import RealtyObject, RealtyObjectBatch, RiskRequest
+from .validate import canonical_object_key
+
+__all__ = [
+    "KeySet",
+    "BloomFilter",
+    "DiskKeySet",
+    "Deduplicator",
+    "DedupStats",
+    "canonical_object",
+    "risk_identity",
+    "collapse",
+    "expand_response",
+]
+
+
+def canonical_object(obj: RealtyObject) -> RealtyObject:
+    """
+    Запрос с каноническим object_key; уже канонический запрос возвращается
+    как есть. Служит для сравнения: в заказ уходит исходный ключ.
+    """
+    key = canonical_object_key(obj.key)
+    if key == obj.key:
+        return obj
+    return RealtyObject.from_validated(key, obj.address)
+
+
+def packed_key(canonical_key: str) -> int:
+    """Канонический object_key одним целым числом: занимает в памяти меньше строки."""
+    region, district, block, number = canonical_key.split(":")
+    # Длина номера квартала (1, 6 или 7 цифр) входит в ключ: 001001 и 0001001
+    # - разные кварталы
+    length = len(block)
+    return (
+        ((int(region) * 100 + int(district)) * 10**7 + int(block)) * 8 + length
+    ) * 10**10 + int(number)
+
+
+def object_identity(obj: RealtyObject) -> Tuple[Hashable, RealtyObject]:
+    """
+    Ключ, по которому запросы на заказ объекта считаются одинаковыми, и запрос
+    к отправке: канонический ключ служит только для сравнения, а отправляется
+    запрос с ключом, который указал пользователь.
+    """
+    return packed_key(canonical_object_key(obj.key)), obj
+
+
+def risk_identity(request: RiskRequest) -> Tuple[Hashable, RiskRequest]:
+    """
+    Ключ запроса оценки риска (объект и набор владельцев без учета порядка и
+    повторов) и запрос к отправке как есть: оценка для того же объекта с
+    другими владельцами - отдельная позиция.
+    """
+    owners = tuple(sorted({owner.fields() for owner in request.owners}, key=repr))
+    return (packed_key(canonical_object_key(request.object.key)), owners), request
+
+
+class KeySet:
+    """
+    Точное множество уже отправленных ключей в памяти.
+
+    Для каждого продукта хранит ключ и order_item_id созданной позиции
+    (None, пока ответ не получен). Ключи заказа объектов - целые числа, а не
+    строки, поэтому миллион ключей занимает десятки мегабайт.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, Dict[Hashable, Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._ids.values())
+
+    def get(self, product_name: str, key: Hashable) -> Tuple[bool, Optional[str]]:
+        """(ключ уже отправлялся, order_item_id позиции или None)."""
+        ids = self._ids.get(product_name)
+        if ids is None or key not in ids:
+            return False, None
+        return True, ids[key]
+
+    def add(
+        self, product_name: str, key: Hashable, order_item_id: Optional[str] = None
+    ) -> None:
+        self._ids.setdefault(product_name, {})[key] = order_item_id
+
+    def discard(self, product_name: str, key: Hashable) -> None:
+        self._ids.get(product_name, {}).pop(key, None)
+
+    def close(self) -> None:
+        self._ids.clear()
+
+
+class BloomFilter:
+    """Фильтр Блума: проверка «возможно, встречался» с долей ложных срабатываний error_rate."""
+
+    def __init__(
+        self,
+        capacity: int = settings.DEDUP_BLOOM_CAPACITY,
+        error_rate: float = settings.DEDUP_BLOOM_ERROR_RATE,
+    ):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: Hashable) -> Iterator[int]:
+        digest = hashlib.blake2b(repr(value).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, value: Hashable) -> None:
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: Hashable) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class DiskKeySet:
+    """
+    Точное множество отправленных ключей во временном файле SQLite с фильтром
+    Блума в памяти для очень больших заказов.
+
+    Фильтр отсекает новые ключи без обращения к диску, а его ложные
+    срабатывания проверяются по файлу, поэтому разные объекты никогда не
+    считаются одинаковыми. В памяти остается около байта на ключ при
+    error_rate=0.01. Файл без path удаляется при close().
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        capacity: int = settings.DEDUP_BLOOM_CAPACITY,
+        error_rate: float = settings.DEDUP_BLOOM_ERROR_RATE,
+    ):
+        self._temporary = path is None
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix="realtycloud-dedup-", suffix=".db")
+            os.close(handle)
+        self.path = path
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        # Файл - рабочая копия на время заказа, устойчивость к сбоям не нужна
+        self._connection.execute("PRAGMA journal_mode=OFF")
+        self._connection.execute("PRAGMA synchronous=OFF")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS keys (product_name TEXT NOT NULL, key TEXT NOT NULL, "
+            "order_item_id TEXT, PRIMARY KEY (product_name, key)) WITHOUT ROWID"
+        )
+        for product_name, key in self._connection.execute(
+            "SELECT product_name, key FROM keys"
+        ):
+            self._bloom.add((product_name, key))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def get(self, product_name: str, key: Hashable) -> Tuple[bool, Optional[str]]:
+        key = str(key)
+        if (product_name, key) not in self._bloom:
+            return False, None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT order_item_id FROM keys WHERE product_name = ? AND key = ?",
+                (product_name, key),
+            ).fetchone()
+        return (True, row[0]) if row is not None else (False, None)
+
+    def add(
+        self, product_name: str, key: Hashable, order_item_id: Optional[str] = None
+    ) -> None:
+        # Упакованный ключ не помещается в 64-битное целое SQLite
+        key = str(key)
+        self._bloom.add((product_name, key))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO keys (product_name, key, order_item_id) "
+                "VALUES (?, ?, ?)",
+                (product_name, key, order_item_id),
+            )
+
+    def discard(self, product_name: str, key: Hashable) -> None:
+        # Из фильтра ключ не удаляется: это лишь лишнее обращение к файлу
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM keys WHERE product_name = ? AND key = ?",
+                (product_name, str(key)),
+            )
+
+    def close(self) -> None:
+        """Закрыть файл; временный файл удаляется."""
+        with self._lock:
+            self._connection.close()
+        if self._temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> "DiskKeySet":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class DedupStats:
+    """Счетчики этапа дедупликации."""
+
+    def __init__(self):
+        self.unique = 0
+        self.duplicates = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(unique={self.unique}, "
+            f"duplicates={self.duplicates})"
+        )
+
+
+class Deduplicator:
+    """
+    Этап объединения повторов перед оптовым заказом.
+
+    unique() пропускает каждый объект (по каноническому object_key) один раз
+    с ключом его первого вхождения,
+    а fan_out() раздает позицию заказа из ответа всем запросившим его
+    элементам. Повторы, пришедшие до ответа по первому элементу, добавляются
+    в его BatchResult; пришедшие после - в отдельный BatchResult с тем же
+    order_item_id и data["duplicates"] = True. Если партия первого элемента
+    не принята, его повторы получают ту же ошибку, а следующий повтор будет
+    отправлен заново. Если первый элемент не отправлен (его пропустил журнал,
+    см. skip), его повторы, как и он сам, тоже не попадают в результаты.
+
+    seen - множество отправленных ключей: KeySet (по умолчанию) или DiskKeySet
+    для очень больших заказов. Одно множество можно передавать в несколько
+    заказов, чтобы не заказывать объект повторно между ними.
+    """
+
+    def __init__(
+        self,
+        product_name: str,
+        seen: Optional[Union[KeySet, DiskKeySet]] = None,
+        identity: Callable[[Any], Tuple[Hashable, Any]] = object_identity,
+    ):
+        self.product_name = product_name
+        self.seen = seen if seen is not None else KeySet()
+        self._identity = identity
+        # Повторы элементов, ответ по которым еще не получен: ключ -> элементы
+        self._pending: Dict[Hashable, List[Any]] = {}
+        # Повторы уже заказанных элементов: (элемент, order_item_id)
+        self._late: List[Tuple[Any, Optional[str]]] = []
+        # Ключи элементов, которые не отправлялись: их повторы отбрасываются
+        self._skipped: Set[Hashable] = set()
+        self.stats = DedupStats()
+
+    def _admit(self, item: Any) -> Optional[Any]:
+        """Элемент к отправке или None, если это повтор."""
+        key, prepared = self._identity(item)
+        if key in self._skipped:
+            self.stats.duplicates += 1
+            return None
+        followers = self._pending.get(key)
+        if followers is not None:
+            followers.append(item)
+            self.stats.duplicates += 1
+            return None
+        seen, order_item_id = self.seen.get(self.product_name, key)
+        if seen:
+            self._late.append((item, order_item_id))
+            self.stats.duplicates += 1
+            return None
+        self.seen.add(self.product_name, key)
+        self._pending[key] = []
+        self.stats.unique += 1
+        return prepared
+
+    def skip(self, item: Any) -> None:
+        """
+        Отметить, что пропущенный unique() элемент не будет отправлен: ответа
+        по нему не будет, поэтому его повторы отбрасываются вместе с ним.
+        """
+        key, _ = self._identity(item)
+        if self._pending.pop(key, None) is not None:
+            self._skipped.add(key)
+
+    def unique(
+        self, items: Iterable[Any]
+    ) -> Union[Iterator[Any], RealtyObjectBatch]:
+        """Элементы без повторов; коллекция RealtyObjectBatch остается коллекцией."""
+        if isinstance(items, RealtyObjectBatch):
+            return self._unique_batch(items)
+        return self._unique(items)
+
+    def _unique(self, items: Iterable[Any]) -> Iterator[Any]:
+        for item in items:
+            prepared = self._admit(item)
+            if prepared is not None:
+                yield prepared
+
+    async def aunique(
+        self, items: Union[Iterable[Any], AsyncIterable[Any]]
+    ) -> AsyncIterator[Any]:
+        """Асинхронный вариант unique для обычных и асинхронных итераторов."""
+        if not hasattr(items, "__aiter__"):
+            for prepared in self._unique(items):
+                yield prepared
+            return
+        async for item in items:
+            prepared = self._admit(item)
+            if prepared is not None:
+                yield prepared
+
+    def _unique_batch(self, batch: RealtyObjectBatch) -> RealtyObjectBatch:
+        result = RealtyObjectBatch()
+        for index, obj in enumerate(batch):
+            prepared = self._admit(obj)
+            if prepared is not None:
+                result.keys.append(prepared.key)
+                result.addresses.append(prepared.address)
+                result._products.append(result._product_code(batch.product_name(index)))
+        return result
+
+    def fan_out(self, result: BatchResult) -> List[BatchResult]:
+        """Результат партии с повторами ее элементов и, если есть, результат поздних повторов."""
+        items: List[Any] = []
+        order_items: List[Dict] = []
+        sent = result.order_items if result.ok else []
+        for index, item in enumerate(result.items):
+            key, _ = self._identity(item)
+            followers = self._pending.pop(key, [])
+            order_item = sent[index] if index < len(sent) else None
+            if not result.ok:
+                # Заказ не создан: следующий повтор можно отправить снова
+                self.seen.discard(self.product_name, key)
+            elif order_item is not None:
+                self.seen.add(self.product_name, key, order_item.get("order_item_id"))
+            items.append(item)
+            items.extend(followers)
+            if order_item is not None:
+                order_items.extend([order_item] * (len(followers) + 1))
+        if result.ok:
+            expanded = BatchResult(
+                result.index, items, data={**result.data, "order_items": order_items}
+            )
+        else:
+            expanded = BatchResult(result.index, items, error=result.error)
+        late = self.take_late(result.index)
+        return [expanded] if late is None else [expanded, late]
+
+    def take_late(self, index: int = -1) -> Optional[BatchResult]:
+        """BatchResult для накопленных повторов уже заказанных элементов или None."""
+        if not self._late:
+            return None
+        late, self._late = self._late, []
+        items = [item for item, _ in late]
+        order_items = [
+            {
+                "order_item_id": order_item_id,
+                "product_name": self.product_name,
+                "object_key": self._identity(item)[1].key,
+            }
+            for item, order_item_id in late
+        ]
+        return BatchResult(
+            index, items, data={"order_items": order_items, "duplicates": True}
+        )
+
+    def results(self, results: Iterable[BatchResult]) -> Iterator[BatchResult]:
+        """Раздать результаты партий send_batches всем запросившим элементам."""
+        for result in results:
+            yield from self.fan_out(result)
+        late = self.take_late()
+        if late is not None:
+            yield late
+
+    async def aresults(
+        self, results: AsyncIterable[BatchResult]
+    ) -> AsyncIterator[BatchResult]:
+        """Асинхронный вариант results."""
+        async for result in results:
+            for expanded in self.fan_out(result):
+                yield expanded
+        late = self.take_late()
+        if late is not None:
+            yield late
+
+
+def collapse(
+    requests: Union[Sequence[RealtyObject], RealtyObjectBatch],
+) -> Tuple[Union[List[RealtyObject], RealtyObjectBatch], Optional[List[int]]]:
+    """
+    Запросы одного заказа без повторов (по каноническому ключу; отправляется
+    первое вхождение как есть) и номер отправляемого запроса для каждого
+    исходного (None, если повторов нет).
+    """
+    positions: List[int] = []
+    first: Dict[int, int] = {}
+    batch = isinstance(requests, RealtyObjectBatch)
+    unique: Union[List[RealtyObject], RealtyObjectBatch] = (
+        RealtyObjectBatch() if batch else []
+    )
+    for index, obj in enumerate(requests):
+        key, prepared = object_identity(obj)
+        position = first.get(key)
+        if position is None:
+            position = first[key] = len(unique)
+            if batch:
+                unique.keys.append(prepared.key)
+                unique.addresses.append(prepared.address)
+                unique._products.append(
+                    unique._product_code(requests.product_name(index))
+                )
+            else:
+                unique.append(prepared)
+        positions.append(position)
+    return unique, positions if len(unique) < len(positions) else None
+
+
+def expand_response(response: Any, positions: Optional[List[int]]) -> Any:
+    """Раздать позиции заказа из ответа API на collapse всем исходным запросам."""
+    if positions is None:
+        return response
+    data = response.get("data")
+    order_items = (data or {}).get("order_items") or []
+    if len(order_items) <= max(positions):
+        return response
+    return {
+        **response,
+        "data": {**data, "order_items": [order_items[position] for position in positions]},
+    }
@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import shutil
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import (
+    IO,
+    AsyncIterator,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from httpx import URL, AsyncClient, Client, Request, Response, TransportError
+
+from realtycloud import settings
+from .base import BaseClient
+from .deadline import TimeoutValue, as_timeout, endpoint_timeout
+from .exceptions import RealtycloudDownloadException
+
+__all__ = [
+    "DownloadResult",
+    "ReportDownloader",
+    "AsyncReportDownloader",
+    "report_jobs",
+    "iter_zip_members",
+    "extract_zip",
+]
+
+# Поля со ссылками на файлы отчета и расширения сохраняемых файлов
+REPORT_FILE_FIELDS = {"file_pdf_url": ".pdf", "file_signed_zip_url": ".zip"}
+
+Destination = Union[str, BinaryIO]
+
+
+class DownloadResult:
+    """Результат загрузки одного файла отчета."""
+
+    def __init__(
+        self,
+        url: str,
+        destination: Destination,
+        size: int = 0,
+        error: Optional[BaseException] = None,
+    ):
+        self.url = url
+        self.destination = destination
+        self.size = size
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """Файл загружен полностью."""
+        return self.error is None
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else repr(self.error)
+        return f"{self.__class__.__name__}(url={self.url}, size={self.size}, {status})"
+
+
+def report_jobs(
+    status_items: Iterable[Dict], directory: str
+) -> Iterator[Tuple[str, str]]:
+    """Пары (ссылка, путь к файлу) для отчетов из ответа check_status."""
+    for item in status_items:
+        data = item.get("data") or {}
+        for field, extension in REPORT_FILE_FIELDS.items():
+            url = data.get(field)
+            if url:
+                filename = f"{item['order_item_id']}{extension}"
+                yield url, os.path.join(directory, filename)
+
+
+def _encoded(response: Response) -> bool:
+    """Тело ответа сжато: размеры в заголовках считаются в сжатых байтах."""
+    encoding = response.headers.get("Content-Encoding", "").strip().lower()
+    return encoding not in ("", "identity")
+
+
+def _seekable(target: IO) -> bool:
+    """Приемник поддерживает seek и truncate."""
+    seekable = getattr(target, "seekable", None)
+    return seekable is not None and seekable()
+
+
+def _expected_size(response: Response, offset: int) -> Optional[int]:
+    """Полный размер файла по заголовкам ответа или None, если он неизвестен."""
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length) + (offset if response.status_code == 206 else 0)
+    return None
+
+
+# Особые результаты _check_response: файл уже загружен целиком; загрузку
+# нужно начать с начала
+_COMPLETE = -1
+_RESTART = -2
+
+
+class _DownloaderBase(BaseClient):
+    """Общая логика загрузчиков, не зависящая от транспорта."""
+
+    _rate_limiter = None
+
+    def __init__(
+        self,
+        chunk_size: int = settings.DOWNLOAD_CHUNK_SIZE,
+        max_parallel: int = settings.DOWNLOAD_MAX_PARALLEL,
+        timeout: Optional[TimeoutValue] = None,
+        api_url: str = settings.API_URL,
+    ):
+        self.chunk_size = chunk_size
+        self.max_parallel = max_parallel
+        # Таймаут чтения большого файла - из профиля "download", а не общий
+        self.timeout = (
+            endpoint_timeout("download") if timeout is None else as_timeout(timeout)
+        )
+        self._api_origin = URL(api_url).copy_with(path="/", query=None, fragment=None)
+
+    def _build_download_request(self, url: str, offset: int) -> Request:
+        """
+        Запрос файла без сжатия, с Range для продолжения загрузки. API-Key
+        общего клиента отправляется только на адрес API, но не на сторонние
+        хранилища файлов.
+        """
+        # Размеры Content-Length, Content-Range и смещение Range должны
+        # считаться в байтах файла, а не сжатого тела
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        request = self._client.build_request(
+            "GET", url, headers=headers, timeout=self.timeout
+        )
+        origin = request.url.copy_with(path="/", query=None, fragment=None)
+        if origin != self._api_origin:
+            request.headers.pop("API-Key", None)
+        return request
+
+    @staticmethod
+    def _open_target(destination: Destination, resume: bool) -> Tuple[IO, int, bool, int]:
+        """
+        Открыть приемник: (файл, уже загружено байт, нужно ли закрыть файл,
+        позиция начала записи в файле).
+        """
+        if not isinstance(destination, str):
+            # Открытый файл пишется с текущей позиции, прежнее содержимое не трогается
+            base = destination.tell() if _seekable(destination) else 0
+            return destination, 0, False, base
+        part = destination + ".part"
+        offset = os.path.getsize(part) if resume and os.path.exists(part) else 0
+        return open(part, "ab" if offset else "wb"), offset, True, 0
+
+    @staticmethod
+    def _restart(target: IO, base: int) -> None:
+        """Отбросить записанное в приемник, чтобы загрузить файл заново."""
+        if not _seekable(target):
+            raise RealtycloudDownloadException(
+                "Загрузку нужно начать заново, но приемник не поддерживает seek."
+            )
+        target.seek(base)
+        target.truncate()
+
+    def _check_response(self, response: Response, offset: int) -> int:
+        """
+        Проверить ответ и вернуть смещение, с которого начинается его тело,
+        _COMPLETE или _RESTART.
+        """
+        if response.status_code == 416 and offset:
+            # Диапазон за концом файла: файл загружен целиком, если размер
+            # из Content-Range: bytes */N совпадает с загруженным, иначе
+            # локальная копия не соответствует файлу на сервере
+            if _expected_size(response, offset) == offset:
+                return _COMPLETE
+            return _RESTART
+        if not response.is_success:
+            response.read()
+            self._handle_api_error(response)
+        return offset if response.status_code == 206 else 0
+
+    @staticmethod
+    def _finish(
+        destination: Destination, target: IO, written: int, expected: Optional[int]
+    ) -> None:
+        """Проверить размер и переименовать загруженный файл."""
+        if expected is not None and written != expected:
+            raise RealtycloudDownloadException(
+                f"Загружено {written} байт из {expected}."
+            )
+        if isinstance(destination, str):
+            target.close()
+            os.replace(destination + ".part", destination)
+
+
+class ReportDownloader(_DownloaderBase):
+    """
+    Потоковая загрузка файлов отчетов (file_pdf_url, file_signed_zip_url).
+
+    Файлы записываются частями по chunk_size байт, поэтому память не зависит
+    от размера отчета. Незавершенная загрузка хранится в файле с суффиксом
+    .part и продолжается запросом Range при следующем вызове.
+    """
+
+    def __init__(self, client: Client, **kwargs):
+        super().__init__(**kwargs)
+        self._client = client
+
+    def download(
+        self, url: str, destination: Destination, resume: bool = True
+    ) -> int:
+        """Загрузить файл по ссылке в путь или открытый файл; возвращает размер файла."""
+        target, offset, owned, base = self._open_target(destination, resume)
+        try:
+            while True:
+                response = self._client.send(
+                    self._build_download_request(url, offset), stream=True
+                )
+                try:
+                    start = self._check_response(response, offset)
+                    if start == _COMPLETE:
+                        self._finish(destination, target, offset, None)
+                        return offset
+                    # Загрузить заново, если локальная копия не совпала с файлом
+                    # или сервер сжал ответ вопреки Accept-Encoding: identity:
+                    # продолжить по смещению в байтах файла нельзя
+                    if start == _RESTART or (start and _encoded(response)):
+                        offset = 0
+                        self._restart(target, base)
+                        continue
+                    if start != offset:
+                        self._restart(target, base)
+                    expected = (
+                        None if _encoded(response) else _expected_size(response, offset)
+                    )
+                    written = start
+                    for chunk in response.iter_bytes(self.chunk_size):
+                        target.write(chunk)
+                        written += len(chunk)
+                finally:
+                    response.close()
+                self._finish(destination, target, written, expected)
+                return written
+        except TransportError as e:
+            raise self._transport_error(e) from e
+        finally:
+            if owned:
+                target.close()
+
+    def download_many(
+        self, jobs: Iterable[Tuple[str, Destination]], resume: bool = True
+    ) -> Iterator[DownloadResult]:
+        """Загрузить файлы в max_parallel потоков, возвращая результаты по мере готовности."""
+
+        def run(url: str, destination: Destination) -> DownloadResult:
+            try:
+                size = self.download(url, destination, resume)
+                return DownloadResult(url, destination, size)
+            except Exception as e:
+                return DownloadResult(url, destination, error=e)
+
+        jobs = iter(jobs)
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            pending = {
+                executor.submit(run, *job) for job in islice(jobs, self.max_parallel)
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for job in islice(jobs, 1):
+                        pending.add(executor.submit(run, *job))
+                    yield future.result()
+
+    def download_reports(
+        self, status_items: Iterable[Dict], directory: str, resume: bool = True
+    ) -> Iterator[DownloadResult]:
+        """Загрузить все файлы готовых отчетов из ответа check_status в каталог."""
+        os.makedirs(directory, exist_ok=True)
+        return self.download_many(report_jobs(status_items, directory), resume)
+
+
+class AsyncReportDownloader(_DownloaderBase):
+    """Асинхронный вариант ReportDownloader."""
+
+    def __init__(self, client: AsyncClient, **kwargs):
+        super().__init__(**kwargs)
+        self._client = client
+
+    async def download(
+        self, url: str, destination: Destination, resume: bool = True
+    ) -> int:
+        """Загрузить файл по ссылке в путь или открытый файл; возвращает размер файла."""
+        target, offset, owned, base = self._open_target(destination, resume)
+        try:
+            while True:
+                response = await self._client.send(
+                    self._build_download_request(url, offset), stream=True
+                )
+                try:
+                    if not response.is_success:
+                        await response.aread()
+                    start = self._check_response(response, offset)
+                    if start == _COMPLETE:
+                        self._finish(destination, target, offset, None)
+                        return offset
+                    # Загрузить заново, если локальная копия не совпала с файлом
+                    # или сервер сжал ответ вопреки Accept-Encoding: identity:
+                    # продолжить по смещению в байтах файла нельзя
+                    if start == _RESTART or (start and _encoded(response)):
+                        offset = 0
+                        self._restart(target, base)
+                        continue
+                    if start != offset:
+                        self._restart(target, base)
+                    expected = (
+                        None if _encoded(response) else _expected_size(response, offset)
+                    )
+                    written = start
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        target.write(chunk)
+                        written += len(chunk)
+                finally:
+                    await response.aclose()
+                self._finish(destination, target, written, expected)
+                return written
+        except TransportError as e:
+            raise self._transport_error(e) from e
+        finally:
+            if owned:
+                target.close()
+
+    async def download_many(
+        self, jobs: Iterable[Tuple[str, Destination]], resume: bool = True
+    ) -> AsyncIterator[DownloadResult]:
+        """Загрузить файлы, не более max_parallel одновременно, по мере готовности."""
+
+        async def run(url: str, destination: Destination) -> DownloadResult:
+            try:
+                size = await self.download(url, destination, resume)
+                return DownloadResult(url, destination, size)
+            except Exception as e:
+                return DownloadResult(url, destination, error=e)
+
+        jobs = iter(jobs)
+        pending = {
+            asyncio.ensure_future(run(*job)) for job in islice(jobs, self.max_parallel)
+        }
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    for job in islice(jobs, 1):
+                        pending.add(asyncio.ensure_future(run(*job)))
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def download_reports(
+        self, status_items: Iterable[Dict], directory: str, resume: bool = True
+    ) -> AsyncIterator[DownloadResult]:
+        """Загрузить все файлы готовых отчетов из ответа check_status в каталог."""
+        os.makedirs(directory, exist_ok=True)
+        return self.download_many(report_jobs(status_items, directory), resume)
+
+
+def iter_zip_members(
+    archive: Union[str, BinaryIO]
+) -> Iterator[Tuple[zipfile.ZipInfo, IO[bytes]]]:
+    """Последовательно открыть файлы архива для потокового чтения."""
+    with zipfile.ZipFile(archive) as zip_file:
+        for info in zip_file.infolist():
+            if info.is_dir():
+                continue
+            with zip_file.open(info) as member:
+                yield info, member
+
+
+def extract_zip(
+    archive: Union[str, BinaryIO],
+    directory: str,
+    chunk_size: int = settings.DOWNLOAD_CHUNK_SIZE,
+) -> List[str]:
+    """Распаковать архив с подписью в каталог частями по chunk_size байт."""
+    root = os.path.realpath(directory)
+    paths = []
+    for info, member in iter_zip_members(archive):
+        path = os.path.realpath(os.path.join(root, info.filename))
+        if os.path.commonpath([root, path]) != root:
+            raise RealtycloudDownloadException(
+                f"Недопустимый путь в архиве: {info.filename}"
+            )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(member, target, chunk_size)
+        paths.append(path)
+    return paths
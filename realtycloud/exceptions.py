@@ -14,6 +14,12 @@ __all__ = [
     "RealtycloudFieldErrorException",
     "RealtycloudRequestLimitExceededException",
     "RealtycloudGenericErrorException",
+    "RealtycloudTransportException",
+    "RealtycloudDownloadException",
+    "RealtycloudDeadlineExceededException",
+    "RealtycloudCancelledException",
+    "RealtycloudBatchMismatchException",
+    "RealtycloudTokenPoolExhaustedException",
 ]
 
 
@@ -106,3 +112,48 @@ class RealtycloudGenericErrorException(RealtycloudAPIStatusException):
     """Возвращается для других общих ошибок"""
 
     pass
+
+
+class RealtycloudTransportException(RealtycloudException):
+    """Возвращается, когда запрос не удалось выполнить из-за сетевой ошибки или таймаута"""
+
+    def __init__(self, message: Optional[str] = None, request_sent: bool = True) -> None:
+        super().__init__(message)
+        # False, если запрос заведомо не дошел до сервера (ошибка соединения)
+        self.request_sent = request_sent
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(message={str(self)}, request_sent={self.request_sent})"
+
+
+class RealtycloudDownloadException(RealtycloudException):
+    """Возвращается, когда файл отчета загружен не полностью или архив поврежден"""
+
+    pass
+
+
+class RealtycloudDeadlineExceededException(RealtycloudException):
+    """Возвращается, когда истек срок Deadline, отведенный на вызов вместе с повторами"""
+
+    pass
+
+
+class RealtycloudCancelledException(RealtycloudException):
+    """Возвращается, когда вызов отменен через Deadline.cancel"""
+
+    pass
+
+
+class RealtycloudBatchMismatchException(RealtycloudException):
+    """Возвращается, когда стадия конвейера вернула не столько результатов, сколько элементов в партии"""
+
+    def __init__(self, message: Optional[str] = None, results: Optional[list] = None) -> None:
+        super().__init__(message)
+        # Все результаты вызова: например, позиции уже созданного и оплаченного заказа
+        self.results = results if results is not None else []
+
+
+class RealtycloudTokenPoolExhaustedException(RealtycloudException):
+    """Возвращается, когда все токены пула отозваны или невалидны и ждать их восстановления бессмысленно"""
+
+    pass
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from contextvars import copy_context
+from itertools import islice
+from typing import Any, Callable, Deque, Iterable, Iterator, Optional, Set, Tuple
+
+__all__ = ["MapResult", "fan_out"]
+
+
+class MapResult:
+    """Результат вызова метода для одного элемента входа."""
+
+    __slots__ = ("index", "arg", "value", "error")
+
+    def __init__(
+        self,
+        index: int,
+        arg: Any,
+        value: Any = None,
+        error: Optional[BaseException] = None,
+    ):
+        self.index = index
+        self.arg = arg
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """Вызов завершился без исключения."""
+        return self.error is None
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else repr(self.error)
+        return f"{self.__class__.__name__}(index={self.index}, arg={self.arg!r}, {status})"
+
+
+def _call(fn: Callable[[Any], Any], index: int, arg: Any) -> MapResult:
+    """Вызвать fn, сохранив исключение в результате вместо возбуждения."""
+    try:
+        return MapResult(index, arg, value=fn(arg))
+    except Exception as e:
+        return MapResult(index, arg, error=e)
+
+
+def fan_out(
+    executor: Executor,
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_concurrency: int,
+    ordered: bool = True,
+) -> Iterator[MapResult]:
+    """
+    Вызвать fn для каждого элемента items в пуле потоков executor.
+
+    Одновременно выполняется не более max_concurrency вызовов, а вход
+    читается по мере их завершения. При ordered=True результаты возвращаются
+    в порядке входа, иначе - по мере готовности.
+    """
+    if max_concurrency < 1:
+        raise ValueError("Число одновременных вызовов должно быть положительным.")
+    calls = enumerate(items)
+
+    def submit(index_arg: Tuple[int, Any]) -> "Future[MapResult]":
+        # Контекст вызывающего (в том числе Deadline) переносится в поток пула
+        return executor.submit(copy_context().run, _call, fn, *index_arg)
+
+    if ordered:
+        window: Deque[Future] = deque(map(submit, islice(calls, max_concurrency)))
+        try:
+            while window:
+                result = window.popleft().result()
+                for call in islice(calls, 1):
+                    window.append(submit(call))
+                yield result
+        finally:
+            for future in window:
+                future.cancel()
+        return
+
+    pending: Set[Future] = set(map(submit, islice(calls, max_concurrency)))
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for call in islice(calls, 1):
+                    pending.add(submit(call))
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+__all__ = [
+    "RequestEvent",
+    "Instrumentation",
+    "CompositeInstrumentation",
+    "PrometheusInstrumentation",
+    "OpenTelemetryInstrumentation",
+]
+
+# Этапы запроса httpcore и названия, под которыми их длительность попадает в timings.
+# Время разрешения имени входит в connect.
+TRACE_PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "wait",
+    "receive_response_body": "receive",
+}
+
+
+# Значение параметра запроса в адресе, передаваемом в трассировку
+REDACTED = "REDACTED"
+
+
+def redact_url(url: str) -> str:
+    """
+    Адрес без значений параметров запроса: в них передаются адреса и
+    кадастровые номера, а в ссылках на файлы - подписи доступа.
+    """
+    parts = urlsplit(url)
+    if not parts.query and not parts.fragment:
+        return url
+    query = urlencode(
+        [(name, REDACTED) for name, _ in parse_qsl(parts.query, keep_blank_values=True)],
+        safe=REDACTED,
+    )
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+
+class RequestEvent:
+    """Сведения об одной попытке запроса к API."""
+
+    __slots__ = (
+        "endpoint",
+        "method",
+        "url",
+        "attempt",
+        "started",
+        "elapsed",
+        "status_code",
+        "request_bytes",
+        "response_bytes",
+        "error",
+        "timings",
+        "context",
+        "_phase_started",
+    )
+
+    def __init__(self, endpoint: str, method: str, url: str, attempt: int):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.attempt = attempt
+        self.started = time.perf_counter()
+        self.elapsed: Optional[float] = None
+        self.status_code: Optional[int] = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        # Название класса исключения, если попытка завершилась ошибкой
+        self.error: Optional[str] = None
+        # Длительность этапов в секундах: connect, tls, send, wait, receive
+        self.timings: Dict[str, float] = {}
+        # Место для данных адаптеров (например, span OpenTelemetry)
+        self.context: Dict[str, Any] = {}
+        self._phase_started: Dict[str, float] = {}
+
+    def _trace(self, name: str, info: Dict[str, Any]) -> None:
+        """Обработчик расширения trace httpcore."""
+        phase_name, _, stage = name.rpartition(".")
+        phase = TRACE_PHASES.get(phase_name.rpartition(".")[2])
+        if phase is None:
+            return
+        now = time.perf_counter()
+        if stage == "started":
+            self._phase_started[phase_name] = now
+        else:
+            started = self._phase_started.pop(phase_name, None)
+            if started is not None:
+                self.timings[phase] = self.timings.get(phase, 0.0) + now - started
+
+    async def _atrace(self, name: str, info: Dict[str, Any]) -> None:
+        self._trace(name, info)
+
+    def _finish(self, status_code: Optional[int], error: Optional[BaseException]) -> None:
+        self.elapsed = time.perf_counter() - self.started
+        self.status_code = status_code
+        if error is not None:
+            self.error = error.__class__.__name__
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(endpoint={self.endpoint}, method={self.method}, "
+            f"attempt={self.attempt}, status_code={self.status_code}, elapsed={self.elapsed}, "
+            f"error={self.error})"
+        )
+
+
+class Instrumentation:
+    """
+    Интерфейс сбора метрик запросов к API.
+
+    Методы вызываются на горячем пути запроса, поэтому должны быть быстрыми
+    и не возбуждать исключений. Если инструментирование не передано клиенту,
+    события не создаются вовсе.
+    """
+
+    # Собирать ли длительность этапов соединения через расширение trace httpx
+    trace_phases = True
+
+    def on_request_start(self, event: RequestEvent) -> None:
+        """Перед отправкой попытки запроса."""
+
+    def on_request_end(self, event: RequestEvent) -> None:
+        """После ответа или ошибки попытки запроса."""
+
+    def on_retry(
+        self, endpoint: str, attempt: int, delay: float, error: BaseException
+    ) -> None:
+        """Перед повтором запроса, попытка attempt которого завершилась ошибкой error."""
+
+    def on_decode(self, endpoint: str, seconds: float, size: int) -> None:
+        """После разбора JSON ответа размером size байт."""
+
+
+class CompositeInstrumentation(Instrumentation):
+    """Передача событий нескольким обработчикам."""
+
+    def __init__(self, *hooks: Instrumentation):
+        self.hooks = hooks
+        self.trace_phases = any(hook.trace_phases for hook in hooks)
+
+    def on_request_start(self, event: RequestEvent) -> None:
+        for hook in self.hooks:
+            hook.on_request_start(event)
+
+    def on_request_end(self, event: RequestEvent) -> None:
+        for hook in self.hooks:
+            hook.on_request_end(event)
+
+    def on_retry(
+        self, endpoint: str, attempt: int, delay: float, error: BaseException
+    ) -> None:
+        for hook in self.hooks:
+            hook.on_retry(endpoint, attempt, delay, error)
+
+    def on_decode(self, endpoint: str, seconds: float, size: int) -> None:
+        for hook in self.hooks:
+            hook.on_decode(endpoint, seconds, size)
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """Счетчики и гистограммы prometheus_client (pip install prometheus-client)."""
+
+    def __init__(self, registry: Any = None, namespace: str = "realtycloud"):
+        try:
+            from prometheus_client import REGISTRY, Counter, Histogram
+        except ImportError:
+            raise RuntimeError(
+                "PrometheusInstrumentation требует пакет prometheus-client."
+            )
+        registry = registry if registry is not None else REGISTRY
+        options = {"namespace": namespace, "registry": registry}
+        self.requests = Counter(
+            "requests_total",
+            "Попытки запросов к API",
+            ["endpoint", "method", "status"],
+            **options,
+        )
+        self.errors = Counter(
+            "errors_total", "Ошибки запросов к API", ["endpoint", "error"], **options
+        )
+        self.retries = Counter(
+            "retries_total", "Повторы запросов к API", ["endpoint"], **options
+        )
+        self.duration = Histogram(
+            "request_duration_seconds",
+            "Длительность попытки запроса",
+            ["endpoint"],
+            **options,
+        )
+        self.phases = Histogram(
+            "request_phase_seconds",
+            "Длительность этапов запроса",
+            ["endpoint", "phase"],
+            **options,
+        )
+        self.response_size = Histogram(
+            "response_size_bytes",
+            "Размер ответа",
+            ["endpoint"],
+            buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+            **options,
+        )
+        self.decode = Histogram(
+            "decode_seconds", "Время разбора JSON ответа", ["endpoint"], **options
+        )
+
+    def on_request_end(self, event: RequestEvent) -> None:
+        status = str(event.status_code) if event.status_code is not None else "error"
+        self.requests.labels(event.endpoint, event.method, status).inc()
+        self.duration.labels(event.endpoint).observe(event.elapsed)
+        self.response_size.labels(event.endpoint).observe(event.response_bytes)
+        for phase, seconds in event.timings.items():
+            self.phases.labels(event.endpoint, phase).observe(seconds)
+        if event.error is not None:
+            self.errors.labels(event.endpoint, event.error).inc()
+
+    def on_retry(
+        self, endpoint: str, attempt: int, delay: float, error: BaseException
+    ) -> None:
+        self.retries.labels(endpoint).inc()
+
+    def on_decode(self, endpoint: str, seconds: float, size: int) -> None:
+        self.decode.labels(endpoint).observe(seconds)
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Span OpenTelemetry на каждую попытку запроса (pip install opentelemetry-api).
+
+    В url.full значения параметров запроса заменяются на REDACTED.
+    """
+
+    def __init__(self, tracer: Any = None):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise RuntimeError(
+                "OpenTelemetryInstrumentation требует пакет opentelemetry-api."
+            )
+        self._status = trace.Status
+        self._status_code = trace.StatusCode
+        self.tracer = tracer if tracer is not None else trace.get_tracer("realtycloud")
+
+    def on_request_start(self, event: RequestEvent) -> None:
+        event.context["span"] = self.tracer.start_span(
+            f"realtycloud {event.endpoint}",
+            attributes={
+                "http.request.method": event.method,
+                "url.full": redact_url(event.url),
+                "realtycloud.endpoint": event.endpoint,
+                "realtycloud.attempt": event.attempt,
+                "http.request.body.size": event.request_bytes,
+            },
+        )
+
+    def on_request_end(self, event: RequestEvent) -> None:
+        span = event.context.pop("span", None)
+        if span is None:
+            return
+        if event.status_code is not None:
+            span.set_attribute("http.response.status_code", event.status_code)
+        span.set_attribute("http.response.body.size", event.response_bytes)
+        for phase, seconds in event.timings.items():
+            span.set_attribute(f"realtycloud.timing.{phase}", seconds)
+        if event.error is not None:
+            span.set_attribute("error.type", event.error)
+            span.set_status(self._status(self._status_code.ERROR, event.error))
+        span.end()
+
+
+def trace_extension(
+    event: RequestEvent, asynchronous: bool
+) -> Callable[[str, Dict[str, Any]], Optional[Awaitable[None]]]:
+    """Обработчик расширения trace httpx для синхронного или асинхронного клиента."""
+    return event._atrace if asynchronous else event._trace
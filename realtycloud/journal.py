@@ -0,0 +1,511 @@
+# -*- coding: utf-8 -*-
+import json
+import sqlite3
+import threading
+import time
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+)
+
+from realtycloud import settings
+from .exceptions import (
+    RealtycloudAPIStatusException,
+    RealtycloudServerErrorException,
+    RealtycloudTransportException,
+)
+from .request_objects import RealtyObject, RiskRequest
+from .tracking import FINAL_STATUSES
+from .validate import canonical_object_key
+
+__all__ = ["OrderRecord", "DoubtfulBatch", "OrderJournal", "is_certain_failure"]
+
+_SCHEMA = (
+    # Партии заказа записываются до отправки запроса
+    "CREATE TABLE IF NOT EXISTS batches ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, job TEXT, product_name TEXT NOT NULL, "
+    "size INTEGER NOT NULL, submitted_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS batch_items ("
+    "batch_id INTEGER NOT NULL, position INTEGER NOT NULL, product_name TEXT NOT NULL, "
+    "object TEXT NOT NULL, object_key TEXT, object_address TEXT, "
+    "PRIMARY KEY (batch_id, position))",
+    "CREATE INDEX IF NOT EXISTS batch_items_object ON batch_items (product_name, object)",
+    # Исход партии: идентификатор заказа или ошибка; certain = 1, если заказ
+    # заведомо не создан. Действует последний записанный исход партии
+    "CREATE TABLE IF NOT EXISTS outcomes ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, batch_id INTEGER NOT NULL, order_id TEXT, "
+    "error TEXT, certain INTEGER NOT NULL, recorded_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS outcomes_batch ON outcomes (batch_id, id)",
+    "CREATE VIEW IF NOT EXISTS last_outcomes AS SELECT * FROM outcomes "
+    "WHERE id IN (SELECT MAX(id) FROM outcomes GROUP BY batch_id)",
+    "CREATE TABLE IF NOT EXISTS order_items ("
+    "order_item_id TEXT PRIMARY KEY, batch_id INTEGER NOT NULL, position INTEGER NOT NULL, "
+    "product_name TEXT NOT NULL, object TEXT NOT NULL, price TEXT, recorded_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS order_items_object ON order_items (product_name, object)",
+    # Переходы статусов позиций: новая строка добавляется, только если статус изменился
+    "CREATE TABLE IF NOT EXISTS statuses ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, order_item_id TEXT NOT NULL, status TEXT, "
+    "data TEXT, recorded_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS statuses_item ON statuses (order_item_id, id)",
+)
+
+# Объект считается заказанным или заказ под вопросом, если хотя бы одна его
+# партия не завершилась заведомой ошибкой
+_CLAIMED = (
+    "SELECT DISTINCT bi.object FROM batch_items bi "
+    "LEFT JOIN last_outcomes o ON o.batch_id = bi.batch_id "
+    "WHERE bi.product_name = ? AND bi.object IN ({}) "
+    "AND (o.batch_id IS NULL OR o.error IS NULL OR o.certain = 0)"
+)
+
+# Число объектов в одном запросе проверки журнала
+_LOOKUP_CHUNK = 500
+
+
+def is_certain_failure(error: BaseException) -> bool:
+    """Ошибка заведомо означает, что заказ не создан и его можно повторить."""
+    if isinstance(error, RealtycloudTransportException):
+        return not error.request_sent
+    if isinstance(error, RealtycloudServerErrorException):
+        return False
+    if isinstance(error, RealtycloudAPIStatusException):
+        return error.http_status is not None and 400 <= error.http_status < 500
+    return False
+
+
+def object_id(item: RealtyObject) -> str:
+    """
+    Ключ объекта в журнале: канонический кадастровый номер (тот же, по
+    которому ищутся повторы) или, если номера нет, адрес. У запроса оценки
+    риска к нему добавляется отпечаток набора владельцев.
+    """
+    key = canonical_object_key(item.key) if item.key else item.address or ""
+    if isinstance(item, RiskRequest):
+        return f"{key}#{item.owners_digest()}"
+    return key
+
+
+def _raw_object_id(item: RealtyObject) -> str:
+    """Ключ объекта в журналах прежних версий: номер в том виде, как его указали."""
+    if isinstance(item, RiskRequest):
+        return f"{item.key or item.address or ''}#{item.owners_digest()}"
+    return item.key or item.address or ""
+
+
+class OrderRecord:
+    """Позиция заказа из журнала."""
+
+    __slots__ = (
+        "order_item_id",
+        "product_name",
+        "object",
+        "batch_id",
+        "job",
+        "status",
+        "data",
+    )
+
+    def __init__(
+        self,
+        order_item_id: str,
+        product_name: str,
+        object: str,
+        batch_id: int,
+        job: Optional[str],
+        status: Optional[str],
+        data: Optional[Dict],
+    ):
+        self.order_item_id = order_item_id
+        self.product_name = product_name
+        self.object = object
+        self.batch_id = batch_id
+        self.job = job
+        # Последний записанный статус и данные позиции (ссылки на файлы)
+        self.status = status
+        self.data = data or {}
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(order_item_id={self.order_item_id}, "
+            f"object={self.object}, status={self.status})"
+        )
+
+
+class DoubtfulBatch:
+    """Партия, про которую неизвестно, создан ли по ней заказ."""
+
+    __slots__ = ("batch_id", "job", "product_name", "objects", "submitted_at", "error")
+
+    def __init__(
+        self,
+        batch_id: int,
+        job: Optional[str],
+        product_name: str,
+        objects: List[str],
+        submitted_at: float,
+        error: Optional[str],
+    ):
+        self.batch_id = batch_id
+        self.job = job
+        self.product_name = product_name
+        self.objects = objects
+        self.submitted_at = submitted_at
+        # None, если процесс завершился, не дождавшись ответа
+        self.error = error
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(batch_id={self.batch_id}, "
+            f"size={len(self.objects)}, error={self.error})"
+        )
+
+
+class OrderJournal:
+    """
+    Журнал оптовых заказов в файле SQLite (режим WAL), переживающий сбои процесса.
+
+    Каждая партия записывается до отправки запроса, затем дописывается ее исход:
+    полученные order_item_id или ошибка. Записи только добавляются. Повторный
+    запуск того же задания пропускает уже заказанные объекты, поэтому ничего
+    не оплачивается дважды. Партии, отправленные без известного исхода (сбой во
+    время запроса, таймаут после отправки, ошибка 5xx), считаются «под вопросом»:
+    их объекты тоже пропускаются, пока партия не разобрана через mark_failed.
+    """
+
+    def __init__(self, path: str, synchronous: str = settings.JOURNAL_SYNCHRONOUS):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={synchronous}")
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        self._connection.commit()
+
+    def __enter__(self) -> "OrderJournal":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """Закрыть файл журнала."""
+        with self._lock:
+            self._connection.close()
+
+    def _claimed(self, product_name: str, objects: List[str]) -> Set[str]:
+        """Объекты из objects, которые заказаны или заказ которых под вопросом."""
+        query = _CLAIMED.format(",".join("?" * len(objects)))
+        with self._lock:
+            rows = self._connection.execute(query, [product_name, *objects]).fetchall()
+        return {row[0] for row in rows}
+
+    def _filter_chunk(
+        self,
+        product_name: str,
+        chunk: List[RealtyObject],
+        seen: Set[str],
+        skipped: Optional[Callable[[RealtyObject], None]],
+    ) -> List[RealtyObject]:
+        ids = [object_id(item) for item in chunk]
+        raw_ids = [_raw_object_id(item) for item in chunk]
+        claimed = self._claimed(product_name, list({*ids, *raw_ids}))
+        fresh = []
+        for object, raw, item in zip(ids, raw_ids, chunk):
+            if object in claimed or raw in claimed or object in seen:
+                if skipped is not None:
+                    skipped(item)
+                continue
+            seen.add(object)
+            fresh.append(item)
+        return fresh
+
+    def unordered(
+        self,
+        product_name: str,
+        items: Iterable[RealtyObject],
+        skipped: Optional[Callable[[RealtyObject], None]] = None,
+    ) -> Iterator[RealtyObject]:
+        """
+        Объекты items, которые еще не заказаны продуктом product_name; повторы
+        пропускаются. Каждый пропущенный объект передается в skipped.
+        """
+        seen: Set[str] = set()
+        chunk: List[RealtyObject] = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= _LOOKUP_CHUNK:
+                yield from self._filter_chunk(product_name, chunk, seen, skipped)
+                chunk = []
+        if chunk:
+            yield from self._filter_chunk(product_name, chunk, seen, skipped)
+
+    async def aunordered(
+        self,
+        product_name: str,
+        items: AsyncIterable[RealtyObject],
+        skipped: Optional[Callable[[RealtyObject], None]] = None,
+    ) -> AsyncIterator[RealtyObject]:
+        """Асинхронный вариант unordered."""
+        seen: Set[str] = set()
+        chunk: List[RealtyObject] = []
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) >= _LOOKUP_CHUNK:
+                for fresh in self._filter_chunk(product_name, chunk, seen, skipped):
+                    yield fresh
+                chunk = []
+        if chunk:
+            for fresh in self._filter_chunk(product_name, chunk, seen, skipped):
+                yield fresh
+
+    def begin_batch(
+        self, product_name: str, items: Iterable[RealtyObject], job: Optional[str] = None
+    ) -> int:
+        """Записать партию перед отправкой и вернуть ее номер."""
+        rows = [
+            (position, product_name, object_id(item), item.key, item.address)
+            for position, item in enumerate(items)
+        ]
+        with self._lock, self._connection:
+            batch_id = self._connection.execute(
+                "INSERT INTO batches (job, product_name, size, submitted_at) "
+                "VALUES (?, ?, ?, ?)",
+                (job, product_name, len(rows), time.time()),
+            ).lastrowid
+            self._connection.executemany(
+                "INSERT INTO batch_items (batch_id, position, product_name, object, "
+                "object_key, object_address) VALUES (?, ?, ?, ?, ?, ?)",
+                [(batch_id, *row) for row in rows],
+            )
+        return batch_id
+
+    def record_order(self, batch_id: int, data: Optional[Dict]) -> None:
+        """
+        Записать ответ API на партию: заказ и order_item_id его позиций.
+
+        Позиции ответа сопоставляются с объектами партии по порядку, поэтому
+        если их число не совпадает с размером партии, партия записывается
+        «под вопросом» с номером заказа в ошибке, а позиции не записываются.
+        """
+        data = data or {}
+        order_items = data.get("order_items") or []
+        now = time.time()
+        with self._lock, self._connection:
+            objects = self._connection.execute(
+                "SELECT position, product_name, object FROM batch_items "
+                "WHERE batch_id = ? ORDER BY position",
+                (batch_id,),
+            ).fetchall()
+            if len(order_items) != len(objects):
+                self._connection.execute(
+                    "INSERT INTO outcomes (batch_id, order_id, error, certain, recorded_at) "
+                    "VALUES (?, ?, ?, 0, ?)",
+                    (
+                        batch_id,
+                        data.get("id"),
+                        f"Заказ {data.get('id')}: позиций в ответе {len(order_items)}, "
+                        f"объектов в партии {len(objects)}",
+                        now,
+                    ),
+                )
+                return
+            self._connection.execute(
+                "INSERT INTO outcomes (batch_id, order_id, error, certain, recorded_at) "
+                "VALUES (?, ?, NULL, 1, ?)",
+                (batch_id, data.get("id"), now),
+            )
+            # Позиции ответа идут в порядке отправки объектов
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO order_items (order_item_id, batch_id, position, "
+                "product_name, object, price, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        order_item.get("order_item_id"),
+                        batch_id,
+                        position,
+                        order_item.get("product_name") or product_name,
+                        object,
+                        order_item.get("price"),
+                        now,
+                    )
+                    for (position, product_name, object), order_item in zip(
+                        objects, order_items
+                    )
+                    if order_item.get("order_item_id")
+                ],
+            )
+
+    def record_failure(self, batch_id: int, error: BaseException) -> None:
+        """Записать ошибку отправки партии."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO outcomes (batch_id, order_id, error, certain, recorded_at) "
+                "VALUES (?, NULL, ?, ?, ?)",
+                (batch_id, repr(error), int(is_certain_failure(error)), time.time()),
+            )
+
+    def mark_failed(self, batch_id: int, reason: str = "manual") -> None:
+        """
+        Признать партию «под вопросом» незаказанной после сверки с личным кабинетом.
+
+        Объекты партии снова будут заказаны при следующем запуске задания.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO outcomes (batch_id, order_id, error, certain, recorded_at) "
+                "VALUES (?, NULL, ?, 1, ?)",
+                (batch_id, reason, time.time()),
+            )
+
+    def record_statuses(self, items: Iterable[Dict]) -> int:
+        """Дописать изменившиеся статусы позиций из ответа check_status; вернуть число переходов."""
+        rows = [
+            (item.get("order_item_id"), item.get("status"), item.get("data"))
+            for item in items
+            if item.get("order_item_id")
+        ]
+        if not rows:
+            return 0
+        now = time.time()
+        changed = 0
+        with self._lock, self._connection:
+            for order_item_id, status, data in rows:
+                last = self._connection.execute(
+                    "SELECT status FROM statuses WHERE order_item_id = ? "
+                    "ORDER BY id DESC LIMIT 1",
+                    (order_item_id,),
+                ).fetchone()
+                if last is not None and last[0] == status:
+                    continue
+                self._connection.execute(
+                    "INSERT INTO statuses (order_item_id, status, data, recorded_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (order_item_id, status, json.dumps(data or {}, ensure_ascii=False), now),
+                )
+                changed += 1
+        return changed
+
+    def order_items(
+        self, job: Optional[str] = None, product_name: Optional[str] = None
+    ) -> List[OrderRecord]:
+        """Позиции заказов из журнала с последними статусами."""
+        query = (
+            "SELECT oi.order_item_id, oi.product_name, oi.object, oi.batch_id, b.job, "
+            "s.status, s.data FROM order_items oi "
+            "JOIN batches b ON b.id = oi.batch_id "
+            "LEFT JOIN statuses s ON s.id = ("
+            "SELECT MAX(id) FROM statuses WHERE order_item_id = oi.order_item_id) "
+            "WHERE (? IS NULL OR b.job = ?) AND (? IS NULL OR oi.product_name = ?) "
+            "ORDER BY oi.batch_id, oi.position"
+        )
+        with self._lock:
+            rows = self._connection.execute(
+                query, (job, job, product_name, product_name)
+            ).fetchall()
+        return [
+            OrderRecord(*row[:6], json.loads(row[6]) if row[6] else None) for row in rows
+        ]
+
+    def pending_order_item_ids(
+        self, job: Optional[str] = None, final_statuses: Iterable[str] = FINAL_STATUSES
+    ) -> List[str]:
+        """Позиции, которые еще не перешли в итоговый статус."""
+        final = frozenset(final_statuses)
+        return [
+            record.order_item_id
+            for record in self.order_items(job)
+            if record.status not in final
+        ]
+
+    def doubtful_batches(self, job: Optional[str] = None) -> List[DoubtfulBatch]:
+        """Партии без ответа API или с ошибкой, после которой заказ мог быть создан."""
+        query = (
+            "SELECT b.id, b.job, b.product_name, b.submitted_at, o.error FROM batches b "
+            "LEFT JOIN last_outcomes o ON o.batch_id = b.id "
+            "WHERE (o.batch_id IS NULL OR (o.error IS NOT NULL AND o.certain = 0)) "
+            "AND (? IS NULL OR b.job = ?) ORDER BY b.id"
+        )
+        with self._lock:
+            batches = self._connection.execute(query, (job, job)).fetchall()
+            result = []
+            for batch_id, batch_job, product_name, submitted_at, error in batches:
+                objects = [
+                    row[0]
+                    for row in self._connection.execute(
+                        "SELECT object FROM batch_items WHERE batch_id = ? ORDER BY position",
+                        (batch_id,),
+                    )
+                ]
+                result.append(
+                    DoubtfulBatch(batch_id, batch_job, product_name, objects, submitted_at, error)
+                )
+        return result
+
+    def journaled(
+        self,
+        send: Callable[[List[RealtyObject]], Optional[Dict]],
+        product_name: str,
+        job: Optional[str] = None,
+    ) -> Callable[[List[RealtyObject]], Optional[Dict]]:
+        """Обернуть отправку партии записью в журнал до запроса и после него."""
+
+        def journaled_send(items: List[RealtyObject]) -> Optional[Dict]:
+            batch_id = self.begin_batch(product_name, items, job)
+            try:
+                data = send(items)
+            except BaseException as e:
+                self.record_failure(batch_id, e)
+                raise
+            self.record_order(batch_id, data)
+            return data
+
+        return journaled_send
+
+    def journaled_async(
+        self,
+        send: Callable[[List[RealtyObject]], Awaitable[Optional[Dict]]],
+        product_name: str,
+        job: Optional[str] = None,
+    ) -> Callable[[List[RealtyObject]], Awaitable[Optional[Dict]]]:
+        """Асинхронный вариант journaled."""
+
+        async def journaled_send(items: List[RealtyObject]) -> Optional[Dict]:
+            batch_id = self.begin_batch(product_name, items, job)
+            try:
+                data = await send(items)
+            except BaseException as e:
+                # Отмена задачи (CancelledError) во время запроса оставляет
+                # заказ под вопросом: он мог быть создан
+                self.record_failure(batch_id, e)
+                raise
+            self.record_order(batch_id, data)
+            return data
+
+        return journaled_send
+
+    def stats(self, job: Optional[str] = None) -> Dict[str, int]:
+        """Число партий, заказанных позиций и партий под вопросом."""
+        with self._lock:
+            batches, items = self._connection.execute(
+                "SELECT COUNT(DISTINCT b.id), COUNT(oi.order_item_id) FROM batches b "
+                "LEFT JOIN order_items oi ON oi.batch_id = b.id "
+                "WHERE (? IS NULL OR b.job = ?)",
+                (job, job),
+            ).fetchone()
+        return {
+            "batches": batches,
+            "order_items": items,
+            "doubtful_batches": len(self.doubtful_batches(job)),
+        }
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path={self.path!r})"
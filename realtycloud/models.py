@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+__all__ = [
+    "LazyDocument",
+    "Model",
+    "SuggestItem",
+    "ObjectInfo",
+    "Right",
+    "House",
+    "OrderItem",
+    "Order",
+    "StatusItem",
+]
+
+_MISSING = object()
+
+
+class LazyDocument(Mapping):
+    """
+    Ответ API с отложенным разбором JSON.
+
+    Разбор откладывается до первого обращения к данным и выполняется для
+    всего документа сразу: отдельные поля по требованию не разбираются.
+    Ответ, к данным которого не обращались (например, сохраненный только
+    ради raw), не разбирается вовсе.
+    """
+
+    __slots__ = ("raw", "_loads", "_data")
+
+    def __init__(self, raw: bytes, loads: Callable[[bytes], Any]):
+        self.raw = raw
+        self._loads = loads
+        self._data = _MISSING
+
+    @property
+    def data(self) -> Any:
+        """Разобранный документ."""
+        if self._data is _MISSING:
+            self._data = self._loads(self.raw)
+        return self._data
+
+    @property
+    def decoded(self) -> bool:
+        """Документ уже разобран."""
+        return self._data is not _MISSING
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LazyDocument":
+        # Копия разбирается заново из raw: это дешевле копирования разобранных данных
+        return LazyDocument(self.raw, self._loads)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={len(self.raw)}, decoded={self.decoded})"
+
+
+class Field:
+    """Типизированное поле модели, читаемое из данных ответа при первом обращении."""
+
+    def __init__(
+        self,
+        name: str,
+        model: Optional[Type["Model"]] = None,
+        many: bool = False,
+        default: Any = None,
+        aliases: Tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.model = model
+        self.many = many
+        self.default = default
+        # Другие имена поля в ответах API, проверяемые после name
+        self.aliases = aliases
+        self.attr = name
+
+    def __set_name__(self, owner: type, attr: str) -> None:
+        self.attr = attr
+
+    def __get__(self, obj: Optional["Model"], owner: type) -> Any:
+        if obj is None:
+            return self
+        values = obj._values
+        try:
+            return values[self.attr]
+        except KeyError:
+            pass
+        data = obj.data
+        value = data.get(self.name, _MISSING)
+        for alias in self.aliases:
+            if value is not _MISSING:
+                break
+            value = data.get(alias, _MISSING)
+        if value is _MISSING:
+            value = self.default
+        if self.model is not None and value is not None:
+            if self.many:
+                value = [self.model(item) for item in value]
+            else:
+                value = self.model(value)
+        values[self.attr] = value
+        return value
+
+
+class Model(Mapping):
+    """
+    Модель ответа API поверх словаря или LazyDocument.
+
+    Модель ведет себя как исходный словарь ответа (get, [], итерация), а
+    типизированные поля превращаются во вложенные модели только при первом
+    обращении к ним. Если модель создана из LazyDocument, ответ разбирается
+    при первом обращении к данным, а исходные байты доступны в raw.
+    """
+
+    __slots__ = ("_source", "_key", "_values")
+
+    def __init__(self, source: Mapping, key: Optional[str] = None):
+        self._source = source
+        # Ключ, под которым в source лежат данные модели (например, "data")
+        self._key = key
+        self._values: Dict[str, Any] = {}
+
+    @property
+    def data(self) -> Mapping:
+        """Данные модели в виде словаря из ответа API."""
+        if self._key is None:
+            return self._source
+        data = self._values.get("__data__")
+        if data is None:
+            data = self._values["__data__"] = self._source.get(self._key) or {}
+        return data
+
+    @property
+    def raw(self) -> Optional[bytes]:
+        """Исходные байты ответа или None, если модель создана из словаря."""
+        return self._source.raw if isinstance(self._source, LazyDocument) else None
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.data)!r})"
+
+
+class SuggestItem(Model):
+    """Объект из результатов поиска по адресу."""
+
+    __slots__ = ()
+
+    object_type: Optional[str] = Field("ObjectType")
+    number: Optional[str] = Field("Number")
+    address: Optional[str] = Field("Address")
+    area: Optional[str] = Field("Area")
+    cadastral_price: Optional[str] = Field("kad_price")
+    status: Optional[str] = Field("Status")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь в формате, который возвращает suggest без моделей."""
+        return {
+            "object_type": self.object_type,
+            "number": self.number,
+            "address": self.address,
+            "area": self.area,
+            "cadastral_price": self.cadastral_price,
+            "status": self.status,
+        }
+
+
+class Right(Model):
+    """Зарегистрированное право на объект недвижимости."""
+
+    __slots__ = ()
+
+    number: Optional[str] = Field("number")
+    type: Optional[str] = Field("type")
+    date: Optional[str] = Field("date")
+
+
+class ObjectInfo(Model):
+    """Сведения об объекте недвижимости по кадастровому номеру (objectFull)."""
+
+    __slots__ = ()
+
+    object_key: Optional[str] = Field("object_key", aliases=("number", "Number"))
+    object_type: Optional[str] = Field("object_type", aliases=("ObjectType",))
+    address: Optional[str] = Field("address", aliases=("Address",))
+    area: Optional[Any] = Field("area", aliases=("Area",))
+    cadastral_price: Optional[Any] = Field("cadastral_price", aliases=("kad_price",))
+    status: Optional[str] = Field("status", aliases=("Status",))
+    rights: List[Right] = Field("rights", Right, many=True, default=())
+
+
+class House(Model):
+    """Сведения о доме."""
+
+    __slots__ = ()
+
+    address: Optional[str] = Field("address")
+    floors: Optional[int] = Field("floors")
+    flat: Optional[Any] = Field("flat")
+
+
+class OrderItem(Model):
+    """Позиция созданного заказа."""
+
+    __slots__ = ()
+
+    order_item_id: Optional[str] = Field("order_item_id")
+    product_name: Optional[str] = Field("product_name")
+    price: Optional[str] = Field("price")
+
+
+class Order(Model):
+    """Созданный заказ."""
+
+    __slots__ = ()
+
+    id: Optional[str] = Field("id")
+    order_items: List[OrderItem] = Field("order_items", OrderItem, many=True, default=())
+    total_amount: Optional[str] = Field("total_amount")
+    account_info: Optional[Dict] = Field("account_info")
+
+
+class StatusItem(Model):
+    """Статус позиции заказа."""
+
+    __slots__ = ()
+
+    order_item_id: Optional[str] = Field("order_item_id")
+    product_name: Optional[str] = Field("product_name")
+    status: Optional[str] = Field("status")
+
+    @property
+    def file_pdf_url(self) -> Optional[str]:
+        """Ссылка на отчет в формате PDF."""
+        return (self.data.get("data") or {}).get("file_pdf_url")
+
+    @property
+    def file_signed_zip_url(self) -> Optional[str]:
+        """Ссылка на zip-архив с подписью."""
+        return (self.data.get("data") or {}).get("file_signed_zip_url")
@@ -0,0 +1,579 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import inspect
+import os
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from realtycloud import settings
+from .deadline import Deadline, activate
+from .download import DownloadResult, report_jobs
+from .exceptions import RealtycloudBatchMismatchException, RealtycloudException
+from .request_objects import RealtyObject
+from .tracking import AsyncOrderTracker
+
+__all__ = ["PipelineItem", "AsyncPipeline", "report_pipeline"]
+
+# Признак конца потока в очередях между стадиями
+_END = object()
+
+
+class PipelineItem:
+    """Элемент конвейера: исходное значение, результаты стадий и ошибка."""
+
+    __slots__ = ("source", "value", "results", "error", "stage", "deadline")
+
+    def __init__(self, source: Any, deadline: Optional[Deadline] = None):
+        self.source = source
+        self.value = source
+        self.results: Dict[str, Any] = {}
+        self.error: Optional[BaseException] = None
+        # Стадия, на которой произошла ошибка
+        self.stage: Optional[str] = None
+        # Срок обработки элемента до стадии ожидания статуса
+        self.deadline = deadline
+
+    @property
+    def ok(self) -> bool:
+        """Элемент прошел все стадии без ошибок."""
+        return self.error is None
+
+    def _set(self, stage: str, value: Any) -> None:
+        self.results[stage] = value
+        self.value = value
+
+    def _fail(self, stage: str, error: BaseException) -> None:
+        self.error = error
+        self.stage = stage
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else f"{self.stage}: {self.error!r}"
+        return f"{self.__class__.__name__}(source={self.source!r}, {status})"
+
+
+async def _call(fn: Callable[[Any], Any], arg: Any) -> Any:
+    """Вызвать обычную функцию или корутину."""
+    result = fn(arg)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def _call_within(
+    fn: Callable[[Any], Any],
+    arg: Any,
+    deadline: Optional[Deadline],
+    timeout: Optional[float],
+) -> Any:
+    """Вызвать fn под сроком элемента deadline и сроком вызова timeout."""
+    with activate(deadline):
+        if timeout is not None:
+            deadline = Deadline(timeout)
+        if deadline is not None:
+            deadline.check()
+        with activate(deadline):
+            return await _call(fn, arg)
+
+
+class _Stage:
+    """Стадия конвейера, читающая элементы из inbox и передающая их в outbox."""
+
+    def __init__(self, name: str, concurrency: int):
+        if concurrency < 1:
+            raise ValueError("Число обработчиков стадии должно быть положительным.")
+        self.name = name
+        self.concurrency = concurrency
+
+    async def run(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        await asyncio.gather(
+            *(self._worker(inbox, outbox) for _ in range(self.concurrency))
+        )
+        await outbox.put(_END)
+
+    async def _worker(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _END:
+                # Признак конца нужен и остальным обработчикам стадии
+                inbox.put_nowait(_END)
+                return
+            if item.ok:
+                await self._process(item)
+            await outbox.put(item)
+
+    async def _process(self, item: PipelineItem) -> None:
+        raise NotImplementedError
+
+
+class _MapStage(_Stage):
+    def __init__(
+        self,
+        name: str,
+        fn: Callable,
+        concurrency: int,
+        pass_item: bool,
+        timeout: Optional[float],
+    ):
+        super().__init__(name, concurrency)
+        self.fn = fn
+        self.pass_item = pass_item
+        self.timeout = timeout
+
+    async def _process(self, item: PipelineItem) -> None:
+        try:
+            item._set(
+                self.name,
+                await _call_within(
+                    self.fn,
+                    item if self.pass_item else item.value,
+                    item.deadline,
+                    self.timeout,
+                ),
+            )
+        except Exception as e:
+            item._fail(self.name, e)
+
+
+class _BatchStage(_Stage):
+    def __init__(
+        self,
+        name: str,
+        fn: Callable,
+        size: int,
+        concurrency: int,
+        max_wait: Optional[float],
+        pass_item: bool,
+        timeout: Optional[float],
+    ):
+        super().__init__(name, concurrency)
+        if size < 1:
+            raise ValueError("Размер партии должен быть положительным числом.")
+        self.fn = fn
+        self.size = size
+        self.max_wait = max_wait
+        self.pass_item = pass_item
+        self.timeout = timeout
+
+    async def run(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        workers = [
+            asyncio.ensure_future(self._chunk_worker(chunks, outbox))
+            for _ in range(self.concurrency)
+        ]
+        try:
+            chunk: List[PipelineItem] = []
+            while True:
+                try:
+                    if chunk and self.max_wait is not None:
+                        item = await asyncio.wait_for(inbox.get(), self.max_wait)
+                    else:
+                        item = await inbox.get()
+                except asyncio.TimeoutError:
+                    # Неполная партия отправляется, чтобы не задерживать элементы
+                    await chunks.put(chunk)
+                    chunk = []
+                    continue
+                if item is _END:
+                    break
+                if item.ok and item.deadline is not None:
+                    # Элемент с истекшим сроком не попадает в партию
+                    try:
+                        item.deadline.check()
+                    except RealtycloudException as e:
+                        item._fail(self.name, e)
+                if not item.ok:
+                    await outbox.put(item)
+                    continue
+                chunk.append(item)
+                if len(chunk) >= self.size:
+                    await chunks.put(chunk)
+                    chunk = []
+            if chunk:
+                await chunks.put(chunk)
+            await chunks.put(_END)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        await outbox.put(_END)
+
+    async def _chunk_worker(self, chunks: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        while True:
+            chunk = await chunks.get()
+            if chunk is _END:
+                chunks.put_nowait(_END)
+                return
+            try:
+                results = list(
+                    await _call_within(
+                        self.fn,
+                        chunk if self.pass_item else [item.value for item in chunk],
+                        # Партия ограничена самым ранним сроком своих элементов
+                        min(
+                            (item.deadline for item in chunk if item.deadline is not None),
+                            key=lambda deadline: deadline.expires_at,
+                            default=None,
+                        ),
+                        self.timeout,
+                    )
+                )
+                if len(results) != len(chunk):
+                    # Вызов уже выполнен (заказ мог быть создан и оплачен), поэтому
+                    # его результаты не отбрасываются, а передаются в исключении
+                    raise RealtycloudBatchMismatchException(
+                        f"Стадия {self.name} вернула {len(results)} результатов для {len(chunk)} элементов.",
+                        results,
+                    )
+            except Exception as e:
+                for item in chunk:
+                    item._fail(self.name, e)
+            else:
+                for item, result in zip(chunk, results):
+                    item._set(self.name, result)
+            for item in chunk:
+                await outbox.put(item)
+
+
+class _TrackStage(_Stage):
+    """
+    Ожидание итогового статуса позиций заказа через AsyncOrderTracker.
+
+    Неудачный опрос повторяется по расписанию трекера; после max_poll_failures
+    неудачных опросов подряд все ожидающие позиции возвращаются с ошибкой
+    последнего опроса.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch_status: Callable,
+        key: Callable[[Any], str],
+        max_pending: int,
+        max_poll_failures: int,
+        tracker_options: Dict[str, Any],
+    ):
+        super().__init__(name, 1)
+        self.fetch_status = fetch_status
+        self.key = key
+        self.max_pending = max_pending
+        self.max_poll_failures = max_poll_failures
+        self.tracker_options = tracker_options
+
+    async def run(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        tracker = AsyncOrderTracker(self.fetch_status, **self.tracker_options)
+        waiting: Dict[str, List[PipelineItem]] = {}
+        # Ограничение числа ожидающих позиций: конвейер не читает вход дальше
+        slots = asyncio.Semaphore(self.max_pending)
+        changed = asyncio.Event()
+        finished = False
+        failures = 0
+
+        async def collect() -> None:
+            nonlocal finished
+            while True:
+                item = await inbox.get()
+                if item is _END:
+                    break
+                if not item.ok:
+                    await outbox.put(item)
+                    continue
+                try:
+                    order_item_id = self.key(item.value)
+                except Exception as e:
+                    item._fail(self.name, e)
+                    await outbox.put(item)
+                    continue
+                await slots.acquire()
+                # Ожидание статуса и следующие стадии не ограничены сроком элемента
+                item.deadline = None
+                waiting.setdefault(order_item_id, []).append(item)
+                tracker.add([order_item_id])
+                changed.set()
+            finished = True
+            changed.set()
+
+        collector = asyncio.ensure_future(collect())
+        try:
+            while True:
+                changed.clear()
+                delay = tracker.next_poll_in()
+                if delay is None:
+                    if finished:
+                        break
+                    await changed.wait()
+                    continue
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(changed.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                try:
+                    events = await tracker.poll()
+                except Exception as e:
+                    failures += 1
+                    if failures < self.max_poll_failures:
+                        # Позиции уже перенесены трекером на следующий опрос
+                        continue
+                    failures = 0
+                    tracker.discard(list(waiting))
+                    for items in waiting.values():
+                        for item in items:
+                            item._fail(self.name, e)
+                            slots.release()
+                            await outbox.put(item)
+                    waiting.clear()
+                    continue
+                failures = 0
+                for event in events:
+                    for item in waiting.pop(event.order_item_id, ()):
+                        item._set(self.name, event.item)
+                        slots.release()
+                        await outbox.put(item)
+            await collector
+        finally:
+            collector.cancel()
+        await outbox.put(_END)
+
+
+class AsyncPipeline:
+    """
+    Потоковый конвейер обработки с отдельной конкурентностью каждой стадии.
+
+    Стадии соединены очередями ограниченного размера queue_size: если
+    следующая стадия не успевает, предыдущие ждут, а вход читается только
+    по мере освобождения места, поэтому память не зависит от объема входа.
+    Ошибка элемента сохраняется в PipelineItem.error, элемент пропускает
+    остальные стадии и возвращается вместе с остальными результатами.
+
+    Источник - обычный или асинхронный итерируемый объект; функции стадий -
+    обычные функции или корутины.
+
+    item_deadline ограничивает время обработки элемента от входа в конвейер
+    до стадии track (Deadline, общий для всех запросов и повторов элемента),
+    а timeout стадий map и batch - время одного вызова функции стадии.
+    """
+
+    def __init__(
+        self,
+        source: Union[Iterable[Any], AsyncIterable[Any]],
+        queue_size: int = settings.PIPELINE_QUEUE_SIZE,
+        item_deadline: Optional[float] = None,
+    ):
+        self._source = source
+        self.queue_size = queue_size
+        self.item_deadline = item_deadline
+        self._stages: List[_Stage] = []
+
+    def map(
+        self,
+        fn: Callable[[Any], Any],
+        concurrency: int = 1,
+        name: Optional[str] = None,
+        pass_item: bool = False,
+        timeout: Optional[float] = None,
+    ) -> "AsyncPipeline":
+        """
+        Добавить стадию, применяющую fn к каждому элементу.
+
+        При pass_item=True fn получает PipelineItem с результатами прошлых стадий.
+        """
+        self._stages.append(
+            _MapStage(
+                name or f"stage{len(self._stages)}", fn, concurrency, pass_item, timeout
+            )
+        )
+        return self
+
+    def batch(
+        self,
+        fn: Callable[[List[Any]], Iterable[Any]],
+        size: int,
+        concurrency: int = 1,
+        max_wait: Optional[float] = None,
+        name: Optional[str] = None,
+        pass_item: bool = False,
+        timeout: Optional[float] = None,
+    ) -> "AsyncPipeline":
+        """
+        Добавить стадию, обрабатывающую элементы партиями по size.
+
+        fn возвращает результаты в порядке элементов партии. Неполная партия
+        отправляется, если новые элементы не приходят max_wait секунд. Если
+        результатов не столько, сколько элементов, элементы партии получают
+        ошибку RealtycloudBatchMismatchException, в поле results которой
+        сохранены все результаты вызова.
+        """
+        self._stages.append(
+            _BatchStage(
+                name or f"stage{len(self._stages)}",
+                fn,
+                size,
+                concurrency,
+                max_wait,
+                pass_item,
+                timeout,
+            )
+        )
+        return self
+
+    def track(
+        self,
+        fetch_status: Callable,
+        key: Callable[[Any], str] = lambda value: value["order_item_id"],
+        max_pending: int = settings.PIPELINE_MAX_PENDING_ORDERS,
+        name: Optional[str] = None,
+        max_poll_failures: int = settings.PIPELINE_TRACK_MAX_POLL_FAILURES,
+        **tracker_options,
+    ) -> "AsyncPipeline":
+        """
+        Добавить стадию ожидания итогового статуса позиции заказа.
+
+        key возвращает order_item_id по значению элемента; опрос ведет
+        AsyncOrderTracker с параметрами tracker_options. Не более max_pending
+        позиций ожидают статус одновременно. После max_poll_failures
+        неудачных опросов подряд ожидающие элементы возвращаются с ошибкой.
+        """
+        self._stages.append(
+            _TrackStage(
+                name or f"stage{len(self._stages)}",
+                fetch_status,
+                key,
+                max_pending,
+                max_poll_failures,
+                tracker_options,
+            )
+        )
+        return self
+
+    def _item(self, value: Any) -> PipelineItem:
+        if self.item_deadline is None:
+            return PipelineItem(value)
+        return PipelineItem(value, Deadline(self.item_deadline))
+
+    async def _feed(self, outbox: asyncio.Queue) -> None:
+        if hasattr(self._source, "__aiter__"):
+            async for value in self._source:
+                await outbox.put(self._item(value))
+        else:
+            for value in self._source:
+                await outbox.put(self._item(value))
+        await outbox.put(_END)
+
+    async def __aiter__(self) -> AsyncIterator[PipelineItem]:
+        queues = [
+            asyncio.Queue(maxsize=self.queue_size)
+            for _ in range(len(self._stages) + 1)
+        ]
+        tasks = [asyncio.ensure_future(self._feed(queues[0]))]
+        for stage, inbox, outbox in zip(self._stages, queues, queues[1:]):
+            tasks.append(asyncio.ensure_future(stage.run(inbox, outbox)))
+        results = queues[-1]
+        try:
+            while True:
+                getter = asyncio.ensure_future(results.get())
+                # Ошибка в коде стадии не должна приводить к вечному ожиданию
+                done, _ = await asyncio.wait(
+                    [getter, *tasks], return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter not in done:
+                    getter.cancel()
+                    for task in done:
+                        if task.exception() is not None:
+                            raise task.exception()
+                    tasks = [task for task in tasks if not task.done()]
+                    continue
+                item = getter.result()
+                if item is _END:
+                    return
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def _first_number(items: List[Any]) -> str:
+    """Кадастровый номер первого объекта из результатов suggest."""
+    for item in items:
+        number = getattr(item, "number", None) or item.get("number")
+        if number:
+            return number
+    raise RealtycloudException("По адресу не найдено ни одного объекта.")
+
+
+def report_pipeline(
+    client: Any,
+    addresses: Union[Iterable[str], AsyncIterable[str]],
+    directory: str,
+    select: Callable[[List[Any]], str] = _first_number,
+    with_info: bool = True,
+    lookup_concurrency: int = settings.PIPELINE_LOOKUP_CONCURRENCY,
+    order_batch_size: int = settings.ORDER_BATCH_SIZE,
+    order_concurrency: int = settings.ORDER_MAX_IN_FLIGHT,
+    order_max_wait: Optional[float] = settings.PIPELINE_ORDER_MAX_WAIT_SEC,
+    download_concurrency: int = settings.DOWNLOAD_MAX_PARALLEL,
+    priority: bool = False,
+    queue_size: int = settings.PIPELINE_QUEUE_SIZE,
+    item_deadline: Optional[float] = None,
+    **tracker_options,
+) -> AsyncPipeline:
+    """
+    Конвейер «адрес → отчет» для AsyncRealtycloud: suggest → info → заказ
+    объекта → ожидание статуса → загрузка файлов отчета в directory.
+
+    Результаты стадий доступны в PipelineItem.results под ключами suggest,
+    info, order, status и download (список DownloadResult). item_deadline
+    ограничивает время от входа адреса в конвейер до создания заказа.
+    """
+    os.makedirs(directory, exist_ok=True)
+    downloader = client.downloader()
+
+    async def suggest(address: str) -> RealtyObject:
+        return RealtyObject(select(await client.suggest(address)), address)
+
+    async def info(item: PipelineItem) -> Any:
+        return await client.info(item.results["suggest"].key)
+
+    async def order(items: List[PipelineItem]) -> List[Any]:
+        requests = [item.results["suggest"] for item in items]
+        data = await client.order_multiple_objects(requests, priority=priority)
+        return (data or {}).get("order_items", [])
+
+    async def download(status_item: Dict) -> List[DownloadResult]:
+        results = []
+        for url, destination in report_jobs([status_item], directory):
+            try:
+                size = await downloader.download(url, destination)
+                results.append(DownloadResult(url, destination, size))
+            except Exception as e:
+                results.append(DownloadResult(url, destination, error=e))
+        return results
+
+    pipeline = AsyncPipeline(
+        addresses, queue_size=queue_size, item_deadline=item_deadline
+    ).map(
+        suggest, lookup_concurrency, name="suggest"
+    )
+    if with_info:
+        pipeline.map(info, lookup_concurrency, name="info", pass_item=True)
+    return (
+        pipeline.batch(
+            order,
+            order_batch_size,
+            order_concurrency,
+            max_wait=order_max_wait,
+            name="order",
+            pass_item=True,
+        )
+        .track(client.check_status, name="status", **tracker_options)
+        .map(download, download_concurrency, name="download")
+    )
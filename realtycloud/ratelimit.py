@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+from httpx import Response
+
+from realtycloud import settings
+
+__all__ = [
+    "TokenBucket",
+    "FileTokenBucket",
+    "RateLimiter",
+    "parse_retry_after",
+    "retry_after_seconds",
+]
+
+
+def retry_after_seconds(response: Response) -> Optional[float]:
+    """Значение заголовка Retry-After в секундах или None, если его нет."""
+    return parse_retry_after(response.headers.get("Retry-After"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбор значения Retry-After: число секунд или HTTP-дата."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+class _BucketState:
+    """Состояние корзины токенов."""
+
+    __slots__ = ("tokens", "updated", "rate", "blocked_until")
+
+    def __init__(self, tokens: float, updated: float, rate: float, blocked_until: float):
+        self.tokens = tokens
+        self.updated = updated
+        self.rate = rate
+        self.blocked_until = blocked_until
+
+
+class TokenBucket:
+    """
+    Корзина токенов с адаптивной скоростью, общая для потоков и задач asyncio.
+
+    Скорость пополнения снижается в decrease_factor раз при сообщении о
+    превышении лимита (penalize) и постепенно восстанавливается до rate
+    после успешных запросов (reward).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        decrease_factor: float = settings.RATE_LIMIT_DECREASE_FACTOR,
+        increase_step: Optional[float] = None,
+    ):
+        if rate <= 0:
+            raise ValueError("Скорость должна быть положительным числом.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.min_rate = min_rate if min_rate is not None else rate / 20
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step if increase_step is not None else rate / 20
+        self._lock = threading.Lock()
+        self._state = _BucketState(self.capacity, time.time(), rate, 0.0)
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[_BucketState]:
+        """Монопольный доступ к состоянию корзины."""
+        with self._lock:
+            yield self._state
+
+    def _refill(self, state: _BucketState, now: float) -> None:
+        state.tokens = min(
+            self.capacity, state.tokens + (now - state.updated) * state.rate
+        )
+        state.updated = now
+
+    def reserve(self) -> float:
+        """Занять токен и вернуть, сколько секунд нужно подождать перед запросом."""
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            state.tokens -= 1
+            return max(0.0, -state.tokens / state.rate, state.blocked_until - now)
+
+    def acquire(self) -> None:
+        """Дождаться разрешения на запрос."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Асинхронно дождаться разрешения на запрос."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        """Снизить скорость после превышения лимита и при необходимости приостановить запросы."""
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            state.rate = max(self.min_rate, state.rate * self.decrease_factor)
+            state.tokens = min(state.tokens, 0.0)
+            if retry_after:
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+
+    def reward(self) -> None:
+        """Постепенно вернуть скорость к исходной после успешного запроса."""
+        with self._locked_state() as state:
+            if state.rate < self.rate:
+                self._refill(state, time.time())
+                state.rate = min(self.rate, state.rate + self.increase_step)
+
+    @property
+    def current_rate(self) -> float:
+        """Текущая скорость пополнения, запросов в секунду."""
+        with self._locked_state() as state:
+            return state.rate
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Корзина токенов, состояние которой хранится в файле и разделяется
+    между процессами. Доступ к файлу блокируется через fcntl (только POSIX).
+    """
+
+    def __init__(self, path: str, rate: float, capacity: Optional[float] = None, **kwargs):
+        try:
+            import fcntl
+        except ImportError:
+            raise RuntimeError(
+                "FileTokenBucket требует модуль fcntl и доступен только на POSIX-системах."
+            )
+        self._fcntl = fcntl
+        super().__init__(rate, capacity, **kwargs)
+        self.path = path
+        # Файл создается, только если его еще нет: состояние общее для процессов
+        with open(path, "a"):
+            pass
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[_BucketState]:
+        with self._lock, open(self.path, "r+") as file:
+            self._fcntl.flock(file.fileno(), self._fcntl.LOCK_EX)
+            try:
+                raw = file.read()
+                state = (
+                    _BucketState(**json.loads(raw))
+                    if raw
+                    else _BucketState(self.capacity, time.time(), self.rate, 0.0)
+                )
+                yield state
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps({name: getattr(state, name) for name in state.__slots__}))
+                file.flush()
+            finally:
+                self._fcntl.flock(file.fileno(), self._fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов по семействам методов API.
+
+    limits сопоставляет семейству (search, dadata, objectFull, house, order,
+    orders) пару (запросов в секунду, размер всплеска). Если указан каталог
+    path, состояние хранится в файлах и разделяется между процессами.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Mapping[str, Tuple[float, float]]] = None,
+        path: Optional[str] = None,
+    ):
+        if limits is None:
+            limits = settings.RATE_LIMITS
+        self._buckets: Dict[str, TokenBucket] = {}
+        for endpoint, (rate, capacity) in limits.items():
+            if path is not None:
+                bucket = FileTokenBucket(
+                    os.path.join(path, f"{endpoint}.bucket"), rate, capacity
+                )
+            else:
+                bucket = TokenBucket(rate, capacity)
+            self._buckets[endpoint] = bucket
+
+    def bucket(self, endpoint: str) -> Optional[TokenBucket]:
+        """Корзина семейства методов или None, если оно не ограничено."""
+        return self._buckets.get(endpoint)
+
+    def reserve(self, endpoint: str) -> float:
+        """Занять токен семейства методов и вернуть, сколько секунд нужно подождать."""
+        bucket = self._buckets.get(endpoint)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def acquire(self, endpoint: str) -> None:
+        """Дождаться разрешения на запрос к семейству методов."""
+        bucket = self._buckets.get(endpoint)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def acquire_async(self, endpoint: str) -> None:
+        """Асинхронно дождаться разрешения на запрос к семейству методов."""
+        bucket = self._buckets.get(endpoint)
+        if bucket is not None:
+            await bucket.acquire_async()
+
+    def penalize(self, endpoint: str, retry_after: Optional[float] = None) -> None:
+        """Сообщить о превышении лимита семейства методов."""
+        bucket = self._buckets.get(endpoint)
+        if bucket is not None:
+            bucket.penalize(retry_after)
+
+    def reward(self, endpoint: str) -> None:
+        """Сообщить об успешном запросе к семейству методов."""
+        bucket = self._buckets.get(endpoint)
+        if bucket is not None:
+            bucket.reward()
@@ -1,24 +1,43 @@
-from typing import Dict, Optional
+import hashlib
+from array import array
+from functools import lru_cache
+from itertools import zip_longest
+from json.encoder import encode_basestring
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 from .validate import (
+    parse_birthday,
     validate_address,
     validate_object_key,
     validate_owner_legal,
     validate_owner_individual,
 )
-from datetime import datetime
 
-__all__ = ["RealtyObject", "RealtyOwner"]
+__all__ = ["RealtyObject", "RealtyOwner", "RealtyObjectBatch", "RiskRequest"]
+
+# Значение отсутствующей ячейки в колонках разной длины
+_MISSING = object()
 
 
 class RealtyObject:
     """Запрос на заказ объекта."""
 
+    __slots__ = ("key", "address")
+
     def __init__(self, key: str, address: Optional[str] = ""):
         validate_object_key(key)
         validate_address(address)
         self.key = key
         self.address = address
 
+    @classmethod
+    def from_validated(cls, key: str, address: str = "") -> "RealtyObject":
+        """Создание запроса из уже проверенных данных без повторной проверки."""
+        obj = cls.__new__(cls)
+        obj.key = key
+        obj.address = address
+        return obj
+
     def to_dict(self, product_name: str) -> Dict[str, str]:
         """Преобразование запроса в словарь для отправки."""
         return {
@@ -27,10 +46,164 @@ class RealtyObject:
             "object_address": self.address,
         }
 
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(key={self.key!r}, address={self.address!r})"
+
+
+class RealtyObjectBatch:
+    """
+    Компактная колоночная коллекция запросов на заказ объектов.
+
+    Ключи и адреса хранятся в отдельных списках, а названия продуктов —
+    номерами в массиве байтов, поэтому на позицию не создается ни объект
+    RealtyObject, ни словарь. to_json сразу строит тело запроса order_items.
+    """
+
+    __slots__ = ("keys", "addresses", "_products", "_product_names")
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.addresses: List[str] = []
+        # Номер названия продукта в _product_names; 0 - продукт не задан
+        self._products = array("B")
+        self._product_names: List[str] = [""]
+
+    @classmethod
+    def from_columns(
+        cls,
+        keys: Iterable[str],
+        addresses: Optional[Iterable[Optional[str]]] = None,
+        product_name: Optional[str] = None,
+    ) -> "RealtyObjectBatch":
+        """
+        Создание коллекции из колонок ключей и адресов с проверкой значений.
+        Строка без адреса получает пустой адрес, а колонка адресов длиннее
+        колонки ключей - ошибку ValueError.
+        """
+        batch = cls()
+        if addresses is None:
+            for key in keys:
+                batch.append(key, "", product_name)
+        else:
+            for key, address in zip_longest(keys, addresses, fillvalue=_MISSING):
+                if key is _MISSING:
+                    raise ValueError("Адресов больше, чем кадастровых номеров.")
+                batch.append(key, None if address is _MISSING else address, product_name)
+        return batch
+
+    @classmethod
+    def from_objects(
+        cls, objects: Iterable[RealtyObject], product_name: Optional[str] = None
+    ) -> "RealtyObjectBatch":
+        """Создание коллекции из уже проверенных объектов RealtyObject."""
+        batch = cls()
+        batch.extend(objects, product_name)
+        return batch
+
+    def _product_code(self, product_name: Optional[str]) -> int:
+        if not product_name:
+            return 0
+        try:
+            return self._product_names.index(product_name)
+        except ValueError:
+            if len(self._product_names) > 255:
+                raise ValueError("Слишком много разных продуктов в одной коллекции.")
+            self._product_names.append(product_name)
+            return len(self._product_names) - 1
+
+    def append(
+        self, key: str, address: Optional[str] = "", product_name: Optional[str] = None
+    ) -> None:
+        """Добавить запрос с проверкой ключа и адреса."""
+        address = address or ""
+        validate_object_key(key)
+        validate_address(address)
+        self.keys.append(key)
+        self.addresses.append(address)
+        self._products.append(self._product_code(product_name))
+
+    def extend(
+        self, objects: Iterable[RealtyObject], product_name: Optional[str] = None
+    ) -> None:
+        """Добавить уже проверенные объекты RealtyObject."""
+        code = self._product_code(product_name)
+        for obj in objects:
+            self.keys.append(obj.key)
+            self.addresses.append(obj.address or "")
+            self._products.append(code)
+
+    def product_name(self, index: int) -> Optional[str]:
+        """Название продукта позиции или None, если оно не задано."""
+        return self._product_names[self._products[index]] or None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __iter__(self) -> Iterator[RealtyObject]:
+        for key, address in zip(self.keys, self.addresses):
+            yield RealtyObject.from_validated(key, address)
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[RealtyObject, "RealtyObjectBatch"]:
+        if isinstance(index, slice):
+            batch = self.__class__()
+            batch.keys = self.keys[index]
+            batch.addresses = self.addresses[index]
+            batch._products = self._products[index]
+            # Копия: добавленный в часть продукт не должен менять исходную коллекцию
+            batch._product_names = list(self._product_names)
+            return batch
+        return RealtyObject.from_validated(self.keys[index], self.addresses[index])
+
+    def chunks(self, size: int) -> Iterator["RealtyObjectBatch"]:
+        """Разбить коллекцию на части не длиннее size."""
+        if size < 1:
+            raise ValueError("Размер партии должен быть положительным числом.")
+        for start in range(0, len(self), size):
+            yield self[start : start + size]
+
+    def to_json(self, product_name: Optional[str] = None) -> bytes:
+        """
+        Тело запроса {"order_items": [...]} в UTF-8.
+
+        product_name используется для позиций, у которых продукт не задан.
+        """
+        names = [
+            encode_basestring(name or product_name) if name or product_name else None
+            for name in self._product_names
+        ]
+        if names[0] is None and 0 in self._products:
+            raise ValueError("Не указано название продукта.")
+        items = ",".join(
+            [
+                f'{{"product_name":{names[code]},"object_key":{encode_basestring(key)},'
+                f'"object_address":{encode_basestring(address)}}}'
+                for code, key, address in zip(self._products, self.keys, self.addresses)
+            ]
+        )
+        return f'{{"order_items":[{items}]}}'.encode()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={len(self)})"
+
 
 class RealtyOwner:
     """Данные владельца."""
 
+    __slots__ = (
+        "owner_type",
+        "last_name",
+        "first_name",
+        "middle_name",
+        "passport",
+        "birthday",
+        "region",
+        "inn",
+        "registration_number",
+        "company_name",
+    )
+
     def __init__(
         self,
         last_name: str = "",
@@ -69,19 +242,128 @@ class RealtyOwner:
 
     def _convert_date(self, date_str: str) -> str:
         """Конвертация даты в нужный формат."""
-        return datetime.strptime(date_str, "%d.%m.%Y").strftime("%Y-%m-%dT00:01:00.0Z")
+        return _api_birthday(date_str)
+
+    def fields(self) -> Tuple[Any, ...]:
+        """Значения полей владельца: одинаковые владельцы дают одинаковый кортеж."""
+        return (
+            self.owner_type,
+            self.first_name,
+            self.last_name,
+            self.middle_name,
+            self.passport,
+            self.birthday,
+            self.region,
+            self.inn,
+            self.company_name,
+            self.registration_number,
+        )
 
     def to_dict(self) -> Dict[str, str]:
         """Преобразование данных владельца в словарь для отправки."""
+        return dict(_owner_data(self.fields()))
+
+
+@lru_cache(maxsize=65536)
+def _api_birthday(birthday: str) -> str:
+    """Дата рождения в формате API; повторяющиеся даты разбираются один раз."""
+    return parse_birthday(birthday).strftime("%Y-%m-%dT00:01:00.0Z")
+
+
+@lru_cache(maxsize=65536)
+def _owner_data(fields: Tuple[Any, ...]) -> Mapping[str, str]:
+    """
+    Данные владельца для ownersData по значениям полей (RealtyOwner.fields).
+
+    Владелец, указанный у многих объектов, преобразуется один раз. Результат
+    общий для всех вызовов, поэтому возвращается только для чтения, а
+    вызывающий код отправляет его копию.
+    """
+    (
+        owner_type,
+        first_name,
+        last_name,
+        middle_name,
+        passport,
+        birthday,
+        region,
+        inn,
+        company_name,
+        registration_number,
+    ) = fields
+    data = {
+        "owner_type": owner_type,
+        "first": first_name,
+        "surname": last_name,
+        "patronymic": middle_name,
+        "passport": passport,
+        "birthday": _api_birthday(birthday) if birthday else "",
+        "region": region,
+        "inn": inn,
+        "company_name": company_name,
+        "registration_number": registration_number,
+    }
+    return MappingProxyType(data)
+
+
+class RiskRequest:
+    """
+    Запрос оценки риска: объект недвижимости и данные его владельцев.
+
+    Владельцы передаются в ownersData как указаны, в том же порядке. Список
+    owners не следует изменять после создания запроса: по нему считается
+    owners_digest.
+    """
+
+    __slots__ = ("object", "owners", "_digest")
+
+    def __init__(self, object: RealtyObject, owners: Optional[Iterable["RealtyOwner"]] = None):
+        self.object = object
+        self.owners = list(owners or ())
+        self._digest: Optional[str] = None
+
+    @classmethod
+    def coerce(
+        cls, request: Union["RiskRequest", Tuple[RealtyObject, Iterable["RealtyOwner"]]]
+    ) -> "RiskRequest":
+        """RiskRequest из запроса или пары (объект, владельцы)."""
+        if isinstance(request, cls):
+            return request
+        object, owners = request
+        return cls(object, owners)
+
+    @property
+    def key(self) -> str:
+        return self.object.key
+
+    @property
+    def address(self) -> str:
+        return self.object.address
+
+    def owners_data(self) -> List[Dict[str, str]]:
+        """Данные владельцев для metadata.ownersData."""
+        return [owner.to_dict() for owner in self.owners]
+
+    def owners_digest(self) -> str:
+        """Отпечаток набора владельцев, не зависящий от их порядка и повторов."""
+        if self._digest is None:
+            fields = sorted({repr(owner.fields()) for owner in self.owners})
+            self._digest = hashlib.blake2b(
+                "\n".join(fields).encode(), digest_size=8
+            ).hexdigest()
+        return self._digest
+
+    def to_dict(self, product_name: str) -> Dict[str, Any]:
+        """Позиция order_items для отправки."""
         return {
-            "owner_type": self.owner_type,
-            "first": self.first_name,
-            "surname": self.last_name,
-            "patronymic": self.middle_name,
-            "passport": self.passport,
-            "birthday": self._convert_date(self.birthday) if self.birthday else "",
-            "region": self.region,
-            "inn": self.inn,
-            "company_name": self.company_name,
-            "registration_number": self.registration_number,
+            "product_name": product_name,
+            "object_key": self.object.key,
+            "object_address": self.object.address,
+            "metadata": {"ownersData": self.owners_data()},
         }
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(object={self.object!r}, "
+            f"owners={len(self.owners)})"
+        )
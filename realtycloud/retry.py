@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+from typing import Optional
+
+from realtycloud import settings
+from .exceptions import (
+    RealtycloudAPIStatusException,
+    RealtycloudException,
+    RealtycloudRequestLimitExceededException,
+    RealtycloudServerErrorException,
+    RealtycloudTransportException,
+)
+from .ratelimit import parse_retry_after
+
+__all__ = ["RetryPolicy"]
+
+# Статусы шлюза, при которых запрос может быть повторен
+RETRYABLE_HTTP_STATUSES = frozenset((502, 503, 504))
+
+
+class RetryPolicy:
+    """
+    Политика повторных запросов с экспоненциальной отсрочкой и случайным разбросом.
+
+    Повторяются сетевые ошибки, таймауты, ошибки сервера 5xx и превышение
+    лимита запросов. GET-запросы и проверка статусов повторяются всегда.
+    Запросы, создающие заказы, повторяются, только если они заведомо
+    не дошли до сервера (ошибка соединения, превышение лимита) или если задан
+    idempotency_key_header: тогда все попытки одного заказа отправляются
+    с одним ключом идемпотентности, и API не создаст платный заказ дважды.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = settings.RETRY_MAX_ATTEMPTS,
+        backoff_base: float = settings.RETRY_BACKOFF_BASE_SEC,
+        backoff_max: float = settings.RETRY_BACKOFF_MAX_SEC,
+        jitter: bool = True,
+        deadline: Optional[float] = settings.RETRY_DEADLINE_SEC,
+        retry_on_limit: bool = True,
+        idempotency_key_header: Optional[str] = None,
+    ):
+        if max_attempts < 1:
+            raise ValueError("Число попыток должно быть положительным.")
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_on_limit = retry_on_limit
+        self.idempotency_key_header = idempotency_key_header
+
+    def backoff(self, attempt: int) -> float:
+        """Отсрочка перед попыткой attempt + 1 (attempt начинается с 1)."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        if self.jitter:
+            # "Полный" разброс: клиенты не повторяют запросы синхронно
+            delay = random.uniform(0, delay)
+        return delay
+
+    def is_retryable(self, error: RealtycloudException, idempotent: bool) -> bool:
+        """Можно ли повторить запрос, завершившийся ошибкой error."""
+        if isinstance(error, RealtycloudTransportException):
+            return idempotent or not error.request_sent
+        if isinstance(error, RealtycloudRequestLimitExceededException):
+            return self.retry_on_limit
+        if isinstance(error, RealtycloudServerErrorException):
+            return idempotent
+        if isinstance(error, RealtycloudAPIStatusException):
+            return idempotent and error.http_status in RETRYABLE_HTTP_STATUSES
+        return False
+
+    def next_delay(
+        self,
+        error: RealtycloudException,
+        attempt: int,
+        started: float,
+        idempotent: bool,
+    ) -> Optional[float]:
+        """Отсрочка перед следующей попыткой или None, если повторять не нужно."""
+        if attempt >= self.max_attempts or not self.is_retryable(error, idempotent):
+            return None
+        delay = self.backoff(attempt)
+        if isinstance(error, RealtycloudAPIStatusException):
+            retry_after = parse_retry_after(error.headers.get("retry-after"))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        if (
+            self.deadline is not None
+            and time.monotonic() - started + delay > self.deadline
+        ):
+            return None
+        return delay
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import json
+from typing import Any, Callable, Dict, Optional
+
+from realtycloud import settings
+
+__all__ = [
+    "Serializer",
+    "JsonSerializer",
+    "OrjsonSerializer",
+    "MsgspecSerializer",
+    "get_serializer",
+]
+
+
+class Serializer:
+    """Кодирование тел запросов и разбор ответов API в формате JSON."""
+
+    name = ""
+
+    def dumps(self, value: Any) -> bytes:
+        """Закодировать значение в JSON (UTF-8)."""
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        """Разобрать JSON из байтов ответа."""
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+
+class JsonSerializer(Serializer):
+    """Сериализатор на стандартном модуле json."""
+
+    name = "json"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        self._decoder = json.JSONDecoder()
+
+    def dumps(self, value: Any) -> bytes:
+        return self._encoder.encode(value).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return self._decoder.decode(data.decode())
+
+
+class OrjsonSerializer(Serializer):
+    """Сериализатор на orjson (pip install realtycloud[orjson])."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
+
+
+class MsgspecSerializer(Serializer):
+    """Сериализатор на msgspec (pip install realtycloud[msgspec])."""
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self.dumps = msgspec.json.Encoder().encode
+        self.loads = msgspec.json.Decoder().decode
+
+
+# Сериализаторы в порядке предпочтения при выборе "auto"
+SERIALIZERS: Dict[str, Callable[[], Serializer]] = {
+    "orjson": OrjsonSerializer,
+    "msgspec": MsgspecSerializer,
+    "json": JsonSerializer,
+}
+
+
+def get_serializer(name: Optional[str] = None) -> Serializer:
+    """
+    Сериализатор по названию: json, orjson, msgspec или auto.
+
+    auto выбирает самый быстрый из установленных и использует стандартный
+    json, если ни orjson, ни msgspec нет.
+    """
+    name = name or settings.JSON_BACKEND
+    if name != "auto":
+        try:
+            factory = SERIALIZERS[name]
+        except KeyError:
+            raise ValueError(f"Неизвестный сериализатор JSON: {name}.")
+        return factory()
+    for factory in SERIALIZERS.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+    return JsonSerializer()
@@ -2,6 +2,129 @@
     settings
 """
 TIMEOUT_SEC = 30
+# Таймауты этапов запроса (connect, read, write, pool) по семействам методов
+# API; не указанные этапы и методы получают TIMEOUT_SEC. Подсказки должны
+# отвечать быстро, а создание крупного заказа может занимать минуты.
+# "download" - загрузка файлов отчетов: большой файл может долго читаться
+TIMEOUT_PROFILES = {
+    "dadata": {"connect": 2, "read": 5, "write": 5, "pool": 2},
+    "search": {"connect": 5, "read": 15, "write": 10, "pool": 5},
+    "house": {"connect": 5, "read": 15, "write": 10, "pool": 5},
+    "objectFull": {"connect": 5, "read": 30, "write": 10, "pool": 5},
+    "order": {"connect": 10, "read": 300, "write": 120, "pool": 10},
+    "orders": {"connect": 10, "read": 120, "write": 60, "pool": 10},
+    "download": {"connect": 10, "read": 300, "write": 30, "pool": 10},
+}
+
+# Адрес API Realtycloud
+API_URL = "https://api.realtycloud.ru"
+# Параметры общего пула соединений
+POOL_MAX_CONNECTIONS = 100
+POOL_MAX_KEEPALIVE_CONNECTIONS = 20
+POOL_KEEPALIVE_EXPIRY_SEC = 30.0
+# Повторные запросы: число попыток, база и предел экспоненциальной отсрочки
+# и общий срок на все попытки одного запроса
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BACKOFF_BASE_SEC = 0.5
+RETRY_BACKOFF_MAX_SEC = 30
+RETRY_DEADLINE_SEC = 120
+# Размер партии order_items и число одновременно отправляемых партий
+# при оптовом заказе
+ORDER_BATCH_SIZE = 100
+ORDER_MAX_IN_FLIGHT = 4
+# Опрос статусов заказов: минимальный и максимальный интервал опроса одной
+# позиции, множитель отсрочки для позиций без изменений, окно объединения
+# запросов, число идентификаторов в запросе и размер страницы ответа
+STATUS_POLL_INTERVAL_SEC = 180
+STATUS_MAX_POLL_INTERVAL_SEC = 3600
+STATUS_BACKOFF_FACTOR = 1.5
+STATUS_COALESCE_WINDOW_SEC = 60
+STATUS_BATCH_SIZE = 5000
+STATUS_PAGE_LIMIT = 1000
+# Пока поступают вебхуки (последний не старше WEBHOOK_ACTIVITY_WINDOW_SEC),
+# статусы опрашиваются не чаще раза в STATUS_SAFETY_NET_INTERVAL_SEC
+STATUS_SAFETY_NET_INTERVAL_SEC = 1800
+WEBHOOK_ACTIVITY_WINDOW_SEC = 900
+# Заголовок с секретом, которым подписываются запросы вебхука
+WEBHOOK_SECRET_HEADER = "X-Webhook-Secret"
+# Срок жизни кэша ответов по семействам методов API; методы, которых нет
+# в словаре, не кэшируются
+CACHE_TTL_SEC = {
+    "search": 24 * 60 * 60,
+    "dadata": 24 * 60 * 60,
+    "house": 24 * 60 * 60,
+    "objectFull": 60 * 60,
+}
+# Максимальное число ответов в кэше
+CACHE_MAX_SIZE = 10000
+# Ограничение частоты запросов по семействам методов API:
+# (запросов в секунду, допустимый всплеск)
+RATE_LIMITS = {
+    "search": (5, 10),
+    "dadata": (10, 20),
+    "house": (5, 10),
+    "objectFull": (5, 10),
+    "order": (2, 4),
+    "orders": (1, 2),
+}
+# Во сколько раз снижается скорость запросов после превышения лимита
+RATE_LIMIT_DECREASE_FACTOR = 0.5
+
+# Загрузка файлов отчетов: размер части и число одновременных загрузок
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_MAX_PARALLEL = 4
+
+# Пул токенов: пауза токена после превышения лимита (если нет Retry-After)
+# и после отказа в доступе; семейства методов, распределяемые между токенами
+TOKEN_COOLDOWN_SEC = 60
+TOKEN_FORBIDDEN_COOLDOWN_SEC = 600
+TOKEN_POOL_ENDPOINTS = ("search", "dadata", "house", "objectFull")
+
+# Объединение повторов в оптовом заказе: ожидаемое число ключей и доля
+# ложных срабатываний фильтра Блума DiskKeySet
+DEDUP_BLOOM_CAPACITY = 10_000_000
+DEDUP_BLOOM_ERROR_RATE = 0.01
+
+# Журнал заказов: режим синхронизации SQLite (FULL - запись о партии
+# гарантированно на диске до отправки платного заказа)
+JOURNAL_SYNCHRONOUS = "FULL"
+
+# Сессия подсказок для автодополнения: пауза после нажатия клавиши перед
+# запросом, минимальная длина запроса, число подсказок, запрашиваемых у API
+# для фильтрации на месте (не больше 20), и размер кэша префиксов
+SUGGEST_DEBOUNCE_SEC = 0.15
+SUGGEST_MIN_LENGTH = 3
+SUGGEST_FETCH_COUNT = 20
+SUGGEST_PREFIX_CACHE_SIZE = 10000
+# Насколько символов запрос может быть длиннее сохраненного префикса, чтобы
+# ответить на него фильтрацией: поиск подсказок API нечеткий, и среди
+# подсказок на короткий префикс может не оказаться лучших для длинного запроса
+SUGGEST_PREFIX_MAX_EXTENSION = 3
+
+# Локальный индекс кадастровых номеров: срок, в течение которого ответы
+# search и objectFull из индекса заменяют запрос к API, и режим
+# синхронизации SQLite
+CADASTRAL_INDEX_MAX_AGE_SEC = {
+    "search": 7 * 24 * 60 * 60,
+    "objectFull": 24 * 60 * 60,
+}
+CADASTRAL_INDEX_SYNCHRONOUS = "NORMAL"
+
+# Число потоков для параллельных методов map_* синхронного клиента
+FANOUT_MAX_WORKERS = 32
+
+# Конвейер «адрес → отчет»: размер очередей между стадиями, число одновременных
+# запросов поиска, ожидание неполной партии заказа и предел ожидающих статуса позиций
+PIPELINE_QUEUE_SIZE = 1000
+PIPELINE_LOOKUP_CONCURRENCY = 8
+PIPELINE_ORDER_MAX_WAIT_SEC = 5.0
+PIPELINE_MAX_PENDING_ORDERS = 10000
+# Число опросов статуса подряд, завершившихся ошибкой, после которого ожидающие
+# позиции конвейера возвращаются с этой ошибкой
+PIPELINE_TRACK_MAX_POLL_FAILURES = 5
+
+# Сериализатор JSON: auto (orjson или msgspec, если установлены), json, orjson, msgspec
+JSON_BACKEND = "auto"
 
 # Регулярное выражение для проверки object_key
 OBJECT_KEY_REGEX = r"^\d{1,2}:\d{1,2}:(\d|\d{6,7}):\d{1,10}$"
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from .deadline import current_deadline
+from .exceptions import RealtycloudCancelledException, RealtycloudDeadlineExceededException
+
+__all__ = ["SingleFlight", "AsyncSingleFlight"]
+
+# Ошибки срока и отмены Deadline ведущего вызова: к ожидающим они не относятся
+_LEADER_ABORTED = (RealtycloudDeadlineExceededException, RealtycloudCancelledException)
+
+
+class _Call:
+    """Выполняющийся запрос, результат которого ждут другие потоки."""
+
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # События ожидающих потоков: их будит и завершение запроса, и отмена
+        self.followers: List[threading.Event] = []
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных запросов из разных потоков.
+
+    Пока запрос с ключом key выполняется, остальные вызовы с тем же ключом
+    ждут его и получают тот же результат или то же исключение. Ожидание
+    ограничено текущим Deadline и прерывается его отменой, сам запрос при
+    этом продолжается. Если ведущий вызов прерван своим Deadline, ожидающий
+    с неистекшим сроком выполняет запрос сам. Результаты после завершения
+    не сохраняются.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Выполнить fn или дождаться уже выполняющегося вызова с тем же ключом."""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                else:
+                    wake = threading.Event()
+                    call.followers.append(wake)
+            if leader:
+                break
+            deadline = current_deadline()
+            if deadline is None:
+                wake.wait()
+            else:
+                deadline.wait(wake)
+            if isinstance(call.error, _LEADER_ABORTED):
+                # Свой срок не истек: повторяем запрос, став ведущим
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                call.done.set()
+                for wake in call.followers:
+                    wake.set()
+        return call.result
+
+
+class _AsyncCall:
+    """Выполняющийся запрос и число задач, которые его ждут."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Объединение одинаковых одновременных запросов из разных задач asyncio."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _AsyncCall] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполнить fn или дождаться уже выполняющегося вызова с тем же ключом."""
+        while True:
+            call = self._calls.get(key)
+            # Завершенный запрос, еще не убранный обратным вызовом, не переиспользуется
+            if call is None or call.task.done():
+                call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+                call.task.add_done_callback(lambda _, call=call: self._forget(key, call))
+            call.waiters += 1
+            deadline = current_deadline()
+            try:
+                # Отмена одного ожидающего не должна отменять запрос для остальных
+                if deadline is None:
+                    return await asyncio.shield(call.task)
+                return await deadline.wait_future(call.task)
+            except asyncio.CancelledError:
+                # Запрос, который больше никто не ждет, отменяется
+                if call.waiters == 1 and not call.task.done():
+                    call.task.cancel()
+                raise
+            except _LEADER_ABORTED as e:
+                # Запрос прерван Deadline начавшей его задачи, а свой срок не
+                # истек: повторяем запрос
+                if (
+                    not call.task.done()
+                    or call.task.cancelled()
+                    or call.task.exception() is not e
+                ):
+                    raise
+            finally:
+                call.waiters -= 1
+                # Запрос, брошенный всеми по сроку Deadline, доживает сам, а новые
+                # вызовы начинают свой
+                if call.waiters == 0 and not call.task.done():
+                    self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
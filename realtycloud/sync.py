@@ -1,35 +1,84 @@
 # -*- coding: utf-8 -*-
-from typing import Dict, List, Optional, Tuple, Any
-from httpx import Response, Client
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Tuple, Any, Union
+from httpx import Client, Limits, Response, TransportError
 from datetime import datetime
 from re import match
 
 from realtycloud import settings
-from .exceptions import (
-    RealtycloudBadRequestException,
-    RealtycloudForbiddenException,
-    RealtycloudNotFoundException,
-    RealtycloudServerErrorException,
-    RealtycloudInvalidKeyException,
-    RealtycloudFieldErrorException,
-    RealtycloudRequestLimitExceededException,
-    RealtycloudAPIStatusException,
+from .base import BaseClient, build_client_options
+from .download import ReportDownloader, DownloadResult
+from .deadline import TimeoutValue, current_deadline, endpoint_timeout
+from .exceptions import RealtycloudDeadlineExceededException, RealtycloudException
+from .instrumentation import Instrumentation
+from .dedup import (
+    Deduplicator,
+    DiskKeySet,
+    KeySet,
+    collapse,
+    expand_response,
+    object_identity,
+    risk_identity,
 )
-from .request_objects import RealtyObject, RealtyOwner
-
-__all__ = ["Realtycloud", "RealtyObject", "RealtyOwner"]
-
-
-class ClientBase:
+from .journal import OrderJournal
+from .fanout import MapResult, fan_out
+from .cache import BaseCache, cache_ttl
+from .cadastral_index import CadastralIndex
+from .batching import BatchResult, send_batches
+from .ratelimit import RateLimiter
+from .models import House, ObjectInfo, StatusItem, SuggestItem
+from .retry import RetryPolicy
+from .serialization import Serializer, get_serializer
+from .tokens import TokenPool
+from .typeahead import SuggestSession, PrefixCache
+from .singleflight import SingleFlight
+from .request_objects import RealtyObject, RealtyObjectBatch, RealtyOwner, RiskRequest
+from .tracking import OrderTracker
+
+__all__ = ["Realtycloud", "RealtyObject", "RealtyObjectBatch", "RealtyOwner", "RiskRequest"]
+
+
+class ClientBase(BaseClient):
     """Базовый класс для API клиента."""
 
-    def __init__(self, base_url: str, token: str):
-        headers = {
-            "Content-type": "application/json",
-            "Accept": "application/json",
-            "API-Key": token,
-        }
-        self._client = Client(base_url=base_url, headers=headers)
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        client: Optional[Client] = None,
+        cache: Optional[BaseCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        serializer: Optional[Serializer] = None,
+        models: bool = False,
+        token_pool: Optional[TokenPool] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        timeouts: Optional[Mapping[str, TimeoutValue]] = None,
+        index: Optional[CadastralIndex] = None,
+        cache_ttls: Optional[Mapping[str, Optional[float]]] = None,
+    ):
+        self._base_url = base_url
+        self._timeout = endpoint_timeout(self.ENDPOINT, timeouts)
+        self._cache_ttl = cache_ttl(self.ENDPOINT, cache_ttls)
+        self._serializer = serializer or get_serializer()
+        self._models = models
+        self._token_pool = token_pool
+        self._instrumentation = instrumentation
+        self._cache = cache
+        self._index = index
+        self._single_flight = single_flight
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        # Клиент, переданный снаружи, принадлежит фасаду и закрывается им
+        self._owns_client = client is None
+        if client is None:
+            client = Client(headers=self._build_headers(token))
+        self._client = client
 
     def __enter__(self) -> "ClientBase":
         return self
@@ -39,103 +88,235 @@ class ClientBase:
 
     def close(self):
         """Закрыть сетевые соединения."""
-        self._client.close()
+        if self._owns_client:
+            self._client.close()
 
     def _get(
-        self, url: str, params: Dict[str, Any], timeout: int = settings.TIMEOUT_SEC
+        self,
+        url: str,
+        params: Dict[str, Any],
+        timeout: Optional[TimeoutValue] = None,
     ) -> Dict[str, Any]:
         """GET-запрос к API Realtycloud."""
-        try:
-            response = self._client.get(url, params=params, timeout=timeout)
-            response.raise_for_status()
-        except Exception as e:
-            self._handle_api_error(response)
+        cache_key = self._cache_key(url, params)
+        if cache_key is not None:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if self._single_flight is None:
+            return self._send_get(url, params, timeout, cache_key)
+        return self._single_flight.do(
+            self._flight_key(url, params),
+            partial(self._send_get, url, params, timeout, cache_key),
+        )
 
-        return response.json()
+    def _send_get(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        timeout: Optional[TimeoutValue],
+        cache_key: Optional[str],
+    ) -> Dict[str, Any]:
+        """Выполнить GET-запрос и сохранить ответ в кэш."""
+        response = self._request(
+            "GET", url, idempotent=True, params=params, timeout=timeout
+        )
+        result = self._decode(response)
+        if cache_key is not None:
+            self._cache.set(cache_key, result, self._cache_ttl)
+        return result
 
     def _post(
-        self, url: str, data: Dict[str, Any], timeout: int = settings.TIMEOUT_SEC
+        self,
+        url: str,
+        data: Union[Dict[str, Any], bytes],
+        timeout: Optional[TimeoutValue] = None,
+        idempotent: bool = False,
     ) -> Dict[str, Any]:
-        """POST-запрос к API Realtycloud."""
+        """POST-запрос к API Realtycloud; data может быть уже закодированным JSON."""
+        headers = {}
+        policy = self._retry_policy
+        if not idempotent and policy is not None and policy.idempotency_key_header:
+            # Один ключ на все попытки: повтор не создаст заказ повторно
+            headers[policy.idempotency_key_header] = uuid.uuid4().hex
+            idempotent = True
+        response = self._request(
+            "POST",
+            url,
+            idempotent=idempotent,
+            headers=headers,
+            content=self._encode(data),
+            timeout=timeout,
+        )
+        return self._decode(response)
+
+    def _request(self, method: str, url: str, idempotent: bool, **kwargs) -> Response:
+        """Запрос к API Realtycloud с повторами по политике retry_policy."""
+        started = time.monotonic()
+        deadline = current_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._send(method, url, attempt, **kwargs)
+            except RealtycloudException as e:
+                if deadline is not None:
+                    stop = self._deadline_error(deadline, e)
+                    if stop is not None:
+                        raise stop
+                if self._retry_policy is None:
+                    raise
+                delay = self._retry_delay(e, attempt, started, idempotent)
+                if delay is None:
+                    raise
+                if deadline is not None and not deadline.allows(delay):
+                    raise RealtycloudDeadlineExceededException(
+                        "Повтор запроса не укладывается в срок выполнения вызова."
+                    ) from e
+                if self._instrumentation is not None:
+                    self._instrumentation.on_retry(self.ENDPOINT, attempt, delay, e)
+            if deadline is None:
+                time.sleep(delay)
+            else:
+                deadline.sleep(delay)
+
+    def _send(
+        self, method: str, url: str, attempt: int = 1, **kwargs
+    ) -> Response:
+        """Одна попытка запроса к API Realtycloud."""
+        token, delay = self._reserve_token()
+        if self._rate_limiter is not None:
+            delay = max(delay, self._rate_limiter.reserve(self.ENDPOINT))
+        if delay > 0:
+            deadline = current_deadline()
+            if deadline is None:
+                time.sleep(delay)
+            elif not deadline.allows(delay):
+                deadline.check()
+                raise RealtycloudDeadlineExceededException(
+                    "Ожидание токена или лимита частоты не укладывается в срок выполнения вызова."
+                )
+            else:
+                deadline.sleep(delay)
+        event = None
+        if self._instrumentation is not None:
+            event, kwargs = self._start_event(method, url, attempt, kwargs, False)
         try:
-            response = self._client.post(url, json=data, timeout=timeout)
-            response.raise_for_status()
-        except Exception as e:
-            self._handle_api_error(response)
-        return response.json()
-
-    def _handle_api_error(self, response: Response) -> None:
-        """Обработка ошибок API и возбуждение соответствующих исключений."""
-        if response.status_code == 400:
-            raise RealtycloudBadRequestException.from_response(
-                response,
-                message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+            response = self._client.request(
+                method,
+                self._build_url(url),
+                **self._request_options(self._with_token(kwargs, token), False),
             )
-        if response.status_code == 403:
-            raise RealtycloudForbiddenException.from_response(
-                response,
-                message=f"Статус: {response.status_code}. Сообщение: {response.text}",
-            )
-        if response.status_code == 404:
-            raise RealtycloudNotFoundException.from_response(
-                response,
-                message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+        except TransportError as e:
+            error = self._transport_error(e)
+            if event is not None:
+                self._end_event(event, None, error)
+            raise error from e
+        except RealtycloudException as e:
+            # Отмена или истечение срока Deadline
+            if event is not None:
+                self._end_event(event, None, e)
+            raise
+        if not response.is_success:
+            try:
+                self._raise_api_error(response, token)
+            except RealtycloudException as e:
+                if event is not None:
+                    self._end_event(event, response, e)
+                raise
+        if event is not None:
+            self._end_event(event, response, None)
+        if self._rate_limiter is not None:
+            self._rate_limiter.reward(self.ENDPOINT)
+        return response
+
+    def _send_batched(
+        self,
+        product_name: str,
+        send: Callable[[List[Any]], Optional[Dict]],
+        requests: Iterable[Any],
+        batch_size: int,
+        max_in_flight: int,
+        journal: Optional[OrderJournal],
+        job: Optional[str],
+        dedup: Union[bool, KeySet, DiskKeySet],
+        identity: Callable[[Any], Tuple[Hashable, Any]] = object_identity,
+    ) -> Iterator[BatchResult]:
+        """
+        Отправить заказ партиями, объединяя повторы и пропуская уже заказанные
+        по журналу объекты. При dedup send получает партии уже без повторов;
+        у каждого объекта остается ключ его первого вхождения.
+        """
+        deduplicator = None
+        if dedup is not False:
+            deduplicator = Deduplicator(
+                product_name, None if dedup is True else dedup, identity
             )
-        if response.status_code == 500:
-            error_message = response.json().get("error", "Неизвестная ошибка")
-            if "невалидный ключ" in error_message:
-                raise RealtycloudInvalidKeyException.from_response(
-                    response,
-                    message="Неверный ключ",
-                )
-            elif "неверно указано поле" in error_message:
-                raise RealtycloudFieldErrorException.from_response(
-                    response,
-                    message="Неверно указано поле",
-                )
-            elif "вы превысили лимит использования поиска" in error_message:
-                raise RealtycloudRequestLimitExceededException.from_response(
-                    response,
-                    message="Превышен лимит использования поиска",
-                )
-            else:
-                raise RealtycloudServerErrorException.from_response(
-                    response,
-                    message=f"Статус: {response.status_code}. Сообщение: {response.text}",
-                )
-        raise RealtycloudAPIStatusException.from_response(
-            response,
-            message=f"Статус: {response.status_code}. Сообщение: {response.text}",
+            requests = deduplicator.unique(requests)
+        if journal is not None:
+            skipped = deduplicator.skip if deduplicator is not None else None
+            requests = journal.unordered(product_name, requests, skipped)
+            send = journal.journaled(send, product_name, job)
+        results = send_batches(
+            send, requests, batch_size=batch_size, max_in_flight=max_in_flight
         )
+        return results if deduplicator is None else deduplicator.results(results)
 
 
 class HouseClient(ClientBase):
     """Клиент API Realtycloud получения информации по дому"""
 
-    BASE_URL = "https://api.realtycloud.ru/property/info/house_details_new"
+    PATH = "/property/info/house_details_new"
+    ENDPOINT = "house"
 
-    def __init__(self, token: str):
-        super().__init__(base_url=self.BASE_URL, token=token)
+    def __init__(
+        self,
+        token: str,
+        client: Optional[Client] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
 
     def house_details(self, address: str) -> List[Dict]:
         """Получение информации о доме по адресу"""
         params = {"address": address}
         response = self._get("", params)
+        if self._models:
+            return [House(item) for item in response.get("data", [])]
         return response.get("data", [])
 
 
 class SuggestClient(ClientBase):
     """Клиент API Realtycloud поиска кадастровых номеров по адресу"""
 
-    BASE_URL = "https://api.realtycloud.ru/search"
+    PATH = "/search"
+    ENDPOINT = "search"
 
-    def __init__(self, token: str):
-        super().__init__(base_url=self.BASE_URL, token=token)
+    def __init__(
+        self,
+        token: str,
+        client: Optional[Client] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
 
     def suggest(self, query: str) -> List[Dict]:
         """Получение предложений по заданному запросу."""
-        params = {"query": query}
-        response = self._get("", params)
+        items = self._index.search_items(query) if self._index is not None else None
+        if items is None:
+            params = {"query": query}
+            response = self._get("", params)
+            items = response.get("data", [])
+            if self._index is not None:
+                self._index.record_search(query, items)
+        if self._models:
+            return [SuggestItem(item) for item in items]
         return [
             {
                 "object_type": item.get("ObjectType"),
@@ -145,65 +326,109 @@ class SuggestClient(ClientBase):
                 "cadastral_price": item.get("kad_price"),
                 "status": item.get("Status"),
             }
-            for item in response.get("data", [])
+            for item in items
         ]
 
 
 class SimpleSuggestClient(ClientBase):
     """Клиент API Realtycloud для получения подсказок"""
 
-    BASE_URL = "https://api.realtycloud.ru/dadata/"
+    PATH = "/dadata/"
+    ENDPOINT = "dadata"
 
-    def __init__(self, token: str):
-        super().__init__(base_url=self.BASE_URL, token=token)
+    def __init__(
+        self,
+        token: str,
+        client: Optional[Client] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
 
     def suggest_parties(self, count: int, query: str) -> List[Dict]:
         """Получение списка компаний по заданному запросу."""
         params = {"count": count, "query": query}
-        response = self._get(self.BASE_URL + "suggest_parties", params)
+        response = self._get("suggest_parties", params)
         return response.get("data", [])
 
     def suggest_addresses(self, count: int, query: str) -> List[Dict]:
         """Получение списка адресов по заданному запросу."""
         params = {"count": count, "query": query}
-        response = self._get(self.BASE_URL + "suggest", params)
+        response = self._get("suggest", params)
         return response.get("data", [])
 
 
 class InfoClient(ClientBase):
     """Клиент API Realtycloud получения информации по кадастровому номеру"""
 
-    BASE_URL = "https://api.realtycloud.ru/objectFull"
+    PATH = "/objectFull"
+    ENDPOINT = "objectFull"
 
-    def __init__(self, token: str):
-        super().__init__(base_url=self.BASE_URL, token=token)
+    def __init__(
+        self,
+        token: str,
+        client: Optional[Client] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
 
     def info(self, query: str) -> List[Dict]:
         """Получение информации по кадастровому номеру"""
         query = str(query.strip())
-        response = self._get(f"{self.BASE_URL}/{query}", {})
+        data = self._index.info(query) if self._index is not None else None
+        if data is not None:
+            response = {"data": data}
+        else:
+            response = self._get(f"/{query}", {})
+            if self._index is not None and response.get("data"):
+                self._index.record_info(query, response["data"])
+        if self._models:
+            return ObjectInfo(response, "data")
         return response.get("data", {})
 
 
 class InfoClient(ClientBase):
     """Клиент API Realtycloud получения информации по кадастровому номеру"""
 
-    BASE_URL = "https://api.realtycloud.ru/objectFull"
+    PATH = "/objectFull"
+    ENDPOINT = "objectFull"
 
-    def __init__(self, token: str):
-        super().__init__(base_url=self.BASE_URL, token=token)
+    def __init__(
+        self,
+        token: str,
+        client: Optional[Client] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
 
     def info(self, query: str) -> List[Dict]:
         """Получение информации по кадастровому номеру"""
         query = str(query.strip())
-        response = self._get(f"{self.BASE_URL}/{query}", {})
+        data = self._index.info(query) if self._index is not None else None
+        if data is not None:
+            response = {"data": data}
+        else:
+            response = self._get(f"/{query}", {})
+            if self._index is not None and response.get("data"):
+                self._index.record_info(query, response["data"])
+        if self._models:
+            return ObjectInfo(response, "data")
         return response.get("data", {})
 
 
 class EGRNClient(ClientBase):
     """Клиент API Realtycloud EGRN"""
 
-    BASE_URL = "https://api.realtycloud.ru/order"
+    PATH = "/order"
+    ENDPOINT = "order"
     PRODUCT_NAMES = {
         "object": "EgrnObject",
         "object_priority": "EgrnObjectFast",
@@ -211,8 +436,20 @@ class EGRNClient(ClientBase):
         "right_list_priority": "EgrnRightListFast",
     }
 
-    def __init__(self, token: str):
-        super().__init__(base_url=self.BASE_URL, token=token)
+    def __init__(
+        self,
+        token: str,
+        client: Optional[Client] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
+
+    def _product_name(self, kind: str, priority: bool) -> str:
+        """Название продукта с учетом срочности заказа."""
+        return self.PRODUCT_NAMES[f"{kind}_priority" if priority else kind]
 
     def _create_order_data(self, items: List[Tuple[str, str]]) -> Dict:
         """Создание данных заказа для заданного списка (product_name, (key, address))."""
@@ -228,12 +465,27 @@ class EGRNClient(ClientBase):
         }
 
     def _post_request(
-        self, product_name: str, items: List[RealtyObject]
+        self,
+        product_name: str,
+        items: Union[List[RealtyObject], RealtyObjectBatch],
+        dedup: bool = True,
     ) -> Optional[Dict]:
-        """POST-запрос для заданных предметов."""
-        data = {"order_items": [item.to_dict(product_name) for item in items]}
+        """
+        POST-запрос для заданных предметов.
+
+        При dedup повторы (по каноническому ключу) заказываются один раз под
+        ключом первого вхождения: позиция из ответа раздается всем одинаковым
+        запросам.
+        """
+        positions = None
+        if dedup:
+            items, positions = collapse(items)
+        if isinstance(items, RealtyObjectBatch):
+            data = items.to_json(product_name)
+        else:
+            data = {"order_items": [item.to_dict(product_name) for item in items]}
         response = self._post("", data)
-        return response.get("data")
+        return self._order_data(expand_response(response, positions))
 
     def fetch_single_object(self, request: RealtyObject, **kwargs) -> Optional[Dict]:
         """Получить объект с заданным запросом."""
@@ -253,7 +505,9 @@ class EGRNClient(ClientBase):
             if kwargs.get("priority", False)
             else self.PRODUCT_NAMES["object"]
         )
-        return self._post_request(product_name, requests)
+        return self._post_request(
+            product_name, requests, dedup=kwargs.get("dedup", True) is not False
+        )
 
     def fetch_single_right_list(
         self, request: RealtyObject, **kwargs
@@ -275,71 +529,159 @@ class EGRNClient(ClientBase):
             if kwargs.get("priority", False)
             else self.PRODUCT_NAMES["right_list"]
         )
-        return self._post_request(product_name, requests)
+        return self._post_request(
+            product_name, requests, dedup=kwargs.get("dedup", True) is not False
+        )
 
-    def fetch_multiple_full_data(
-        self, request: RealtyObject, **kwargs
-    ) -> Optional[Dict]:
-        """Получить полные данные для одного объекта и его прав с заданным ключом и необязательным адресом."""
-        product_name_object = (
-            self.PRODUCT_NAMES["object_priority"]
-            if kwargs.get("priority", False)
-            else self.PRODUCT_NAMES["object"]
+    def fetch_objects_batched(
+        self,
+        requests: Iterable[RealtyObject],
+        batch_size: int = settings.ORDER_BATCH_SIZE,
+        max_in_flight: int = settings.ORDER_MAX_IN_FLIGHT,
+        journal: Optional[OrderJournal] = None,
+        job: Optional[str] = None,
+        dedup: Union[bool, KeySet, DiskKeySet] = True,
+        **kwargs,
+    ) -> Iterator[BatchResult]:
+        """Заказать объекты партиями, возвращая результаты партий по мере готовности."""
+        product_name = self._product_name("object", kwargs.get("priority", False))
+        return self._send_batched(
+            product_name,
+            partial(self._post_request, product_name, dedup=False),
+            requests,
+            batch_size,
+            max_in_flight,
+            journal,
+            job,
+            dedup,
         )
-        product_name_right_list = (
-            self.PRODUCT_NAMES["right_list_priority"]
-            if kwargs.get("priority", False)
-            else self.PRODUCT_NAMES["right_list"]
+
+    def fetch_right_lists_batched(
+        self,
+        requests: Iterable[RealtyObject],
+        batch_size: int = settings.ORDER_BATCH_SIZE,
+        max_in_flight: int = settings.ORDER_MAX_IN_FLIGHT,
+        journal: Optional[OrderJournal] = None,
+        job: Optional[str] = None,
+        dedup: Union[bool, KeySet, DiskKeySet] = True,
+        **kwargs,
+    ) -> Iterator[BatchResult]:
+        """Заказать списки прав партиями, возвращая результаты партий по мере готовности."""
+        product_name = self._product_name("right_list", kwargs.get("priority", False))
+        return self._send_batched(
+            product_name,
+            partial(self._post_request, product_name, dedup=False),
+            requests,
+            batch_size,
+            max_in_flight,
+            journal,
+            job,
+            dedup,
         )
-        order_items = [
-            request.to_dict(product_name_object),
-            request.to_dict(product_name_right_list),
-        ]
+
+    def fetch_multiple_full_data(
+        self, requests: Union[List[RealtyObject], RealtyObject], **kwargs
+    ) -> Optional[Dict]:
+        """Получить полные данные для объектов и их прав с заданными ключами и необязательными адресами."""
+        if isinstance(requests, RealtyObject):
+            # Прежний вызов с одним объектом
+            requests = [requests]
+        priority = kwargs.get("priority", False)
+        product_name_object = self._product_name("object", priority)
+        product_name_right_list = self._product_name("right_list", priority)
+        requests, positions = collapse(requests)
+        order_items = []
+        for request in requests:
+            order_items.append(request.to_dict(product_name_object))
+            order_items.append(request.to_dict(product_name_right_list))
+        if positions is not None:
+            # На каждый объект в ответе две позиции: характеристики и права
+            positions = [2 * position + part for position in positions for part in (0, 1)]
         response = self._post("", {"order_items": order_items})
-        return response.get("data")
+        return self._order_data(expand_response(response, positions))
 
 
 class RiskClient(ClientBase):
     """Клиент API риска Realtycloud."""
 
-    BASE_URL = "https://api.realtycloud.ru/order"
+    PATH = "/order"
+    ENDPOINT = "order"
+
+    def __init__(
+        self,
+        token: str,
+        client: Optional[Client] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
 
-    def __init__(self, token: str):
-        super().__init__(base_url=self.BASE_URL, token=token)
+    def _product_name(self, priority: bool) -> str:
+        """Название продукта оценки риска с учетом срочности заказа."""
+        return "RiskAssessmentFastV2" if priority else "RiskAssessmentV2"
+
+    def _post_risk(self, product_name: str, requests: List[RiskRequest]) -> Optional[Dict]:
+        """POST-запрос оценки риска для заданных запросов."""
+        data = {"order_items": [request.to_dict(product_name) for request in requests]}
+        response = self._post("", data)
+        return self._order_data(response)
 
     def fetch_risk_assessment_for_individual(
         self, object: RealtyObject, owners: List[RealtyOwner] = None, **kwargs
     ) -> Optional[Dict]:
         """Получить оценку риска для физического лица."""
-        if owners is None:
-            owners = []
+        _, request = risk_identity(RiskRequest(object, owners))
+        product_name = self._product_name(kwargs.get("priority", False))
+        return self._post_risk(product_name, [request])
+
+    def fetch_risk_assessments_batched(
+        self,
+        requests: Iterable[Union[RiskRequest, Tuple[RealtyObject, List[RealtyOwner]]]],
+        batch_size: int = settings.ORDER_BATCH_SIZE,
+        max_in_flight: int = settings.ORDER_MAX_IN_FLIGHT,
+        journal: Optional[OrderJournal] = None,
+        job: Optional[str] = None,
+        dedup: Union[bool, KeySet, DiskKeySet] = True,
+        **kwargs,
+    ) -> Iterator[BatchResult]:
+        """
+        Заказать оценки риска партиями, возвращая результаты партий по мере готовности.
 
-        product_name = (
-            "RiskAssessmentFastV2"
-            if kwargs.get("priority", False)
-            else "RiskAssessmentV2"
+        requests - RiskRequest или пары (объект, владельцы). Повтором считается
+        тот же объект с тем же набором владельцев.
+        """
+        product_name = self._product_name(kwargs.get("priority", False))
+        return self._send_batched(
+            product_name,
+            partial(self._post_risk, product_name),
+            map(RiskRequest.coerce, requests),
+            batch_size,
+            max_in_flight,
+            journal,
+            job,
+            dedup,
+            risk_identity,
         )
-        data = {
-            "order_items": [
-                {
-                    "product_name": product_name,
-                    "object_key": object.key,
-                    "object_address": object.address,
-                    "metadata": {"ownersData": [owner.to_dict() for owner in owners]},
-                }
-            ]
-        }
-        response = self._post("", data)
-        return response.get("data")
 
 
 class StatusClient(ClientBase):
     """Клиент API статуса Realtycloud."""
 
-    BASE_URL = "https://api.realtycloud.ru/orders"
+    PATH = "/orders"
+    ENDPOINT = "orders"
 
-    def __init__(self, token: str):
-        super().__init__(base_url=self.BASE_URL, token=token)
+    def __init__(
+        self,
+        token: str,
+        client: Optional[Client] = None,
+        api_url: str = settings.API_URL,
+        **kwargs,
+    ):
+        super().__init__(
+            base_url=api_url + self.PATH, token=token, client=client, **kwargs
+        )
 
     def fetch_status(
         self, order_item_ids: List[str], offset: int = 0, limit: int = 1000
@@ -348,21 +690,168 @@ class StatusClient(ClientBase):
         if not order_item_ids:
             order_item_ids = []
         data = {"order_item_ids": order_item_ids, "offset": offset, "limit": limit}
-        response = self._post("", data)
+        response = self._post("", data, idempotent=True)
+        if self._models:
+            return [StatusItem(item) for item in response.get("data") or []]
         return response.get("data")
 
 
 class Realtycloud:
     """Синхронный клиент API Realtycloud."""
 
-    def __init__(self, token: str):
-        self._egrn_client = EGRNClient(token=token)
-        self._suggest_client = SuggestClient(token=token)
-        self._simple_suggest_client = SimpleSuggestClient(token=token)
-        self._house_client = HouseClient(token=token)
-        self._info_client = InfoClient(token=token)
-        self._risk_client = RiskClient(token=token)
-        self._status_client = StatusClient(token=token)
+    def __init__(
+        self,
+        token: Union[str, TokenPool],
+        limits: Optional[Limits] = None,
+        http2: bool = False,
+        api_url: str = settings.API_URL,
+        cache: Optional[BaseCache] = None,
+        single_flight: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        serializer: Optional[Serializer] = None,
+        models: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        timeouts: Optional[Mapping[str, TimeoutValue]] = None,
+        index: Optional[CadastralIndex] = None,
+        cache_ttls: Optional[Mapping[str, Optional[float]]] = None,
+        max_workers: int = settings.FANOUT_MAX_WORKERS,
+    ):
+        # Пул потоков для методов map_*, создается при первом обращении
+        self.max_workers = max_workers
+        # Адрес API: только на него загрузчик отчетов отправляет API-Key
+        self._api_url = api_url
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Пул токенов: справочные методы распределяются между аккаунтами,
+        # а заказы, статусы и загрузки идут от основного токена
+        self.token_pool = token if isinstance(token, TokenPool) else None
+        if self.token_pool is not None:
+            token = self.token_pool.primary
+        # Один пул соединений на все клиенты: прогретые соединения к API
+        # переиспользуются между поиском, заказами и проверкой статусов
+        self._client = Client(
+            **build_client_options(token, limits=limits, http2=http2)
+        )
+        options = {
+            "token": token,
+            "client": self._client,
+            "api_url": api_url,
+            "cache": cache,
+            # Одинаковые одновременные запросы разделяют один ответ
+            "single_flight": SingleFlight() if single_flight else None,
+            "rate_limiter": rate_limiter,
+            "retry_policy": retry_policy or RetryPolicy(),
+            "serializer": serializer or get_serializer(),
+            "models": models,
+            "token_pool": self.token_pool,
+            "instrumentation": instrumentation,
+            # Таймауты этапов запроса по семействам методов вместо settings.TIMEOUT_PROFILES
+            "timeouts": timeouts,
+            # Локальный индекс кадастровых номеров для suggest и info
+            "index": index,
+            # Сроки жизни кэша по семействам методов вместо settings.CACHE_TTL_SEC
+            "cache_ttls": cache_ttls,
+        }
+        self._egrn_client = EGRNClient(**options)
+        self._suggest_client = SuggestClient(**options)
+        self._simple_suggest_client = SimpleSuggestClient(**options)
+        self._house_client = HouseClient(**options)
+        self._info_client = InfoClient(**options)
+        self._risk_client = RiskClient(**options)
+        self._status_client = StatusClient(**options)
+        # Кэши префиксов подсказок, общие для всех сессий автодополнения
+        prefix_ttl = cache_ttl("dadata", cache_ttls)
+        self._prefix_caches = {
+            "addresses": PrefixCache(ttl=prefix_ttl),
+            "parties": PrefixCache(ttl=prefix_ttl),
+        }
+
+    def __enter__(self) -> "Realtycloud":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Закрыть общий пул соединений и пул потоков."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._client.close()
+
+    def _map(
+        self,
+        fn: Callable[[Any], Any],
+        items: Iterable[Any],
+        max_concurrency: Optional[int],
+        ordered: bool,
+    ) -> Iterator[MapResult]:
+        """Вызвать fn для элементов items в пуле потоков клиента."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="realtycloud"
+                )
+        return fan_out(
+            self._executor, fn, items, max_concurrency or self.max_workers, ordered
+        )
+
+    def map_suggest(
+        self,
+        queries: Iterable[str],
+        max_concurrency: Optional[int] = None,
+        ordered: bool = True,
+    ) -> Iterator[MapResult]:
+        """
+        Выполнить suggest для каждого адреса параллельно в пуле потоков.
+
+        Возвращает MapResult по каждому адресу: в порядке входа или, при
+        ordered=False, по мере готовности. Исключения сохраняются в MapResult.error.
+        """
+        return self._map(self.suggest, queries, max_concurrency, ordered)
+
+    def map_suggest_addresses(
+        self,
+        queries: Iterable[str],
+        count: int,
+        max_concurrency: Optional[int] = None,
+        ordered: bool = True,
+    ) -> Iterator[MapResult]:
+        """Выполнить suggest_addresses для каждого запроса параллельно в пуле потоков."""
+        return self._map(
+            partial(self.suggest_addresses, count), queries, max_concurrency, ordered
+        )
+
+    def map_suggest_parties(
+        self,
+        queries: Iterable[str],
+        count: int,
+        max_concurrency: Optional[int] = None,
+        ordered: bool = True,
+    ) -> Iterator[MapResult]:
+        """Выполнить suggest_parties для каждого запроса параллельно в пуле потоков."""
+        return self._map(
+            partial(self.suggest_parties, count), queries, max_concurrency, ordered
+        )
+
+    def map_info(
+        self,
+        queries: Iterable[str],
+        max_concurrency: Optional[int] = None,
+        ordered: bool = True,
+    ) -> Iterator[MapResult]:
+        """Выполнить info для каждого кадастрового номера параллельно в пуле потоков."""
+        return self._map(self.info, queries, max_concurrency, ordered)
+
+    def map_house_details(
+        self,
+        queries: Iterable[str],
+        max_concurrency: Optional[int] = None,
+        ordered: bool = True,
+    ) -> Iterator[MapResult]:
+        """Выполнить house_details для каждого адреса параллельно в пуле потоков."""
+        return self._map(self.house_details, queries, max_concurrency, ordered)
 
     def suggest(self, query: str, **kwargs) -> List[Dict]:
         """Запрос на получение списка кадастровых номеров по адресу"""
@@ -380,16 +869,30 @@ class Realtycloud:
             count=count, query=query, **kwargs
         )
 
+    def suggest_session(self, kind: str = "addresses", **kwargs) -> SuggestSession:
+        """
+        Сессия подсказок для поля ввода с автодополнением.
+
+        kind - "addresses" (suggest_addresses) или "parties" (suggest_parties).
+        Параметры count, min_length, fetch_count и cache передаются в
+        SuggestSession; по умолчанию сессии одного клиента разделяют кэш
+        префиксов.
+        """
+        fetch = {
+            "addresses": self.suggest_addresses,
+            "parties": self.suggest_parties,
+        }[kind]
+        kwargs.setdefault("cache", self._prefix_caches[kind])
+        return SuggestSession(fetch, **kwargs)
+
     def info(self, query: str, **kwargs) -> List[Dict]:
         """Запрос на получение информации по кадастровому номеру"""
         return self._info_client.info(query=query, **kwargs)
 
     def house_details(self, query: str, **kwargs) -> List[Dict]:
         """Запрос на получение информации о дому по адресу"""
-        return self._house_client.house_details(
-            query=query, **kwargs
-        )
-    
+        return self._house_client.house_details(address=query, **kwargs)
+
     def order_single_object(self, request: RealtyObject, **kwargs) -> Optional[Dict]:
         """Запрос на отчет о характеристиках объекта недвижимости"""
         return self._egrn_client.fetch_single_object(request, **kwargs)
@@ -412,9 +915,28 @@ class Realtycloud:
         """Запрос на оптовые отчеты о переходе прав объектов недвижимости"""
         return self._egrn_client.fetch_multiple_right_lists(requests, **kwargs)
 
+    def order_objects_batched(
+        self, requests: Iterable[RealtyObject], **kwargs
+    ) -> Iterator[BatchResult]:
+        """Оптовый заказ отчетов о характеристиках объектов партиями.
+
+        Подходит для десятков тысяч объектов: партии по batch_size объектов
+        отправляются параллельно (не более max_in_flight одновременно),
+        а ошибка одной партии не прерывает заказ остальных. С journal
+        (OrderJournal) заказ можно прервать и запустить снова: уже заказанные
+        объекты будут пропущены.
+        """
+        return self._egrn_client.fetch_objects_batched(requests, **kwargs)
+
+    def order_right_lists_batched(
+        self, requests: Iterable[RealtyObject], **kwargs
+    ) -> Iterator[BatchResult]:
+        """Оптовый заказ отчетов о переходе прав объектов партиями"""
+        return self._egrn_client.fetch_right_lists_batched(requests, **kwargs)
+
     def order_single_full_data(self, request: RealtyObject, **kwargs) -> Optional[Dict]:
         """Запрос на отчет о характеристиках и переходе прав объектов недвижимости"""
-        return self._egrn_client.fetch_multiple_full_data(request, **kwargs)
+        return self._egrn_client.fetch_multiple_full_data([request], **kwargs)
 
     def order_multiple_full_data(
         self, requests: List[RealtyObject], **kwargs
@@ -430,6 +952,20 @@ class Realtycloud:
             object, owners=owners, **kwargs
         )
 
+    def order_risk_assessments_batched(
+        self,
+        requests: Iterable[Union[RiskRequest, Tuple[RealtyObject, List[RealtyOwner]]]],
+        **kwargs,
+    ) -> Iterator[BatchResult]:
+        """Оптовый заказ оценок рисков собственников партиями.
+
+        requests - RiskRequest или пары (объект, владельцы). Партии по
+        batch_size позиций со своими metadata.ownersData отправляются
+        параллельно (не более max_in_flight одновременно); journal, job
+        и dedup - как в order_objects_batched.
+        """
+        return self._risk_client.fetch_risk_assessments_batched(requests, **kwargs)
+
     def check_status(
         self, order_item_ids: List[str], offset: int = 0, limit: int = 1000, **kwargs
     ):
@@ -453,3 +989,44 @@ class Realtycloud:
         return self._status_client.fetch_status(
             order_item_ids=order_item_ids, offset=offset, limit=limit, **kwargs
         )
+
+    def track_orders(self, order_item_ids: Iterable[str] = (), **kwargs) -> OrderTracker:
+        """
+        Отслеживание статусов множества заказов с соблюдением интервала опроса.
+
+        Параметры опроса (poll_interval, max_interval, backoff_factor и др.)
+        передаются в OrderTracker.
+        """
+        return OrderTracker(self.check_status, order_item_ids, **kwargs)
+
+    def resume_orders(
+        self, journal: OrderJournal, job: Optional[str] = None, **kwargs
+    ) -> OrderTracker:
+        """
+        Продолжить отслеживание незавершенных позиций заказов из журнала.
+
+        Позиции, уже получившие итоговый статус, не опрашиваются; новые статусы
+        дописываются в журнал.
+        """
+        return OrderTracker(
+            self.check_status,
+            journal.pending_order_item_ids(job),
+            journal=journal,
+            **kwargs,
+        )
+
+    def downloader(self, **kwargs) -> ReportDownloader:
+        """Загрузчик файлов отчетов, использующий общий пул соединений клиента."""
+        kwargs.setdefault("api_url", self._api_url)
+        return ReportDownloader(self._client, **kwargs)
+
+    def download_reports(
+        self, status_items: Iterable[Dict], directory: str, **kwargs
+    ) -> Iterator[DownloadResult]:
+        """
+        Потоковая загрузка файлов готовых отчетов (file_pdf_url, file_signed_zip_url)
+        из ответа check_status в каталог directory.
+
+        Параметры chunk_size, max_parallel и timeout передаются в ReportDownloader.
+        """
+        return self.downloader(**kwargs).download_reports(status_items, directory)
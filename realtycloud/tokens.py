@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+import math
+import threading
+import time
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple, Union
+
+from realtycloud import settings
+from .exceptions import (
+    RealtycloudException,
+    RealtycloudForbiddenException,
+    RealtycloudInvalidKeyException,
+    RealtycloudRequestLimitExceededException,
+    RealtycloudTokenPoolExhaustedException,
+)
+from .ratelimit import parse_retry_after
+
+__all__ = ["TokenUsage", "TokenPool"]
+
+
+class TokenUsage:
+    """Счетчики использования токена."""
+
+    __slots__ = (
+        "requests",
+        "errors",
+        "limited",
+        "forbidden",
+        "remaining",
+        "resets_at",
+        "blocked_until",
+        "forbidden_until",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        # Ошибки превышения лимита и отказа в доступе
+        self.limited = 0
+        self.forbidden = 0
+        # Остаток квоты, если он известен, и момент ее восстановления (monotonic)
+        self.remaining: Optional[float] = None
+        self.resets_at: Optional[float] = None
+        # Вывод из ротации после превышения лимита (его стоит ждать) и после
+        # отказа в доступе или невалидного ключа (его ждать не стоит)
+        self.blocked_until = 0.0
+        self.forbidden_until = 0.0
+
+    def copy(self) -> "TokenUsage":
+        usage = TokenUsage()
+        for name in self.__slots__:
+            setattr(usage, name, getattr(self, name))
+        return usage
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(requests={self.requests}, errors={self.errors}, "
+            f"limited={self.limited}, forbidden={self.forbidden}, remaining={self.remaining})"
+        )
+
+
+class TokenPool:
+    """
+    Пул токенов нескольких аккаунтов для распределения запросов.
+
+    Запросы к семействам методов endpoints распределяются между токенами
+    пропорционально весу (взвешенный round-robin), а если для токена известен
+    остаток квоты (set_remaining), - пропорционально остатку. Токен, получивший
+    ошибку превышения лимита, выводится из ротации на время из Retry-After
+    или cooldown секунд, получивший отказ в доступе - на forbidden_cooldown,
+    а невалидный ключ - навсегда. Если свободных токенов нет, reserve
+    возвращает токен, раньше других выходящий из паузы лимита или
+    восстанавливающий квоту, вместе со временем ожидания. Отозванные и
+    невалидные токены не ждут: если других нет, reserve сразу возбуждает
+    RealtycloudTokenPoolExhaustedException, а если квота исчерпана и время ее
+    восстановления неизвестно - RealtycloudRequestLimitExceededException.
+
+    Заказы и проверка статусов по умолчанию выполняются основным (первым)
+    токеном: позиции заказа принадлежат аккаунту, который их создал.
+    """
+
+    def __init__(
+        self,
+        tokens: Union[Sequence[str], Mapping[str, float]],
+        cooldown: float = settings.TOKEN_COOLDOWN_SEC,
+        forbidden_cooldown: float = settings.TOKEN_FORBIDDEN_COOLDOWN_SEC,
+        endpoints: Iterable[str] = settings.TOKEN_POOL_ENDPOINTS,
+    ):
+        weights = dict(tokens) if isinstance(tokens, Mapping) else dict.fromkeys(tokens, 1.0)
+        if not weights:
+            raise ValueError("Пул должен содержать хотя бы один токен.")
+        if any(weight <= 0 for weight in weights.values()):
+            raise ValueError("Вес токена должен быть положительным числом.")
+        self.weights = weights
+        self.cooldown = cooldown
+        self.forbidden_cooldown = forbidden_cooldown
+        self.endpoints = frozenset(endpoints)
+        self._lock = threading.Lock()
+        self._usage: Dict[str, TokenUsage] = {token: TokenUsage() for token in weights}
+        # Текущие веса алгоритма плавного взвешенного round-robin
+        self._current: Dict[str, float] = dict.fromkeys(weights, 0.0)
+
+    @property
+    def primary(self) -> str:
+        """Основной токен: используется для заказов, статусов и загрузки файлов."""
+        return next(iter(self.weights))
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def _effective_weight(self, token: str) -> float:
+        remaining = self._usage[token].remaining
+        if remaining is None:
+            return self.weights[token]
+        return max(0.0, remaining)
+
+    def _quota_ready_at(self, token: str) -> float:
+        """Момент окончания паузы лимита и восстановления квоты; inf - неизвестно."""
+        usage = self._usage[token]
+        if self._effective_weight(token) > 0:
+            return usage.blocked_until
+        if usage.resets_at is None:
+            return math.inf
+        return max(usage.blocked_until, usage.resets_at)
+
+    def _ready_at(self, token: str) -> float:
+        """Момент, с которого токен можно использовать; inf - неизвестно."""
+        return max(self._usage[token].forbidden_until, self._quota_ready_at(token))
+
+    def reserve(self) -> Tuple[str, float]:
+        """Выбрать токен для запроса и вернуть его вместе с временем ожидания в секундах."""
+        with self._lock:
+            now = time.monotonic()
+            for usage in self._usage.values():
+                if usage.resets_at is not None and usage.resets_at <= now:
+                    # Квота восстановлена, ее новый остаток неизвестен
+                    usage.remaining = None
+                    usage.resets_at = None
+            available = [token for token in self._usage if self._ready_at(token) <= now]
+            if not available:
+                # Ждать имеет смысл только паузы лимита и восстановления квоты:
+                # отозванный токен (forbidden_cooldown) не должен задерживать вызов
+                waiting = [
+                    token
+                    for token in self._usage
+                    if self._usage[token].forbidden_until <= now
+                    and self._quota_ready_at(token) < math.inf
+                ]
+                if not waiting:
+                    if all(usage.forbidden_until > now for usage in self._usage.values()):
+                        raise RealtycloudTokenPoolExhaustedException(
+                            "Все токены пула отозваны или невалидны."
+                        )
+                    raise RealtycloudRequestLimitExceededException(
+                        "Квота всех токенов пула исчерпана."
+                    )
+                token = min(waiting, key=self._ready_at)
+                ready_at = self._ready_at(token)
+                usage = self._usage[token]
+                usage.requests += 1
+                if usage.resets_at is not None and usage.resets_at <= ready_at:
+                    usage.remaining = None
+                    usage.resets_at = None
+                return token, ready_at - now
+            total = 0.0
+            for name in available:
+                weight = self._effective_weight(name)
+                self._current[name] += weight
+                total += weight
+            token = max(available, key=self._current.__getitem__)
+            self._current[token] -= total
+            usage = self._usage[token]
+            usage.requests += 1
+            if usage.remaining is not None:
+                usage.remaining -= 1
+            return token, 0.0
+
+    def available(self) -> int:
+        """Число токенов, которые можно использовать сейчас: не в паузе и с квотой."""
+        with self._lock:
+            now = time.monotonic()
+            return sum(1 for token in self._usage if self._ready_at(token) <= now)
+
+    def report_error(
+        self, token: str, error: RealtycloudException, retry_after: Optional[float] = None
+    ) -> None:
+        """Учесть ошибку запроса и при необходимости вывести токен из ротации."""
+        with self._lock:
+            usage = self._usage.get(token)
+            if usage is None:
+                return
+            usage.errors += 1
+            if isinstance(error, RealtycloudRequestLimitExceededException):
+                usage.limited += 1
+                if retry_after is None:
+                    retry_after = parse_retry_after(
+                        getattr(error, "headers", {}).get("retry-after")
+                    )
+                pause = retry_after if retry_after is not None else self.cooldown
+                usage.blocked_until = max(usage.blocked_until, time.monotonic() + pause)
+            elif isinstance(error, RealtycloudForbiddenException):
+                usage.forbidden += 1
+                usage.forbidden_until = max(
+                    usage.forbidden_until, time.monotonic() + self.forbidden_cooldown
+                )
+            elif isinstance(error, RealtycloudInvalidKeyException):
+                # Невалидный ключ не восстановится сам: выводим токен навсегда
+                usage.forbidden += 1
+                usage.forbidden_until = math.inf
+
+    def set_remaining(
+        self, token: str, remaining: Optional[float], reset_in: Optional[float] = None
+    ) -> None:
+        """
+        Сообщить остаток квоты токена; None - распределять по весу. reset_in -
+        через сколько секунд квота восстановится, если это известно.
+        """
+        with self._lock:
+            usage = self._usage[token]
+            usage.remaining = remaining
+            usage.resets_at = time.monotonic() + reset_in if reset_in is not None else None
+
+    def usage(self) -> Dict[str, TokenUsage]:
+        """Копия счетчиков использования по токенам."""
+        with self._lock:
+            return {token: usage.copy() for token, usage in self._usage.items()}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(tokens={len(self)})"
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import heapq
+import math
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from realtycloud import settings
+
+if TYPE_CHECKING:
+    from .journal import OrderJournal
+
+__all__ = ["StatusEvent", "OrderTracker", "AsyncOrderTracker", "FINAL_STATUSES"]
+
+# Статусы, после которых опрашивать заказ больше не нужно
+FINAL_STATUSES = frozenset(("done", "refund", "deleted", "actionrequired"))
+
+
+class StatusEvent:
+    """Событие о переходе заказа в итоговый статус."""
+
+    __slots__ = ("order_item_id", "status", "item")
+
+    def __init__(self, order_item_id: str, status: str, item: Dict):
+        self.order_item_id = order_item_id
+        self.status = status
+        self.item = item
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(order_item_id={self.order_item_id}, status={self.status})"
+
+
+class _Entry:
+    """Состояние отслеживаемой позиции заказа."""
+
+    __slots__ = ("due", "interval", "status")
+
+    def __init__(self, due: float, interval: float):
+        self.due = due
+        self.interval = interval
+        self.status = None
+
+
+class OrderTracker:
+    """
+    Отслеживание статусов большого числа заказов.
+
+    Позиции, которым пора обновить статус, объединяются в минимальное число
+    запросов fetch_status с постраничной выборкой offset/limit. Каждая позиция
+    опрашивается не чаще раза в poll_interval секунд, а если ее статус
+    не меняется, интервал увеличивается в backoff_factor раз до max_interval.
+    Время следующего опроса округляется вверх до границы окна coalesce_window,
+    чтобы близкие по времени позиции опрашивались одним запросом: опрос
+    может сдвинуться только на более позднее время, но не на более раннее.
+
+    Статусы, пришедшие через вебхук, передаются в feed. Пока вебхуки поступают
+    (последний не старше webhook_window секунд), опрос замедляется до
+    страховочного интервала safety_net_interval.
+
+    Если передан journal (OrderJournal), изменения статусов дописываются в него.
+    """
+
+    def __init__(
+        self,
+        fetch_status: Callable[..., Optional[List[Dict]]],
+        order_item_ids: Iterable[str] = (),
+        poll_interval: float = settings.STATUS_POLL_INTERVAL_SEC,
+        max_interval: float = settings.STATUS_MAX_POLL_INTERVAL_SEC,
+        backoff_factor: float = settings.STATUS_BACKOFF_FACTOR,
+        coalesce_window: float = settings.STATUS_COALESCE_WINDOW_SEC,
+        batch_size: int = settings.STATUS_BATCH_SIZE,
+        limit: int = settings.STATUS_PAGE_LIMIT,
+        final_statuses: Iterable[str] = FINAL_STATUSES,
+        safety_net_interval: float = settings.STATUS_SAFETY_NET_INTERVAL_SEC,
+        webhook_window: float = settings.WEBHOOK_ACTIVITY_WINDOW_SEC,
+        on_event: Optional[Callable[[StatusEvent], None]] = None,
+        journal: Optional["OrderJournal"] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._fetch_status = fetch_status
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.coalesce_window = coalesce_window
+        self.batch_size = batch_size
+        self.limit = limit
+        self.final_statuses = frozenset(final_statuses)
+        self.safety_net_interval = safety_net_interval
+        self.webhook_window = webhook_window
+        self.on_event = on_event
+        # Журнал заказов, в который дописываются переходы статусов
+        self.journal = journal
+        self._clock = clock
+        self._last_push: Optional[float] = None
+        # Состояние меняется и опросом, и потоком приема вебхуков
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _Entry] = {}
+        # Куча (время опроса, order_item_id); устаревшие записи пропускаются
+        self._heap: List[Tuple[float, str]] = []
+        self.add(order_item_ids)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, order_item_id: str) -> bool:
+        return order_item_id in self._entries
+
+    @property
+    def webhook_active(self) -> bool:
+        """Вебхуки поступают, и опрос работает в страховочном режиме."""
+        return (
+            self._last_push is not None
+            and self._clock() - self._last_push <= self.webhook_window
+        )
+
+    def _min_interval(self) -> float:
+        """Минимальный интервал опроса позиции в текущем режиме."""
+        if self.webhook_active:
+            return max(self.poll_interval, self.safety_net_interval)
+        return self.poll_interval
+
+    def add(self, order_item_ids: Iterable[str]) -> None:
+        """Добавить позиции заказа к отслеживанию; первый опрос — при ближайшей проверке."""
+        with self._lock:
+            now = self._clock()
+            for order_item_id in order_item_ids:
+                if order_item_id in self._entries:
+                    continue
+                self._entries[order_item_id] = _Entry(now, self.poll_interval)
+                heapq.heappush(self._heap, (now, order_item_id))
+
+    def discard(self, order_item_ids: Iterable[str]) -> None:
+        """Прекратить отслеживание позиций заказа."""
+        with self._lock:
+            for order_item_id in order_item_ids:
+                self._entries.pop(order_item_id, None)
+
+    def final_events(self, items: Iterable[Dict]) -> List[StatusEvent]:
+        """
+        События, которые вызовет feed(items), без изменения состояния: по
+        одному на отслеживаемую позицию в итоговом статусе.
+        """
+        events = []
+        seen = set()
+        with self._lock:
+            for item in items:
+                order_item_id = item.get("order_item_id")
+                if order_item_id not in self._entries or order_item_id in seen:
+                    continue
+                seen.add(order_item_id)
+                if item.get("status") in self.final_statuses:
+                    events.append(StatusEvent(order_item_id, item["status"], item))
+        return events
+
+    def feed(self, items: Iterable[Dict]) -> List[StatusEvent]:
+        """Применить статусы, полученные не опросом (например, через вебхук)."""
+        with self._lock:
+            self._last_push = self._clock()
+            return self._apply([], items)
+
+    def next_poll_in(self) -> Optional[float]:
+        """Секунд до ближайшего опроса или None, если отслеживать нечего."""
+        with self._lock:
+            self._drop_stale_heap_head()
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self._clock())
+
+    def _drop_stale_heap_head(self) -> None:
+        """Удалить из вершины кучи записи о снятых или перенесенных позициях."""
+        while self._heap:
+            due, order_item_id = self._heap[0]
+            entry = self._entries.get(order_item_id)
+            if entry is not None and entry.due == due:
+                return
+            heapq.heappop(self._heap)
+
+    def _take_due(self) -> List[str]:
+        """Забрать позиции, время опроса которых наступило."""
+        with self._lock:
+            now = self._clock()
+            due_ids = []
+            while True:
+                self._drop_stale_heap_head()
+                if not self._heap or self._heap[0][0] > now:
+                    return due_ids
+                due_ids.append(heapq.heappop(self._heap)[1])
+
+    def _slot(self, due: float) -> float:
+        """Ближайшая не более ранняя граница окна объединения опросов."""
+        if self.coalesce_window <= 0:
+            return due
+        return math.ceil(due / self.coalesce_window) * self.coalesce_window
+
+    def _reschedule(self, order_item_id: str, entry: _Entry, changed: bool) -> None:
+        """Назначить следующий опрос с учетом того, изменился ли статус."""
+        min_interval = self._min_interval()
+        if changed:
+            entry.interval = min_interval
+        else:
+            entry.interval = max(
+                min(entry.interval * self.backoff_factor, self.max_interval),
+                min_interval,
+            )
+        entry.due = self._slot(self._clock() + entry.interval)
+        heapq.heappush(self._heap, (entry.due, order_item_id))
+
+    def _apply(
+        self, polled_ids: List[str], items: Iterable[Dict]
+    ) -> List[StatusEvent]:
+        """Обновить состояние по ответу API и собрать события."""
+        if self.journal is not None:
+            items = list(items)
+            self.journal.record_statuses(items)
+        events = []
+        seen = set()
+        with self._lock:
+            for item in items:
+                order_item_id = item.get("order_item_id")
+                entry = self._entries.get(order_item_id)
+                if entry is None or order_item_id in seen:
+                    continue
+                seen.add(order_item_id)
+                status = item.get("status")
+                if status in self.final_statuses:
+                    del self._entries[order_item_id]
+                    events.append(StatusEvent(order_item_id, status, item))
+                    continue
+                changed = status != entry.status
+                entry.status = status
+                self._reschedule(order_item_id, entry, changed)
+            # Позиции, не вернувшиеся в ответе, считаются неизменившимися
+            for order_item_id in polled_ids:
+                entry = self._entries.get(order_item_id)
+                if entry is not None and order_item_id not in seen:
+                    self._reschedule(order_item_id, entry, changed=False)
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+        return events
+
+    def _fetch_batch(self, order_item_ids: List[str]) -> List[Dict]:
+        """Получить статусы позиций, пролистав все страницы ответа."""
+        items = []
+        offset = 0
+        while True:
+            page = (
+                self._fetch_status(order_item_ids, offset=offset, limit=self.limit)
+                or []
+            )
+            items.extend(page)
+            if len(page) < self.limit:
+                return items
+            offset += self.limit
+
+    def poll(self) -> List[StatusEvent]:
+        """Опросить позиции, время которых наступило, и вернуть события о завершении."""
+        due_ids = self._take_due()
+        events = []
+        for start in range(0, len(due_ids), self.batch_size):
+            batch = due_ids[start : start + self.batch_size]
+            try:
+                items = self._fetch_batch(batch)
+            except Exception:
+                # Неопрошенные позиции возвращаются в расписание с отсрочкой
+                self._apply(due_ids[start:], [])
+                raise
+            events.extend(self._apply(batch, items))
+        return events
+
+    def run(self, sleep: Callable[[float], None] = time.sleep) -> Iterator[StatusEvent]:
+        """Опрашивать статусы, пока не завершатся все позиции, возвращая события по мере появления."""
+        while True:
+            delay = self.next_poll_in()
+            if delay is None:
+                return
+            if delay > 0:
+                sleep(delay)
+            for event in self.poll():
+                yield event
+
+
+class AsyncOrderTracker(OrderTracker):
+    """Асинхронный вариант OrderTracker для AsyncRealtycloud.check_status."""
+
+    def __init__(
+        self,
+        fetch_status: Callable[..., Awaitable[Optional[List[Dict]]]],
+        order_item_ids: Iterable[str] = (),
+        **kwargs,
+    ):
+        super().__init__(fetch_status, order_item_ids, **kwargs)
+
+    async def _fetch_batch(self, order_item_ids: List[str]) -> List[Dict]:
+        """Получить статусы позиций, пролистав все страницы ответа."""
+        items = []
+        offset = 0
+        while True:
+            page = (
+                await self._fetch_status(order_item_ids, offset=offset, limit=self.limit)
+                or []
+            )
+            items.extend(page)
+            if len(page) < self.limit:
+                return items
+            offset += self.limit
+
+    async def poll(self) -> List[StatusEvent]:
+        """Опросить позиции, время которых наступило, и вернуть события о завершении."""
+        due_ids = self._take_due()
+        events = []
+        for start in range(0, len(due_ids), self.batch_size):
+            batch = due_ids[start : start + self.batch_size]
+            try:
+                items = await self._fetch_batch(batch)
+            except Exception:
+                # Неопрошенные позиции возвращаются в расписание с отсрочкой
+                self._apply(due_ids[start:], [])
+                raise
+            events.extend(self._apply(batch, items))
+        return events
+
+    async def run(self) -> AsyncIterator[StatusEvent]:
+        """Опрашивать статусы, пока не завершатся все позиции, возвращая события по мере появления."""
+        while True:
+            delay = self.next_poll_in()
+            if delay is None:
+                return
+            if delay > 0:
+                await asyncio.sleep(delay)
+            for event in await self.poll():
+                yield event
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from realtycloud import settings
+from .cache import CacheStats, cache_ttl
+
+__all__ = [
+    "PrefixCache",
+    "SuggestSession",
+    "AsyncSuggestSession",
+    "SessionStats",
+    "normalize_query",
+    "matches_query",
+]
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_query(query: str) -> str:
+    """Ключ запроса подсказок: без регистра, «ё» как «е», одиночные пробелы."""
+    return " ".join(query.split()).casefold().replace("ё", "е")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(normalize_query(text))
+
+
+def matches_query(item: Mapping[str, Any], words: Sequence[str]) -> bool:
+    """Подходит ли подсказка запросу: каждое слово запроса - начало слова подсказки."""
+    value = item.get("unrestricted_value") or item.get("value") or ""
+    item_words = _words(value)
+    return all(any(word.startswith(part) for word in item_words) for part in words)
+
+
+class _Entry:
+    """Ответ API на запрос подсказок, сохраненный в узле префиксного дерева."""
+
+    __slots__ = ("query", "count", "items", "expires_at")
+
+    def __init__(self, query: str, count: int, items: List[Any], expires_at: float):
+        self.query = query
+        self.count = count
+        self.items = items
+        self.expires_at = expires_at
+
+    @property
+    def complete(self) -> bool:
+        """API вернул меньше запрошенного - это все подсказки для запроса."""
+        return len(self.items) < self.count
+
+
+class _Node:
+    __slots__ = ("children", "entry")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.entry: Optional[_Entry] = None
+
+
+class PrefixCache:
+    """
+    Кэш подсказок в префиксном дереве нормализованных запросов.
+
+    Ответ на запрос отдается без обращения к API, если сохранен ответ на тот
+    же запрос с не меньшим count или на более короткий запрос-префикс, из
+    которого фильтрацией по словам набирается нужное число подсказок. Если
+    API вернул на префикс меньше подсказок, чем запрашивалось, отфильтрованный
+    список считается полным при любом count. Подсказки, найденные фильтрацией,
+    идут в порядке ответа на префикс, а не в порядке ранжирования API.
+
+    Фильтрация верна без ограничений, только если API ищет строго по началу
+    слов (prefix_match=True). Поиск подсказок DaData нечеткий, поэтому по
+    умолчанию запрос отвечается фильтрацией, лишь если он длиннее префикса
+    не больше чем на max_extension символов.
+    """
+
+    def __init__(
+        self,
+        max_size: int = settings.SUGGEST_PREFIX_CACHE_SIZE,
+        ttl: Optional[float] = None,
+        prefix_match: bool = False,
+        max_extension: int = settings.SUGGEST_PREFIX_MAX_EXTENSION,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl if ttl is not None else cache_ttl("dadata")
+        self.prefix_match = prefix_match
+        self.max_extension = max_extension
+        self.stats = CacheStats()
+        self._root = _Node()
+        # Порядок использования сохраненных запросов для вытеснения LRU
+        self._order: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def put(self, query: str, count: int, items: List[Any]) -> None:
+        """Сохранить ответ API на запрос query с параметром count."""
+        key = normalize_query(query)
+        with self._lock:
+            node = self._root
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+            node.entry = _Entry(key, count, list(items), time.monotonic() + self.ttl)
+            self._order[key] = None
+            self._order.move_to_end(key)
+            while len(self._order) > self.max_size:
+                evicted, _ = self._order.popitem(last=False)
+                self._remove(evicted)
+                self.stats.evictions += 1
+
+    def lookup(self, query: str, count: int) -> Optional[List[Any]]:
+        """До count подсказок на запрос из кэша или None, если нужен запрос к API."""
+        key = normalize_query(query)
+        with self._lock:
+            result = self._lookup(key, count)
+            if result is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+            return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._root = _Node()
+            self._order.clear()
+
+    def _lookup(self, key: str, count: int) -> Optional[List[Any]]:
+        # Сохраненные ответы на пути от корня: от самого длинного префикса
+        entries: List[_Entry] = []
+        node = self._root
+        if node.entry is not None:
+            entries.append(node.entry)
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.entry is not None:
+                entries.append(node.entry)
+        now = time.monotonic()
+        words: Optional[List[str]] = None
+        for entry in reversed(entries):
+            if entry.expires_at <= now:
+                self._order.pop(entry.query, None)
+                self._remove(entry.query)
+                continue
+            if entry.query == key:
+                if entry.complete or entry.count >= count:
+                    self._order.move_to_end(entry.query)
+                    return entry.items[:count]
+                continue
+            if not self.prefix_match and len(key) - len(entry.query) > self.max_extension:
+                # Более короткие префиксы дальше от запроса
+                break
+            if words is None:
+                words = _words(key)
+            found = [item for item in entry.items if matches_query(item, words)]
+            if entry.complete or len(found) >= count:
+                self._order.move_to_end(entry.query)
+                return found[:count]
+        return None
+
+    def _remove(self, key: str) -> None:
+        """Удалить ответ из дерева вместе с опустевшими узлами."""
+        path: List[Tuple[_Node, str]] = []
+        node = self._root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                return
+            path.append((node, char))
+            node = child
+        node.entry = None
+        for parent, char in reversed(path):
+            child = parent.children[char]
+            if child.entry is not None or child.children:
+                break
+            del parent.children[char]
+
+
+class SessionStats:
+    """Счетчики сессии подсказок."""
+
+    def __init__(self):
+        self.queries = 0
+        self.local = 0
+        self.upstream = 0
+        self.superseded = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(queries={self.queries}, local={self.local}, "
+            f"upstream={self.upstream}, superseded={self.superseded})"
+        )
+
+
+class _BaseSession:
+    """Общая часть синхронной и асинхронной сессий подсказок."""
+
+    def __init__(
+        self,
+        count: int = 10,
+        min_length: int = settings.SUGGEST_MIN_LENGTH,
+        fetch_count: int = settings.SUGGEST_FETCH_COUNT,
+        cache: Optional[PrefixCache] = None,
+    ):
+        self.count = count
+        self.min_length = min_length
+        # У API запрашивается больше подсказок, чем показывается: запас
+        # позволяет отвечать на следующие нажатия фильтрацией
+        self.fetch_count = max(count, fetch_count)
+        self.cache = cache if cache is not None else PrefixCache()
+        self.stats = SessionStats()
+
+    def _local(self, query: str) -> Optional[List[Any]]:
+        """Ответ без запроса к API или None."""
+        if len(normalize_query(query)) < self.min_length:
+            return []
+        result = self.cache.lookup(query, self.count)
+        if result is not None:
+            self.stats.local += 1
+        return result
+
+
+class SuggestSession(_BaseSession):
+    """
+    Сессия подсказок для поля ввода с автодополнением (синхронный клиент).
+
+    fetch - метод клиента с сигнатурой (count, query), например
+    Realtycloud.suggest_addresses. Запросы короче min_length не отправляются,
+    а ответы берутся из PrefixCache, если это возможно. Паузу между нажатиями
+    выдерживает вызывающий код; сессия с паузой и отменой устаревших
+    запросов - AsyncSuggestSession.
+    """
+
+    def __init__(self, fetch: Callable[[int, str], List[Any]], **kwargs):
+        super().__init__(**kwargs)
+        self._fetch = fetch
+
+    def query(self, text: str) -> List[Any]:
+        """Подсказки на текст поля ввода."""
+        self.stats.queries += 1
+        result = self._local(text)
+        if result is not None:
+            return result
+        self.stats.upstream += 1
+        items = self._fetch(self.fetch_count, text)
+        self.cache.put(text, self.fetch_count, items)
+        return items[: self.count]
+
+
+class _InFlight:
+    """Запрос к API, выполняющийся в сессии."""
+
+    __slots__ = ("key", "task")
+
+    def __init__(self, key: str, task: "asyncio.Task[List[Any]]"):
+        self.key = key
+        self.task = task
+
+
+class AsyncSuggestSession(_BaseSession):
+    """
+    Сессия подсказок для поля ввода с автодополнением (асинхронный клиент).
+
+    query() вызывается на каждое нажатие клавиши. Ответ из PrefixCache
+    возвращается сразу; иначе запрос к API отправляется, только если за
+    debounce секунд не пришел следующий текст. Вызов, который перекрыт более
+    новым, возвращает None, а его запрос к API отменяется, если новый текст
+    не продолжает его: ответ на префикс может пригодиться для фильтрации.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[int, str], Awaitable[List[Any]]],
+        debounce: float = settings.SUGGEST_DEBOUNCE_SEC,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._fetch = fetch
+        self.debounce = debounce
+        self._generation = 0
+        self._in_flight: Optional[_InFlight] = None
+
+    async def query(self, text: str) -> Optional[List[Any]]:
+        """Подсказки на текст поля ввода или None, если текст уже изменился."""
+        self._generation += 1
+        generation = self._generation
+        self.stats.queries += 1
+        key = normalize_query(text)
+        self._supersede(key)
+        result = self._local(text)
+        if result is not None:
+            return result
+        if self.debounce > 0:
+            await asyncio.sleep(self.debounce)
+            if generation != self._generation:
+                self.stats.superseded += 1
+                return None
+        in_flight = self._in_flight
+        if in_flight is not None and in_flight.key != key:
+            # Выполняется запрос на префикс текста: его ответ может подойти
+            try:
+                await asyncio.shield(in_flight.task)
+            except asyncio.CancelledError:
+                if not in_flight.task.cancelled():
+                    raise
+            except Exception:
+                pass
+            if generation != self._generation:
+                self.stats.superseded += 1
+                return None
+            result = self._local(text)
+            if result is not None:
+                return result
+            in_flight = None
+        if in_flight is None:
+            self.stats.upstream += 1
+            in_flight = self._in_flight = _InFlight(
+                key, asyncio.ensure_future(self._request(text))
+            )
+        try:
+            items = await asyncio.shield(in_flight.task)
+        except asyncio.CancelledError:
+            if in_flight.task.cancelled():
+                self.stats.superseded += 1
+                return None
+            raise
+        except Exception:
+            if generation != self._generation:
+                self.stats.superseded += 1
+                return None
+            raise
+        if generation != self._generation:
+            self.stats.superseded += 1
+            return None
+        return items[: self.count]
+
+    async def _request(self, text: str) -> List[Any]:
+        items = await self._fetch(self.fetch_count, text)
+        self.cache.put(text, self.fetch_count, items)
+        return items
+
+    def _supersede(self, key: str) -> None:
+        """Отменить выполняющийся запрос, если новый текст не продолжает его."""
+        in_flight = self._in_flight
+        if in_flight is None:
+            return
+        if in_flight.task.done():
+            self._in_flight = None
+        elif not key.startswith(in_flight.key):
+            in_flight.task.cancel()
+            self._in_flight = None
+
+    def close(self) -> None:
+        """Отменить выполняющийся запрос сессии."""
+        self._generation += 1
+        if self._in_flight is not None:
+            self._in_flight.task.cancel()
+            self._in_flight = None
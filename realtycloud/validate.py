@@ -1,9 +1,32 @@
 # -*- coding: utf-8 -*-
-from re import match
+import re
+from functools import lru_cache
+from typing import Pattern
 from realtycloud import settings
 from datetime import datetime
 
 
+@lru_cache(maxsize=None)
+def compiled(pattern: str) -> Pattern:
+    """Скомпилированное регулярное выражение; учитывает изменение settings во время работы."""
+    return re.compile(pattern)
+
+
+def match(pattern: str, value: str):
+    """Аналог re.match без повторного поиска шаблона в кэше модуля re."""
+    return compiled(pattern).match(value)
+
+
+@lru_cache(maxsize=65536)
+def _parse_date(value: str, date_format: str) -> datetime:
+    return datetime.strptime(value, date_format)
+
+
+def parse_birthday(birthday: str) -> datetime:
+    """Разбор даты рождения в формате settings.BIRTHDAY_FORMAT с кэшированием повторов."""
+    return _parse_date(birthday, settings.BIRTHDAY_FORMAT)
+
+
 def validate_object_key(object_key: str) -> None:
     """Проверка корректности object_key."""
     if not match(settings.OBJECT_KEY_REGEX, object_key):
@@ -12,6 +35,20 @@ def validate_object_key(object_key: str) -> None:
         )
 
 
+@lru_cache(maxsize=65536)
+def canonical_object_key(object_key: str) -> str:
+    """
+    Канонический вид object_key для поиска повторов: номера округа и района
+    из двух цифр, номер объекта без ведущих нулей. Номер квартала не
+    меняется: шести- и семизначный номера считаются разными. В API
+    отправляется исходный ключ, а не канонический.
+    """
+    object_key = object_key.strip()
+    validate_object_key(object_key)
+    region, district, block, number = object_key.split(":")
+    return f"{region.zfill(2)}:{district.zfill(2)}:{block}:{int(number)}"
+
+
 def validate_address(address: str) -> None:
     """Проверка корректности адреса."""
     if len(address) > settings.MAX_ADDRESS_LENGTH:
@@ -94,7 +131,7 @@ def validate_owner_individual(owner) -> None:
 
     if owner.birthday:
         try:
-            datetime.strptime(owner.birthday, settings.BIRTHDAY_FORMAT)
+            parse_birthday(owner.birthday)
         except ValueError:
             raise ValueError("Дата рождения должна быть в формате DD.MM.YYYY.")
 
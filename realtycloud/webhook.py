@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import hmac
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from realtycloud import settings
+from .tracking import FINAL_STATUSES, OrderTracker, StatusEvent
+
+__all__ = ["WebhookReceiver", "parse_webhook_payload"]
+
+# Поля позиции в том виде, в котором их возвращает fetch_status
+STATUS_ITEM_FIELDS = ("order_item_id", "product_name", "status", "data")
+
+
+def _normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Привести позицию из вебхука к форме ответа fetch_status."""
+    if "order_item_id" not in item and "id" in item:
+        item = dict(item, order_item_id=item["id"])
+    normalized = {field: item.get(field) for field in STATUS_ITEM_FIELDS}
+    normalized["data"] = normalized["data"] or {}
+    return normalized
+
+
+def parse_webhook_payload(body: bytes) -> List[Dict[str, Any]]:
+    """
+    Разобрать тело запроса вебхука в список позиций как у fetch_status.
+
+    Принимается как список позиций, так и объект с полем data (списком или
+    одной позицией), так и одиночная позиция.
+    """
+    payload = json.loads(body.decode("utf-8"))
+    if isinstance(payload, dict) and "data" in payload and "status" not in payload:
+        payload = payload["data"]
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not all(
+        isinstance(item, dict) for item in payload
+    ):
+        raise ValueError("Неверный формат уведомления о статусе заказа.")
+    return [_normalize_item(item) for item in payload]
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов вебхука."""
+
+    server: "_WebhookServer"
+
+    def do_POST(self) -> None:
+        receiver = self.server.receiver
+        if self.path.split("?", 1)[0] != receiver.path:
+            self._reply(404)
+            return
+        if receiver.secret is not None and not hmac.compare_digest(
+            self.headers.get(settings.WEBHOOK_SECRET_HEADER, ""), receiver.secret
+        ):
+            self._reply(403)
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError("Неверная длина тела запроса.")
+            items = parse_webhook_payload(self.rfile.read(length))
+        except ValueError:
+            self._reply(400)
+            return
+        try:
+            receiver.dispatch(items)
+        except Exception:
+            # Ответ 500 просит отправителя повторить уведомление
+            self._reply(500)
+            return
+        self._reply(200)
+
+    def _reply(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Не писать журнал запросов в stderr."""
+
+
+class _WebhookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, receiver: "WebhookReceiver"):
+        super().__init__(address, _WebhookHandler)
+        self.receiver = receiver
+
+
+class WebhookReceiver:
+    """
+    Встраиваемый приемник вебхуков Realtycloud со статусами заказов.
+
+    Полученные позиции передаются в функцию on_items, в очередь events для
+    событий о завершении заказов и затем в OrderTracker.feed (трекер при этом
+    переходит на страховочный интервал опроса). С трекером события
+    создаются только для отслеживаемых им позиций и один раз на позицию,
+    без трекера - для каждой позиции в итоговом статусе из уведомления.
+    Позиции без order_item_id пропускаются. Событие может прийти дважды,
+    если та же позиция одновременно завершилась при опросе трекера.
+    Если разобрать уведомление не удалось, отвечает 400, если обработка
+    завершилась исключением - 500. Сервер работает в фоновом потоке.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        path: str = "/",
+        secret: Optional[str] = None,
+        tracker: Optional[OrderTracker] = None,
+        on_items: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        events: Optional["queue.Queue[StatusEvent]"] = None,
+    ):
+        self.path = path
+        self.secret = secret
+        self.tracker = tracker
+        self.on_items = on_items
+        self.events = events
+        self._server = _WebhookServer((host, port), self)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Адрес, на который нужно отправлять вебхуки."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def __enter__(self) -> "WebhookReceiver":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self) -> None:
+        """Запустить прием вебхуков в фоновом потоке."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="realtycloud-webhook", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановить прием вебхуков и освободить порт."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def dispatch(self, items: List[Dict[str, Any]]) -> List[StatusEvent]:
+        """
+        Передать позиции подписчикам и трекеру. Трекер обновляется последним:
+        если on_items завершится исключением, трекер по-прежнему ждет эти
+        позиции, и повтор уведомления снова даст события.
+        """
+        items = [item for item in items if item.get("order_item_id")]
+        if self.tracker is not None:
+            events = self.tracker.final_events(items)
+        else:
+            events = [
+                StatusEvent(item["order_item_id"], item["status"], item)
+                for item in items
+                if item["status"] in FINAL_STATUSES
+            ]
+        if self.on_items is not None:
+            self.on_items(items)
+        if self.events is not None:
+            for event in events:
+                self.events.put(event)
+        if self.tracker is not None:
+            self.tracker.feed(items)
+        return events
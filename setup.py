@@ -21,5 +21,12 @@ setuptools.setup(
         "Operating System :: POSIX :: Linux"
     ],
     install_requires=['httpx'],
+    extras_require={
+        'http2': ['httpx[http2]'],
+        'orjson': ['orjson'],
+        'msgspec': ['msgspec'],
+        'prometheus': ['prometheus-client'],
+        'opentelemetry': ['opentelemetry-api'],
+    },
     python_requires='>3.7',
 )
\ No newline at end of file
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+import httpx
+
+from realtycloud import asyncr
+from realtycloud.request_objects import RealtyObject
+from realtycloud.sync import EGRNClient
+
+KEYS = [f"77:01:0001001:{number}" for number in range(1, 6)]
+
+
+def _handler(sent, rejected_key=None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        items = json.loads(request.content)["order_items"]
+        keys = [item["object_key"] for item in items]
+        sent.append(keys)
+        if rejected_key in keys:
+            return httpx.Response(400, text="bad batch")
+        return httpx.Response(
+            200,
+            json={"data": {"order_items": [{"order_item_id": f"id-{key}"} for key in keys]}},
+        )
+
+    return handler
+
+
+def test_objects_are_sent_in_batches():
+    sent = []
+    client = EGRNClient(
+        "token",
+        client=httpx.Client(transport=httpx.MockTransport(_handler(sent))),
+        api_url="http://api",
+    )
+    with client:
+        results = list(
+            client.fetch_objects_batched(
+                [RealtyObject(key) for key in KEYS], batch_size=2, max_in_flight=1
+            )
+        )
+    assert sorted(sent) == [KEYS[0:2], KEYS[2:4], KEYS[4:5]]
+    pairs = [
+        (item.key, order_item["order_item_id"])
+        for result in results
+        for item, order_item in result.pairs()
+    ]
+    assert sorted(pairs) == [(key, f"id-{key}") for key in KEYS]
+
+
+def test_failed_batch_does_not_stop_others():
+    sent = []
+    client = EGRNClient(
+        "token",
+        client=httpx.Client(transport=httpx.MockTransport(_handler(sent, KEYS[2]))),
+        api_url="http://api",
+    )
+    with client:
+        results = list(
+            client.fetch_objects_batched([RealtyObject(key) for key in KEYS], batch_size=2)
+        )
+    failed = [result for result in results if not result.ok]
+    assert len(sent) == 3
+    assert [[item.key for item in result.items] for result in failed] == [KEYS[2:4]]
+    assert sum(len(result.order_item_ids) for result in results if result.ok) == 3
+
+
+def test_async_objects_are_sent_in_batches():
+    sent = []
+
+    async def main():
+        client = asyncr.EGRNClient(
+            "token",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(_handler(sent))),
+            api_url="http://api",
+        )
+        async with client:
+            return [
+                result
+                async for result in client.fetch_objects_batched(
+                    [RealtyObject(key) for key in KEYS], batch_size=2
+                )
+            ]
+
+    results = asyncio.run(main())
+    assert sorted(sent) == [KEYS[0:2], KEYS[2:4], KEYS[4:5]]
+    assert all(result.ok for result in results)
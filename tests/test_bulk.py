@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from realtycloud.bulk import build_objects, build_owners
+
+
+def test_build_objects_keeps_unequal_columns():
+    result = build_objects(["77:01:0001001:1", "77:01:0001001:2"], ["Москва"])
+    assert [obj.address for obj in result.valid] == ["Москва", ""]
+
+    result = build_objects(["77:01:0001001:1"], ["Москва", "Казань"])
+    assert result.rows == [0]
+    assert [(error.row, error.field) for error in result.errors] == [(1, "key")]
+
+
+def test_build_owners_reports_short_columns():
+    result = build_owners(
+        {"owner_type": [0, 0], "last_name": ["Иванов", "Петров"], "first_name": ["Иван"]}
+    )
+    assert result.rows == [0]
+    assert [error.row for error in result.errors] == [1]
+
+
+def test_build_objects_reports_non_string_address():
+    result = build_objects(["77:01:0001001:1", "77:01:0001001:2"], [float("nan"), None])
+    assert [obj.address for obj in result.valid] == [""]
+    assert [(error.row, error.field) for error in result.errors] == [(0, "address")]
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+
+from realtycloud import asyncr
+from realtycloud.cache import MemoryCache, SqliteCache
+from realtycloud.models import LazyDocument
+from realtycloud.sync import SuggestClient
+
+
+def _handler(requests):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"data": [{"Number": "77:01:0001001:5"}]})
+
+    return handler
+
+
+def _client(cache, requests, **kwargs):
+    return SuggestClient(
+        "token",
+        client=httpx.Client(transport=httpx.MockTransport(_handler(requests))),
+        api_url="http://api",
+        cache=cache,
+        **kwargs,
+    )
+
+
+def test_repeated_lookup_is_served_from_cache():
+    requests = []
+    cache = MemoryCache()
+    with _client(cache, requests) as client:
+        first = client.suggest("Москва,  Тверская 1")
+        second = client.suggest("Москва, Тверская 1")
+    assert first == second
+    assert len(requests) == 1
+    assert cache.stats.hits == 1
+
+
+def test_expired_and_evicted_entries_are_dropped():
+    cache = MemoryCache(max_size=2)
+    cache.set("a", 1, ttl=0.01)
+    cache.set("b", 2, ttl=60)
+    cache.set("c", 3, ttl=60)
+    assert cache.get("a") is None
+    assert cache.stats.evictions == 1
+    cache.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+    assert cache.get("c") == 3
+
+
+def test_sqlite_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    requests = []
+    cache = SqliteCache(path)
+    with _client(cache, requests) as client:
+        client.suggest("Москва")
+    cache.close()
+    cache = SqliteCache(path)
+    with _client(cache, requests) as client:
+        client.suggest("Москва")
+    cache.close()
+    assert len(requests) == 1
+
+
+def test_cached_values_are_copies():
+    cache = MemoryCache()
+    value = {"data": [{"Number": "77:01:0001001:5"}]}
+    cache.set("key", value, ttl=60)
+    value["data"].clear()
+    cache.get("key")["data"][0]["Number"] = "changed"
+    assert cache.get("key") == {"data": [{"Number": "77:01:0001001:5"}]}
+    document = LazyDocument(b'{"data": []}', json.loads)
+    cache.set("lazy", document, ttl=60)
+    assert dict(cache.get("lazy")) == {"data": []}
+
+
+def test_client_ttl_overrides_settings():
+    requests = []
+    with _client(MemoryCache(), requests, cache_ttls={"search": None}) as client:
+        client.suggest("Москва")
+        client.suggest("Москва")
+    assert len(requests) == 2
+    requests = []
+    with _client(MemoryCache(), requests, cache_ttls={"search": 0.01}) as client:
+        client.suggest("Москва")
+        time.sleep(0.02)
+        client.suggest("Москва")
+    assert len(requests) == 2
+
+
+def test_async_client_uses_sqlite_cache_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingCache(SqliteCache):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+    async def main(cache):
+        requests = []
+        client = asyncr.SuggestClient(
+            "token",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(_handler(requests))),
+            api_url="http://api",
+            cache=cache,
+        )
+        async with client:
+            await client.suggest("Москва")
+            await client.suggest("Москва")
+        assert len(requests) == 1
+        return threading.get_ident()
+
+    cache = RecordingCache(str(tmp_path / "cache.db"))
+    loop_thread = asyncio.run(main(cache))
+    cache.close()
+    assert len(threads) == 2 and loop_thread not in threads
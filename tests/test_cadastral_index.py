@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+
+import httpx
+
+from realtycloud import asyncr
+from realtycloud.cadastral_index import CadastralIndex
+
+NUMBER = "77:01:0001001:1"
+OLD_ADDRESS = "Москва, Тверская 1"
+NEW_ADDRESS = "Москва, Тверская 2"
+
+
+def _record(address: str, updated_at: float) -> dict:
+    return {"number": NUMBER, "address": address, "updated_at": updated_at}
+
+
+def test_changed_address_replaces_old_mapping():
+    with CadastralIndex() as index:
+        index.import_records([_record(OLD_ADDRESS, 1)])
+        index.import_records([_record(NEW_ADDRESS, 2)])
+        assert index.numbers_for_address(OLD_ADDRESS) == []
+        assert index.numbers_for_address(NEW_ADDRESS) == [NUMBER]
+
+
+def test_older_record_does_not_add_its_address():
+    with CadastralIndex() as index:
+        index.import_records([_record(NEW_ADDRESS, 2)])
+        index.import_records([_record(OLD_ADDRESS, 1)])
+        assert index.lookup(NUMBER)["address"] == NEW_ADDRESS
+        assert index.numbers_for_address(OLD_ADDRESS) == []
+        assert index.numbers_for_address(NEW_ADDRESS) == [NUMBER]
+
+
+def test_async_client_uses_index_off_the_event_loop():
+    threads = []
+
+    class RecordingIndex(CadastralIndex):
+        def search_items(self, query):
+            threads.append(threading.get_ident())
+            return super().search_items(query)
+
+        def record_search(self, query, items):
+            threads.append(threading.get_ident())
+            super().record_search(query, items)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"data": [{"Number": NUMBER, "Address": OLD_ADDRESS}]})
+
+    async def main(index):
+        client = asyncr.SuggestClient(
+            "token",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            api_url="http://api",
+            index=index,
+        )
+        async with client:
+            await client.suggest(OLD_ADDRESS)
+            assert (await client.suggest(OLD_ADDRESS))[0]["number"] == NUMBER
+        return threading.get_ident()
+
+    with RecordingIndex() as index:
+        loop_thread = asyncio.run(main(index))
+    assert len(threads) == 3
+    assert loop_thread not in threads
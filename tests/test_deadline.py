@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+
+import pytest
+
+from realtycloud.deadline import Deadline, current_deadline
+from realtycloud.exceptions import (
+    RealtycloudCancelledException,
+    RealtycloudDeadlineExceededException,
+)
+from realtycloud.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_sleep_is_woken_by_parent_cancel():
+    with Deadline() as outer:
+        with Deadline() as inner:
+            threading.Timer(0.05, outer.cancel).start()
+            started = time.monotonic()
+            with pytest.raises(RealtycloudCancelledException):
+                inner.sleep(5)
+    assert time.monotonic() - started < 1
+
+
+def test_sleep_does_not_outlive_deadline():
+    started = time.monotonic()
+    with Deadline(0.05) as deadline:
+        with pytest.raises(RealtycloudDeadlineExceededException):
+            deadline.sleep(5)
+    assert time.monotonic() - started < 1
+
+
+def test_asleep_is_woken_by_cancel():
+    async def main():
+        with Deadline() as deadline:
+            asyncio.get_running_loop().call_later(0.05, deadline.cancel)
+            await deadline.asleep(5)
+
+    started = time.monotonic()
+    with pytest.raises(RealtycloudCancelledException):
+        asyncio.run(main())
+    assert time.monotonic() - started < 1
+
+
+def test_singleflight_follower_respects_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("key", release.wait))
+    leader.start()
+    time.sleep(0.05)
+    try:
+        with Deadline(0.05):
+            with pytest.raises(RealtycloudDeadlineExceededException):
+                flight.do("key", lambda: None)
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_async_singleflight_follower_respects_deadline():
+    async def main():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "done"
+
+        leader = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        with Deadline(0.05):
+            with pytest.raises(RealtycloudDeadlineExceededException):
+                await flight.do("key", slow)
+        release.set()
+        assert await leader == "done"
+
+    asyncio.run(main())
+
+
+def test_singleflight_follower_takes_over_after_leader_deadline():
+    flight = SingleFlight()
+    entered = threading.Event()
+    outcomes = []
+
+    def expiring():
+        entered.set()
+        time.sleep(0.05)
+        raise RealtycloudDeadlineExceededException("Истек срок выполнения вызова.")
+
+    def lead():
+        try:
+            flight.do("key", expiring)
+        except RealtycloudDeadlineExceededException as e:
+            outcomes.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    entered.wait()
+    assert flight.do("key", lambda: "fresh") == "fresh"
+    leader.join()
+    assert len(outcomes) == 1
+
+
+def test_async_singleflight_follower_takes_over_after_leader_deadline():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def fresh():
+            return "fresh"
+
+        async def lead():
+            with Deadline(0.05):
+                with pytest.raises(RealtycloudDeadlineExceededException):
+                    # Запрос ведущей задачи ограничен ее сроком
+                    await flight.do("key", lambda: current_deadline().asleep(1))
+
+        leader = asyncio.ensure_future(lead())
+        await asyncio.sleep(0)
+        assert await flight.do("key", fresh) == "fresh"
+        await leader
+
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import json
+
+import httpx
+
+from realtycloud.dedup import collapse, object_identity
+from realtycloud.request_objects import RealtyObject
+from realtycloud.sync import EGRNClient
+
+
+def _order_client(sent):
+    def handler(request: httpx.Request) -> httpx.Response:
+        items = json.loads(request.content)["order_items"]
+        sent.append(items)
+        order_items = [
+            {"order_item_id": f"id-{index}", "object_key": item["object_key"]}
+            for index, item in enumerate(items)
+        ]
+        return httpx.Response(200, json={"data": {"order_items": order_items}})
+
+    return EGRNClient(
+        "token", client=httpx.Client(transport=httpx.MockTransport(handler)), api_url="http://api"
+    )
+
+
+def test_identity_keeps_caller_key():
+    obj = RealtyObject("77:1:0001001:05")
+    key, prepared = object_identity(obj)
+    assert prepared is obj
+    assert key == object_identity(RealtyObject("77:01:0001001:5"))[0]
+
+
+def test_six_and_seven_digit_quarters_are_different_objects():
+    six = object_identity(RealtyObject("77:01:001001:5"))[0]
+    seven = object_identity(RealtyObject("77:01:0001001:5"))[0]
+    assert six != seven
+
+
+def test_collapse_sends_first_occurrence_and_expands_response():
+    sent = []
+    with _order_client(sent) as client:
+        data = client.fetch_multiple_objects(
+            [
+                RealtyObject("77:1:0001001:05"),
+                RealtyObject("77:01:0001001:6"),
+                RealtyObject("77:01:0001001:5"),
+            ]
+        )
+    assert [item["object_key"] for item in sent[0]] == ["77:1:0001001:05", "77:01:0001001:6"]
+    assert [item["order_item_id"] for item in data["order_items"]] == ["id-0", "id-1", "id-0"]
+
+
+def test_single_object_is_sent_as_given():
+    sent = []
+    with _order_client(sent) as client:
+        client.fetch_single_object(RealtyObject("77:1:001001:05"))
+    assert sent[0][0]["object_key"] == "77:1:001001:05"
+
+
+def test_collapse_without_duplicates_returns_no_positions():
+    requests = [RealtyObject("77:01:001001:5"), RealtyObject("77:01:0001001:5")]
+    unique, positions = collapse(requests)
+    assert unique == requests and positions is None
+
+
+def test_batched_order_fans_out_duplicates():
+    sent = []
+    requests = [
+        RealtyObject("77:01:0001001:5"),
+        RealtyObject("77:1:0001001:05"),
+        RealtyObject("77:01:0001001:6"),
+        RealtyObject("77:01:0001001:5"),
+    ]
+    with _order_client(sent) as client:
+        results = list(client.fetch_objects_batched(requests, batch_size=2, max_in_flight=1))
+    assert [item["object_key"] for batch in sent for item in batch] == [
+        "77:01:0001001:5",
+        "77:01:0001001:6",
+    ]
+    pairs = [
+        (item.key, order_item["order_item_id"])
+        for result in results
+        for item, order_item in result.pairs()
+    ]
+    assert sorted(pairs) == [
+        ("77:01:0001001:5", "id-0"),
+        ("77:01:0001001:5", "id-0"),
+        ("77:01:0001001:6", "id-1"),
+        ("77:1:0001001:05", "id-0"),
+    ]
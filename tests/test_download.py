@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import io
+
+import httpx
+import pytest
+
+from realtycloud.download import AsyncReportDownloader, ReportDownloader
+from realtycloud.exceptions import RealtycloudDownloadException
+
+BODY = b"0123456789" * 10
+URL = "http://files/report.pdf"
+
+
+def _handler(body, requests):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.headers.get("Range"))
+        range_ = request.headers.get("Range")
+        if not range_:
+            return httpx.Response(200, content=body)
+        start = int(range_[len("bytes="):-1])
+        if start >= len(body):
+            return httpx.Response(
+                416, headers={"Content-Range": f"bytes */{len(body)}"}
+            )
+        return httpx.Response(
+            206,
+            content=body[start:],
+            headers={"Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}"},
+        )
+
+    return handler
+
+
+def _downloader(body, requests):
+    transport = httpx.MockTransport(_handler(body, requests))
+    return ReportDownloader(httpx.Client(transport=transport), api_url="http://api")
+
+
+def test_resume_continues_from_part_file(tmp_path):
+    destination = str(tmp_path / "report.pdf")
+    (tmp_path / "report.pdf.part").write_bytes(BODY[:30])
+    requests = []
+    assert _downloader(BODY, requests).download(URL, destination) == len(BODY)
+    assert (tmp_path / "report.pdf").read_bytes() == BODY
+    assert requests == ["bytes=30-"]
+
+
+def test_416_with_matching_size_completes(tmp_path):
+    destination = str(tmp_path / "report.pdf")
+    (tmp_path / "report.pdf.part").write_bytes(BODY)
+    requests = []
+    assert _downloader(BODY, requests).download(URL, destination) == len(BODY)
+    assert (tmp_path / "report.pdf").read_bytes() == BODY
+    assert requests == [f"bytes={len(BODY)}-"]
+
+
+def test_416_with_other_size_restarts_from_zero(tmp_path):
+    # Локальная копия длиннее файла на сервере: файл изменился
+    destination = str(tmp_path / "report.pdf")
+    (tmp_path / "report.pdf.part").write_bytes(b"x" * 150)
+    requests = []
+    assert _downloader(BODY, requests).download(URL, destination) == len(BODY)
+    assert (tmp_path / "report.pdf").read_bytes() == BODY
+    assert requests == ["bytes=150-", None]
+
+
+def test_async_416_with_other_size_restarts_from_zero(tmp_path):
+    destination = str(tmp_path / "report.pdf")
+    (tmp_path / "report.pdf.part").write_bytes(b"x" * 150)
+    requests = []
+
+    async def main():
+        transport = httpx.MockTransport(_handler(BODY, requests))
+        async with httpx.AsyncClient(transport=transport) as client:
+            downloader = AsyncReportDownloader(client, api_url="http://api")
+            return await downloader.download(URL, destination)
+
+    assert asyncio.run(main()) == len(BODY)
+    assert (tmp_path / "report.pdf").read_bytes() == BODY
+    assert requests == ["bytes=150-", None]
+
+
+class _Pipe(io.RawIOBase):
+    """Приемник без поддержки seek."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, chunk):
+        self.data += chunk
+        return len(chunk)
+
+
+def test_restart_into_unseekable_sink_raises():
+    sink = _Pipe()
+    sink.write(b"partial")
+    downloader = _downloader(BODY, [])
+    with pytest.raises(RealtycloudDownloadException):
+        downloader._restart(sink, 0)
+    assert sink.data == b"partial"
+
+
+def test_restart_keeps_sink_content_before_start():
+    sink = io.BytesIO(b"header")
+    sink.seek(0, io.SEEK_END)
+    downloader = _downloader(BODY, [])
+    target, offset, owned, base = downloader._open_target(sink, resume=True)
+    target.write(b"partial")
+    downloader._restart(target, base)
+    assert sink.getvalue() == b"header"
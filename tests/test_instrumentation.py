@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+from realtycloud.instrumentation import redact_url
+
+
+def test_redact_url_hides_query_values():
+    url = "https://api.realtycloud.ru/search?query=%D0%9C%D0%BE%D1%81%D0%BA%D0%B2%D0%B0&count=5"
+    assert redact_url(url) == "https://api.realtycloud.ru/search?query=REDACTED&count=REDACTED"
+    assert redact_url("https://files.example/report.pdf?signature=abc#page") == (
+        "https://files.example/report.pdf?signature=REDACTED"
+    )
+    assert redact_url("https://api.realtycloud.ru/orders") == "https://api.realtycloud.ru/orders"
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from realtycloud.batching import BatchResult
+from realtycloud.dedup import Deduplicator
+from realtycloud.journal import OrderJournal, object_id
+from realtycloud.request_objects import RealtyObject
+from realtycloud.sync import EGRNClient
+
+
+def test_order_items_count_mismatch_marks_batch_doubtful(tmp_path):
+    objects = [RealtyObject("77:01:0001001:1"), RealtyObject("77:01:0001001:2")]
+    with OrderJournal(str(tmp_path / "orders.db")) as journal:
+        batch_id = journal.begin_batch("EGRN", objects)
+        journal.record_order(
+            batch_id, {"id": "order-1", "order_items": [{"order_item_id": "item-1"}]}
+        )
+        assert journal.order_items() == []
+        [doubtful] = journal.doubtful_batches()
+        assert doubtful.batch_id == batch_id
+        assert "order-1" in doubtful.error
+        # Объекты партии под вопросом повторно не заказываются
+        assert list(journal.unordered("EGRN", objects)) == []
+
+
+def test_object_id_is_canonical_whatever_the_spelling(tmp_path):
+    with OrderJournal(str(tmp_path / "orders.db")) as journal:
+        batch_id = journal.begin_batch("EGRN", [RealtyObject("77:01:0001001:5")])
+        journal.record_order(batch_id, {"id": "order-1", "order_items": [{"order_item_id": "a"}]})
+        assert object_id(RealtyObject("77:1:0001001:05")) == object_id(
+            RealtyObject("77:01:0001001:5")
+        )
+        assert list(journal.unordered("EGRN", [RealtyObject("77:1:0001001:05")])) == []
+
+
+def test_cancelled_async_send_leaves_batch_doubtful(tmp_path):
+    async def send(items):
+        raise asyncio.CancelledError()
+
+    async def main(journal):
+        journaled = journal.journaled_async(send, "EGRN")
+        with pytest.raises(asyncio.CancelledError):
+            await journaled([RealtyObject("77:01:0001001:5")])
+
+    with OrderJournal(str(tmp_path / "orders.db")) as journal:
+        asyncio.run(main(journal))
+        [doubtful] = journal.doubtful_batches()
+        assert "CancelledError" in doubtful.error
+
+
+def test_duplicates_of_journaled_objects_do_not_hang(tmp_path):
+    first = RealtyObject("77:01:0001001:1")
+    second = RealtyObject("77:01:0001001:2")
+    with OrderJournal(str(tmp_path / "orders.db")) as journal:
+        batch_id = journal.begin_batch("EGRN", [first])
+        journal.record_order(batch_id, {"id": "order-1", "order_items": [{"order_item_id": "a"}]})
+        deduplicator = Deduplicator("EGRN")
+        fresh = list(
+            journal.unordered(
+                "EGRN",
+                deduplicator.unique([first, RealtyObject("77:1:0001001:01"), second, first]),
+                deduplicator.skip,
+            )
+        )
+        assert fresh == [second]
+        results = list(
+            deduplicator.results(
+                [BatchResult(0, fresh, data={"order_items": [{"order_item_id": "b"}]})]
+            )
+        )
+    # Повторы пропущенного журналом объекта не ждут ответа и не попадают в результаты
+    assert [result.items for result in results] == [[second]]
+    assert deduplicator._pending == {}
+
+
+def test_resume_after_crash_skips_ordered_and_doubtful_objects(tmp_path):
+    path = str(tmp_path / "orders.db")
+    objects = [RealtyObject(f"77:01:0001001:{number}") for number in range(1, 7)]
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        keys = [item["object_key"] for item in json.loads(request.content)["order_items"]]
+        sent.append(keys)
+        return httpx.Response(
+            200,
+            json={"data": {"order_items": [{"order_item_id": f"id-{key}"} for key in keys]}},
+        )
+
+    # Первый запуск: одна партия заказана, вторая отправлена, но процесс упал
+    # до получения ответа
+    journal = OrderJournal(path)
+    done = journal.begin_batch("EgrnObject", objects[:2], job="job")
+    journal.record_order(
+        done, {"id": "order-1", "order_items": [{"order_item_id": "a"}, {"order_item_id": "b"}]}
+    )
+    crashed = journal.begin_batch("EgrnObject", objects[2:4], job="job")
+    journal.close()
+
+    client = EGRNClient(
+        "token",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        api_url="http://api",
+    )
+    with client, OrderJournal(path) as journal:
+        list(client.fetch_objects_batched(objects, journal=journal, job="job"))
+        assert sent == [[obj.key for obj in objects[4:]]]
+        assert [batch.batch_id for batch in journal.doubtful_batches("job")] == [crashed]
+
+        # После сверки партия под вопросом признана незаказанной
+        journal.mark_failed(crashed)
+        list(client.fetch_objects_batched(objects, journal=journal, job="job"))
+        assert sent[1] == [obj.key for obj in objects[2:4]]
+        assert journal.stats("job")["order_items"] == 6
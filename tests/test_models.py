@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import json
+
+from realtycloud.models import House, LazyDocument, ObjectInfo
+
+
+def test_object_info_fields():
+    payload = {
+        "data": {
+            "object_key": "77:04:0002010:1100",
+            "Address": "г. Москва, ул. Тверская, д. 7",
+            "area": 54.3,
+            "rights": [{"number": "77-77/001", "type": "Собственность"}],
+        }
+    }
+    document = LazyDocument(json.dumps(payload).encode(), json.loads)
+    info = ObjectInfo(document, "data")
+    assert not document.decoded
+    assert info.object_key == "77:04:0002010:1100"
+    assert info.address == "г. Москва, ул. Тверская, д. 7"
+    assert info.area == 54.3
+    assert info.status is None
+    assert [right.number for right in info.rights] == ["77-77/001"]
+
+
+def test_house_fields():
+    house = House({"address": "г. Москва, ул. Тверская, д. 7", "floors": 9, "flat": 15})
+    assert (house.address, house.floors, house.flat) == ("г. Москва, ул. Тверская, д. 7", 9, 15)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from realtycloud.exceptions import (
+    RealtycloudBatchMismatchException,
+    RealtycloudServerErrorException,
+)
+from realtycloud.pipeline import AsyncPipeline
+
+
+def test_batch_mismatch_keeps_results():
+    async def order(values):
+        # Позиций меньше, чем объектов: одна позиция потеряна
+        return [{"order_item_id": f"id-{value}"} for value in values[:-1]]
+
+    async def main():
+        pipeline = AsyncPipeline(["a", "b", "c"]).batch(order, 3, name="order")
+        return [item async for item in pipeline]
+
+    items = asyncio.run(main())
+    assert len(items) == 3
+    for item in items:
+        assert isinstance(item.error, RealtycloudBatchMismatchException)
+        assert item.stage == "order"
+        assert item.error.results == [{"order_item_id": "id-a"}, {"order_item_id": "id-b"}]
+
+
+def test_track_returns_items_after_repeated_poll_failures():
+    calls = []
+
+    async def fetch_status(order_item_ids, **kwargs):
+        calls.append(order_item_ids)
+        raise RealtycloudServerErrorException("Статус: 500")
+
+    async def main():
+        pipeline = AsyncPipeline([{"order_item_id": "a"}, {"order_item_id": "b"}]).track(
+            fetch_status,
+            name="status",
+            max_poll_failures=3,
+            poll_interval=0.01,
+            max_interval=0.01,
+            coalesce_window=0,
+        )
+        return [item async for item in pipeline]
+
+    items = asyncio.run(asyncio.wait_for(main(), 5))
+    assert len(items) == 2
+    assert all(isinstance(item.error, RealtycloudServerErrorException) for item in items)
+    assert all(item.stage == "status" for item in items)
+    assert len(calls) == 3
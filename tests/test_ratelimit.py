@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import httpx
+import pytest
+
+from realtycloud.exceptions import RealtycloudRequestLimitExceededException
+from realtycloud.ratelimit import RateLimiter, TokenBucket, parse_retry_after
+from realtycloud.sync import SuggestClient
+
+
+def test_bucket_allows_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+
+
+def test_penalty_slows_bucket_and_reward_restores_it():
+    bucket = TokenBucket(rate=10, capacity=1, decrease_factor=0.5, increase_step=5)
+    bucket.penalize()
+    assert bucket.current_rate == 5
+    bucket.reward()
+    assert bucket.current_rate == 10
+    bucket.reward()
+    assert bucket.current_rate == 10
+
+
+def test_penalty_with_retry_after_blocks_requests():
+    bucket = TokenBucket(rate=100, capacity=100)
+    bucket.penalize(retry_after=2)
+    assert 1.9 < bucket.reserve() <= 2
+
+
+def test_limit_response_penalizes_endpoint_bucket():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, headers={"Retry-After": "3"}, text="slow down")
+
+    limiter = RateLimiter({"search": (10, 10), "house": (10, 10)})
+    client = SuggestClient(
+        "token",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        api_url="http://api",
+        rate_limiter=limiter,
+    )
+    with client:
+        with pytest.raises(RealtycloudRequestLimitExceededException):
+            client.suggest("Москва")
+    assert limiter.bucket("search").current_rate < 10
+    assert limiter.reserve("search") > 2.9
+    # Другие семейства методов не затронуты
+    assert limiter.reserve("house") == 0.0
+
+
+def test_parse_retry_after_accepts_seconds_and_dates():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
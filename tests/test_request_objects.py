@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from realtycloud.dedup import risk_identity
+from realtycloud.request_objects import RealtyObject, RealtyObjectBatch, RealtyOwner, RiskRequest
+
+
+def test_slice_does_not_share_product_names():
+    batch = RealtyObjectBatch.from_columns(["77:01:0001001:1", "77:01:0001001:2"])
+    part = batch[:1]
+    part.append("77:01:0001001:3", "", "EgrnObject")
+    assert batch.product_name(0) is None
+    assert part.product_name(1) == "EgrnObject"
+    with pytest.raises(ValueError):
+        batch.to_json()
+
+
+def test_owner_data_copies_are_independent():
+    owner = RealtyOwner(
+        last_name="Иванов", first_name="Иван", birthday="01.01.1980", owner_type=0
+    )
+    data = owner.to_dict()
+    data["surname"] = "Петров"
+    request = RiskRequest(RealtyObject("77:01:0001001:1"), [owner])
+    request.owners_data()[0]["first"] = "Петр"
+    assert owner.to_dict()["surname"] == "Иванов"
+    assert request.owners_data()[0]["first"] == "Иван"
+
+
+def test_from_columns_keeps_rows_without_address():
+    batch = RealtyObjectBatch.from_columns(["77:01:0001001:1", "77:01:0001001:2"], ["Москва"])
+    assert [obj.address for obj in batch] == ["Москва", ""]
+    with pytest.raises(ValueError):
+        RealtyObjectBatch.from_columns(["77:01:0001001:1"], ["Москва", "Казань"])
+
+
+def test_owners_data_is_sent_as_given_and_only_identity_ignores_order():
+    ivanov = RealtyOwner(last_name="Иванов", first_name="Иван", owner_type=0)
+    petrov = RealtyOwner(last_name="Петров", first_name="Петр", owner_type=0)
+    obj = RealtyObject("77:01:0001001:1")
+    request = RiskRequest(obj, [petrov, ivanov, petrov])
+    assert [owner["surname"] for owner in request.owners_data()] == [
+        "Петров",
+        "Иванов",
+        "Петров",
+    ]
+    assert risk_identity(request)[0] == risk_identity(RiskRequest(obj, [ivanov, petrov]))[0]
+    assert risk_identity(request)[0] != risk_identity(RiskRequest(obj, [ivanov]))[0]
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import httpx
+import pytest
+
+from realtycloud.exceptions import (
+    RealtycloudServerErrorException,
+    RealtycloudTransportException,
+)
+from realtycloud.request_objects import RealtyObject
+from realtycloud.retry import RetryPolicy
+from realtycloud.sync import EGRNClient, SuggestClient
+
+POLICY = RetryPolicy(max_attempts=3, backoff_base=0, jitter=False)
+ORDER = {"data": {"order_items": [{"order_item_id": "id-1"}]}}
+
+
+def _client(cls, responses, requests, retry_policy=POLICY):
+    """Клиент, отвечающий по очереди ответами или исключениями из responses."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return cls(
+        "token",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        api_url="http://api",
+        retry_policy=retry_policy,
+    )
+
+
+def test_get_is_retried_on_gateway_error():
+    requests = []
+    responses = [httpx.Response(503), httpx.Response(200, json={"data": []})]
+    with _client(SuggestClient, responses, requests) as client:
+        assert client.suggest("Москва") == []
+    assert len(requests) == 2
+
+
+def test_order_is_not_retried_after_read_timeout():
+    requests = []
+    responses = [httpx.ReadTimeout("timeout"), httpx.Response(200, json=ORDER)]
+    with _client(EGRNClient, responses, requests) as client:
+        with pytest.raises(RealtycloudTransportException) as info:
+            client.fetch_single_object(RealtyObject("77:01:0001001:5"))
+    assert info.value.request_sent
+    assert len(requests) == 1
+
+
+def test_order_is_not_retried_after_server_error():
+    requests = []
+    responses = [httpx.Response(500, text="oops"), httpx.Response(200, json=ORDER)]
+    with _client(EGRNClient, responses, requests) as client:
+        with pytest.raises(RealtycloudServerErrorException):
+            client.fetch_single_object(RealtyObject("77:01:0001001:5"))
+    assert len(requests) == 1
+
+
+def test_order_is_retried_when_not_sent():
+    requests = []
+    responses = [httpx.ConnectError("refused"), httpx.Response(200, json=ORDER)]
+    with _client(EGRNClient, responses, requests) as client:
+        data = client.fetch_single_object(RealtyObject("77:01:0001001:5"))
+    assert data["order_items"][0]["order_item_id"] == "id-1"
+    assert len(requests) == 2
+
+
+def test_order_retries_share_idempotency_key():
+    requests = []
+    policy = RetryPolicy(
+        max_attempts=3, backoff_base=0, jitter=False, idempotency_key_header="Idempotency-Key"
+    )
+    responses = [httpx.ReadTimeout("timeout"), httpx.Response(200, json=ORDER)]
+    with _client(EGRNClient, responses, requests, policy) as client:
+        client.fetch_single_object(RealtyObject("77:01:0001001:5"))
+    keys = [request.headers["Idempotency-Key"] for request in requests]
+    assert len(keys) == 2 and keys[0] == keys[1]
+
+
+def test_transport_error_without_policy_is_wrapped():
+    # Раньше сетевая ошибка без ответа приводила к UnboundLocalError
+    requests = []
+    responses = [httpx.ConnectError("refused")]
+    with _client(SuggestClient, responses, requests, retry_policy=None) as client:
+        with pytest.raises(RealtycloudTransportException) as info:
+            client.suggest("Москва")
+    assert not info.value.request_sent
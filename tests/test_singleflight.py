@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+
+import httpx
+
+from realtycloud import asyncr
+from realtycloud.exceptions import RealtycloudNotFoundException
+from realtycloud.singleflight import AsyncSingleFlight, SingleFlight
+from realtycloud.sync import SuggestClient
+
+
+def _client(requests, release, status=200):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        release.wait(5)
+        return httpx.Response(status, json={"data": [{"Number": "77:01:0001001:5"}]})
+
+    return SuggestClient(
+        "token",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        api_url="http://api",
+        single_flight=SingleFlight(),
+    )
+
+
+def _run_concurrently(call, count=5):
+    outcomes = []
+
+    def run():
+        try:
+            outcomes.append(call())
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_identical_lookups_share_one_request():
+    requests = []
+    release = threading.Event()
+    with _client(requests, release) as client:
+        threads, outcomes = _run_concurrently(lambda: client.suggest("Москва"))
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert len(requests) == 1
+    assert len(outcomes) == 5 and all(outcome == outcomes[0] for outcome in outcomes)
+
+
+def test_followers_receive_leader_error():
+    requests = []
+    release = threading.Event()
+    with _client(requests, release, status=404) as client:
+        threads, outcomes = _run_concurrently(lambda: client.suggest("Москва"))
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert len(requests) == 1
+    assert all(isinstance(outcome, RealtycloudNotFoundException) for outcome in outcomes)
+
+
+def test_async_concurrent_identical_lookups_share_one_request():
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"data": [{"Number": "77:01:0001001:5"}]})
+
+    async def main():
+        client = asyncr.SuggestClient(
+            "token",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            api_url="http://api",
+            single_flight=AsyncSingleFlight(),
+        )
+        async with client:
+            return await asyncio.gather(*(client.suggest("Москва") for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(requests) == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_sequential_calls_are_not_coalesced():
+    requests = []
+    release = threading.Event()
+    release.set()
+    with _client(requests, release) as client:
+        client.suggest("Москва")
+        client.suggest("Москва")
+    assert len(requests) == 2
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import time
+
+import httpx
+import pytest
+
+from realtycloud.deadline import Deadline
+from realtycloud.exceptions import (
+    RealtycloudDeadlineExceededException,
+    RealtycloudForbiddenException,
+    RealtycloudInvalidKeyException,
+    RealtycloudRequestLimitExceededException,
+    RealtycloudTokenPoolExhaustedException,
+)
+from realtycloud.sync import SuggestClient
+from realtycloud.tokens import TokenPool
+
+
+def test_exhausted_quota_without_reset_raises():
+    pool = TokenPool(["a", "b"])
+    pool.set_remaining("a", 0)
+    pool.set_remaining("b", 0)
+    with pytest.raises(RealtycloudRequestLimitExceededException):
+        pool.reserve()
+
+
+def test_exhausted_quota_waits_for_reset():
+    pool = TokenPool(["a", "b"])
+    pool.set_remaining("a", 0, reset_in=60)
+    pool.set_remaining("b", 0, reset_in=30)
+    token, delay = pool.reserve()
+    assert token == "b"
+    assert 29 < delay <= 30
+    # После восстановления квоты токен снова распределяется по весу
+    assert pool.usage()["b"].remaining is None
+
+
+def test_token_with_quota_is_preferred():
+    pool = TokenPool(["a", "b"])
+    pool.set_remaining("a", 0, reset_in=60)
+    pool.set_remaining("b", 5)
+    assert pool.reserve() == ("b", 0.0)
+
+
+def test_all_forbidden_tokens_raise_without_waiting():
+    pool = TokenPool(["a", "b"], forbidden_cooldown=600)
+    pool.report_error("a", RealtycloudForbiddenException("403"))
+    pool.report_error("b", RealtycloudInvalidKeyException("Неверный ключ"))
+    with pytest.raises(RealtycloudTokenPoolExhaustedException):
+        pool.reserve()
+
+
+def test_forbidden_token_is_not_waited_for_while_quota_recovers():
+    pool = TokenPool(["a", "b"], forbidden_cooldown=600)
+    pool.report_error("a", RealtycloudForbiddenException("403"))
+    pool.set_remaining("b", 0, reset_in=30)
+    token, delay = pool.reserve()
+    assert token == "b"
+    assert delay <= 30
+
+
+def test_available_excludes_exhausted_quota():
+    pool = TokenPool(["a", "b"])
+    pool.set_remaining("a", 0, reset_in=60)
+    assert pool.available() == 1
+    pool.set_remaining("b", 0)
+    assert pool.available() == 0
+
+
+def test_wait_beyond_deadline_fails_fast():
+    def handler(request):
+        return httpx.Response(200, json={"data": []})
+
+    pool = TokenPool(["a"])
+    pool.set_remaining("a", 0, reset_in=60)
+    client = SuggestClient(
+        "a",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        api_url="http://api",
+        token_pool=pool,
+    )
+    started = time.monotonic()
+    with Deadline(1):
+        with pytest.raises(RealtycloudDeadlineExceededException):
+            client.suggest("Москва, Тверская 1")
+    assert time.monotonic() - started < 0.5
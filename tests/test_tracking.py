@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from realtycloud.tracking import OrderTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, delay: float) -> None:
+        self.now += delay
+
+
+def test_items_are_not_polled_more_often_than_poll_interval():
+    clock = FakeClock()
+    polls = {}
+
+    def fetch_status(order_item_ids, offset=0, limit=1000):
+        for order_item_id in order_item_ids:
+            polls.setdefault(order_item_id, []).append(clock())
+        return [
+            {"order_item_id": order_item_id, "status": "inprogress"}
+            for order_item_id in order_item_ids[offset : offset + limit]
+        ]
+
+    tracker = OrderTracker(
+        fetch_status,
+        poll_interval=180,
+        max_interval=900,
+        coalesce_window=60,
+        clock=clock,
+    )
+    tracker.add(["a", "b"])
+    # Позиции добавляются в разное время, чтобы их расписания не совпадали
+    for step in range(200):
+        clock.sleep(7)
+        if step == 3:
+            tracker.add(["c"])
+        if step == 11:
+            tracker.add(["d"])
+        delay = tracker.next_poll_in()
+        if delay == 0:
+            tracker.poll()
+
+    assert set(polls) == {"a", "b", "c", "d"}
+    for times in polls.values():
+        assert len(times) > 1
+        for previous, current in zip(times, times[1:]):
+            assert current - previous >= 180
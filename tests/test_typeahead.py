@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from realtycloud.typeahead import PrefixCache
+
+ITEMS = [
+    {"value": "г Москва, ул Тверская, д 1"},
+    {"value": "г Москва, ул Тверская, д 12"},
+    {"value": "г Москва, ул Тверская, д 7"},
+]
+
+
+def test_short_extension_is_filtered_locally():
+    cache = PrefixCache()
+    cache.put("Москва, Тверская", 20, ITEMS)
+    assert cache.lookup("Москва, Тверская 1", 10) == ITEMS[:2]
+
+
+def test_long_extension_goes_to_api():
+    # Нечеткий поиск API: среди подсказок на префикс может не быть нужных
+    cache = PrefixCache()
+    cache.put("Москва, Тв", 20, ITEMS)
+    assert cache.lookup("Москва, Тверская 1", 10) is None
+
+
+def test_prefix_match_filters_any_extension():
+    cache = PrefixCache(prefix_match=True)
+    cache.put("Москва, Тв", 20, ITEMS)
+    assert cache.lookup("Москва, Тверская 1", 10) == ITEMS[:2]
+
+
+def test_same_query_is_served_regardless_of_extension_cap():
+    cache = PrefixCache(max_extension=0)
+    cache.put("Москва, Тверская", 20, ITEMS)
+    assert cache.lookup("москва,  тверская", 10) == ITEMS
+    assert cache.lookup("Москва, Тверская 1", 10) is None
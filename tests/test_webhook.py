@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import queue
+import socket
+
+import httpx
+
+from realtycloud.webhook import WebhookReceiver
+
+
+def test_events_without_tracker():
+    events = queue.Queue()
+    with WebhookReceiver(events=events) as receiver:
+        response = httpx.post(
+            receiver.url,
+            json=[
+                {"order_item_id": "a", "status": "done"},
+                {"order_item_id": "b", "status": "inprogress"},
+            ],
+        )
+    assert response.status_code == 200
+    assert [events.get_nowait().order_item_id] == ["a"]
+    assert events.empty()
+
+
+def test_bad_length_and_dispatch_error():
+    def fail(items):
+        raise RuntimeError("ошибка обработчика")
+
+    with WebhookReceiver(on_items=fail) as receiver:
+        # httpx не отправит неверный Content-Length, поэтому запрос пишется вручную
+        with socket.create_connection(receiver._server.server_address[:2]) as sock:
+            sock.sendall(b"POST / HTTP/1.1\r\nHost: test\r\nContent-Length: abc\r\n\r\n")
+            status_line = sock.recv(1024).split(b"\r\n", 1)[0]
+        failed = httpx.post(receiver.url, json=[{"order_item_id": "a", "status": "done"}])
+    assert status_line.split()[1] == b"400"
+    assert failed.status_code == 500
+
+
+def test_failed_callback_keeps_tracker_state_for_retry():
+    from realtycloud.tracking import OrderTracker
+
+    tracker = OrderTracker(lambda ids, offset=0, limit=1000: [], ["a"])
+    events = queue.Queue()
+    calls = []
+
+    def on_items(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError("ошибка обработчика")
+
+    with WebhookReceiver(tracker=tracker, on_items=on_items, events=events) as receiver:
+        payload = [{"order_item_id": "a", "status": "done"}, {"status": "done"}]
+        assert httpx.post(receiver.url, json=payload).status_code == 500
+        assert "a" in tracker
+        assert httpx.post(receiver.url, json=payload).status_code == 200
+    assert "a" not in tracker
+    assert [item["order_item_id"] for item in calls[1]] == ["a"]
+    # Неудачная попытка не теряет событие: его дает повтор уведомления
+    assert events.get_nowait().order_item_id == "a"
+    assert events.empty()